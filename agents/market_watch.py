@@ -0,0 +1,212 @@
+"""
+Market-wide scanner.
+
+Keeps a rolling OHLCV panel (time x symbols) for a configurable universe,
+refreshes it with batched downloads and evaluates screening rules for every
+symbol at once with the vectorized indicator functions.
+"""
+import os
+import time
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.yfinance_helper import get_tickers_history
+from utils.coingecko_helper import COINGECKO_IDS
+from utils.history_store import STORABLE_INTERVALS
+from data import indicators
+
+logger = logging.getLogger(__name__)
+
+# Default universe: large caps plus the top crypto pairs. Point FINBOT_SCAN_UNIVERSE at a
+# file with one symbol per line (e.g. the S&P 500 constituents) to scan a bigger list.
+DEFAULT_STOCKS = [
+    "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "BRK-B", "JPM", "V",
+    "UNH", "XOM", "JNJ", "WMT", "MA", "PG", "HD", "AVGO", "CVX", "LLY",
+    "MRK", "ABBV", "KO", "PEP", "COST", "ADBE", "CRM", "NFLX", "AMD", "INTC",
+]
+DEFAULT_CRYPTO = [f"{symbol}-USD" for symbol in COINGECKO_IDS if symbol not in ("USDT", "USDC")]
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+DEFAULT_RULES = {
+    "rsi_oversold": 30.0,     # RSI below this level
+    "rsi_overbought": 70.0,   # RSI above this level
+    "sma_cross": True,        # SMA 20 crossing SMA 50 on the latest bar
+    "volume_spike": 2.0,      # Volume at least this multiple of its 20-bar average
+    "gap": 2.0,               # Open at least this many percent away from the previous close
+}
+
+
+def load_universe(source: Optional[str] = None) -> List[str]:
+    """Read symbols from a file (one per line, '#' comments allowed) or use the default universe"""
+    source = source or os.getenv("FINBOT_SCAN_UNIVERSE")
+    if not source:
+        return DEFAULT_STOCKS + DEFAULT_CRYPTO
+    with open(source) as f:
+        symbols = [line.split("#")[0].strip().upper() for line in f]
+    return [symbol for symbol in dict.fromkeys(symbols) if symbol]
+
+
+def _right_align(panels: Dict[str, np.ndarray], valid: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Shift each column's valid rows to the bottom so row -1 is every symbol's latest bar.
+    Stocks and crypto trade on different calendars, this removes the gaps without a
+    per-symbol loop.
+    """
+    order = np.argsort(valid, axis=0, kind="stable")  # Missing rows first, then valid rows in time order
+    aligned = {}
+    for field, panel in panels.items():
+        shifted = np.take_along_axis(panel, order, axis=0)
+        shifted[~np.take_along_axis(valid, order, axis=0)] = np.nan
+        aligned[field] = shifted
+    return aligned
+
+
+class MarketScanner:
+    """Rolling price panel for a universe of symbols with vectorized screening rules"""
+
+    def __init__(self, universe: Optional[Iterable[str]] = None, period: str = "6mo", interval: str = "1d",
+                 refresh_period: str = "5d", max_bars: int = 260, rules: Optional[Dict] = None):
+        """
+        Args:
+            universe: Symbols to scan (defaults to load_universe())
+            period: History loaded on the first refresh
+            interval: Bar size
+            refresh_period: History downloaded on later refreshes and merged into the panel
+            max_bars: Number of rows kept in the rolling panel
+            rules: Overrides for DEFAULT_RULES (set a rule to None to disable it)
+        """
+        self.universe = list(dict.fromkeys(universe)) if universe else load_universe()
+        self.period = period
+        self.interval = interval
+        self.refresh_period = refresh_period
+        self.max_bars = max_bars
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.panel: Dict[str, pd.DataFrame] = {}
+        self.last_scan_seconds = 0.0
+
+    def refresh(self):
+        """Update the rolling panel with batched downloads"""
+        period = self.refresh_period if self.panel else self.period
+        histories = get_tickers_history(self.universe, period=period, interval=self.interval)
+        frames = {symbol: hist for symbol, hist in histories.items() if not hist.empty}
+        if not frames:
+            logger.warning("Scanner refresh returned no data")
+            return
+
+        for symbol, hist in frames.items():
+            # Mixed timezones (exchange vs UTC for crypto) cannot share one index. Daily and
+            # longer bars are keyed by their local date so stocks and crypto share rows.
+            if isinstance(hist.index, pd.DatetimeIndex) and hist.index.tz is not None:
+                hist = hist.copy()
+                if self.interval in STORABLE_INTERVALS:
+                    hist.index = hist.index.tz_localize(None).normalize()
+                else:
+                    hist.index = hist.index.tz_convert("UTC")
+            # yfinance occasionally repeats a bar, which concat cannot align
+            hist = hist[~hist.index.duplicated(keep="last")]
+            frames[symbol] = hist.reindex(columns=FIELDS)
+        # One aligned frame with (symbol, field) columns, then one panel per field
+        combined = pd.concat(frames, axis=1)
+
+        for field in FIELDS:
+            update = combined.xs(field, axis=1, level=1)
+            current = self.panel.get(field)
+            if current is not None:
+                # New values win, symbols missing from this download keep their old bars
+                index = current.index.union(update.index)
+                columns = current.columns.union(update.columns, sort=False)
+                old = current.reindex(index=index, columns=columns).to_numpy(dtype=float)
+                new = update.reindex(index=index, columns=columns).to_numpy(dtype=float)
+                update = pd.DataFrame(np.where(np.isnan(new), old, new), index=index, columns=columns)
+            self.panel[field] = update.sort_index().iloc[-self.max_bars:]
+
+    def scan(self) -> pd.DataFrame:
+        """
+        Evaluate the screening rules on the latest bar of every symbol.
+
+        Each rule's metric is in its own units (RSI points, % spread or gap, volume ratio),
+        so a hit's Score is the percentile of its metric across the universe, in (0, 1].
+        That ranks an extreme gap and an extreme RSI reading alike.
+
+        Returns:
+            DataFrame with Symbol, Rule, Score, Price and Detail columns, best scores first
+        """
+        columns = ["Symbol", "Rule", "Score", "Price", "Detail"]
+        if "Close" not in self.panel:
+            return pd.DataFrame(columns=columns)
+
+        close_frame = self.panel["Close"]
+        symbols = np.asarray(close_frame.columns)
+        raw = {
+            field: self.panel[field].reindex(index=close_frame.index, columns=close_frame.columns).to_numpy(dtype=float)
+            if field in self.panel else np.full(close_frame.shape, np.nan)
+            for field in FIELDS
+        }
+        p = _right_align(raw, ~np.isnan(raw["Close"]))
+        close, volume, open_ = p["Close"], p["Volume"], p["Open"]
+        if close.shape[0] < 2:
+            return pd.DataFrame(columns=columns)
+
+        last_close, prev_close = close[-1], close[-2]
+        hits = []
+
+        def add_hits(rule: str, mask: np.ndarray, strength: np.ndarray, detail: np.ndarray):
+            # Higher strength is a stronger signal, ranked against every symbol with a value
+            score = pd.Series(strength).rank(pct=True).to_numpy()
+            for i in np.flatnonzero(mask & ~np.isnan(score)):
+                hits.append((symbols[i], rule, float(score[i]), float(last_close[i]), detail[i]))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if self.rules.get("rsi_oversold") is not None or self.rules.get("rsi_overbought") is not None:
+                rsi = indicators.rsi(close)[-1]
+                labels = np.char.mod("RSI %.1f", np.nan_to_num(rsi))
+                if self.rules.get("rsi_oversold") is not None:
+                    level = self.rules["rsi_oversold"]
+                    add_hits("RSI oversold", rsi < level, level - rsi, labels)
+                if self.rules.get("rsi_overbought") is not None:
+                    level = self.rules["rsi_overbought"]
+                    add_hits("RSI overbought", rsi > level, rsi - level, labels)
+
+            if self.rules.get("sma_cross"):
+                sma20, sma50 = indicators.sma(close, 20), indicators.sma(close, 50)
+                spread = (sma20[-1] - sma50[-1]) / sma50[-1] * 100
+                previous = sma20[-2] - sma50[-2]
+                current = sma20[-1] - sma50[-1]
+                labels = np.char.mod("SMA20 %+.2f%% vs SMA50", np.nan_to_num(spread))
+                add_hits("Golden cross", (previous <= 0) & (current > 0), np.abs(spread), labels)
+                add_hits("Death cross", (previous >= 0) & (current < 0), np.abs(spread), labels)
+
+            if self.rules.get("volume_spike") is not None:
+                # Average volume over the 20 bars before the latest one
+                average = indicators.sma(volume[:-1], 20)[-1] if volume.shape[0] > 20 else np.full(len(symbols), np.nan)
+                ratio = volume[-1] / average
+                labels = np.char.mod("%.1fx average volume", np.nan_to_num(ratio))
+                add_hits("Volume spike", ratio >= self.rules["volume_spike"], ratio, labels)
+
+            if self.rules.get("gap") is not None:
+                gap = (open_[-1] - prev_close) / prev_close * 100
+                labels = np.char.mod("Gap %+.2f%%", np.nan_to_num(gap))
+                add_hits("Gap up", gap >= self.rules["gap"], gap, labels)
+                add_hits("Gap down", gap <= -self.rules["gap"], -gap, labels)
+
+        results = pd.DataFrame(hits, columns=columns)
+        return results.sort_values("Score", ascending=False, ignore_index=True)
+
+    def run_cycle(self) -> pd.DataFrame:
+        """Refresh the panel and return this cycle's ranked hits"""
+        start = time.time()
+        self.refresh()
+        hits = self.scan()
+        self.last_scan_seconds = time.time() - start
+        logger.info(f"Scanned {len(self.universe)} symbols in {self.last_scan_seconds:.1f}s, {len(hits)} hits")
+        return hits
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    scanner = MarketScanner()
+    print(scanner.run_cycle().head(20).to_string(index=False))
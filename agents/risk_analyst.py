@@ -0,0 +1,259 @@
+"""
+Portfolio risk engine.
+
+Historical and parametric VaR/CVaR, volatility, beta and drawdowns for a
+holdings table in the PortfolioManager format, plus a correlated Monte Carlo
+simulation. Monte Carlo paths are generated in chunks and reduced on the fly,
+so memory stays at O(n_paths + chunk_size * n_assets) whatever the horizon.
+"""
+import logging
+from statistics import NormalDist
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.yfinance_helper import get_tickers_history
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+DEFAULT_BENCHMARK = "SPY"
+
+
+def load_returns(tickers, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+    """
+    Daily simple returns for the tickers over the period, on dates every ticker traded.
+    Crypto weekend moves roll into the next common date.
+    """
+    histories = get_tickers_history(list(dict.fromkeys(tickers)), period=period, interval=interval)
+    closes = {}
+    for ticker, hist in histories.items():
+        if hist.empty or "Close" not in hist.columns:
+            logger.warning(f"No history for {ticker}, excluded from risk figures")
+            continue
+        close = hist["Close"]
+        if isinstance(close.index, pd.DatetimeIndex) and close.index.tz is not None:
+            # Key bars by local trading date so exchanges and crypto line up
+            close = close.copy()
+            close.index = close.index.tz_localize(None).normalize()
+        closes[ticker] = close[~close.index.duplicated(keep="last")]
+
+    if not closes:
+        return pd.DataFrame()
+    prices = pd.DataFrame(closes).dropna()
+    return prices.pct_change().iloc[1:]
+
+
+def drawdowns(values: np.ndarray) -> np.ndarray:
+    """Drawdown from the running peak at every point (0 at new highs, negative below)"""
+    values = np.asarray(values, dtype=float)
+    peaks = np.maximum.accumulate(values)
+    return values / peaks - 1.0
+
+
+def historical_var(returns: np.ndarray, confidence: float = 0.95) -> Dict[str, float]:
+    """Historical VaR and CVaR as positive loss fractions"""
+    returns = np.asarray(returns, dtype=float)
+    cutoff = np.quantile(returns, 1.0 - confidence)
+    tail = returns[returns <= cutoff]
+    return {"var": float(-cutoff), "cvar": float(-tail.mean()) if len(tail) else float(-cutoff)}
+
+
+def tail_loss(pnl: np.ndarray, confidence: float = 0.95) -> Dict[str, float]:
+    """
+    VaR and CVaR of simulated P&L fractions as non-negative losses.
+
+    CVaR averages the losses of the worst ceil((1 - confidence) * N) outcomes, with
+    gains in that tail counting as zero loss, so it stays a tail figure even when
+    fewer paths than that lose money.
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    count = max(1, int(np.ceil((1.0 - confidence) * len(pnl) - 1e-9)))
+    worst = np.partition(pnl, count - 1)[:count]
+    var = max(-float(np.quantile(pnl, 1.0 - confidence)), 0.0)
+    cvar = max(float(np.maximum(-worst, 0.0).sum()) / count, var)
+    # + 0.0 turns -0.0 into 0.0
+    return {"var": var + 0.0, "cvar": cvar + 0.0}
+
+
+def parametric_var(returns: np.ndarray, confidence: float = 0.95, horizon: int = 1) -> Dict[str, float]:
+    """Gaussian (variance-covariance) VaR and CVaR as positive loss fractions"""
+    returns = np.asarray(returns, dtype=float)
+    mu = returns.mean() * horizon
+    sigma = returns.std(ddof=1) * np.sqrt(horizon)
+    alpha = 1.0 - confidence
+    z = NormalDist().inv_cdf(alpha)
+    return {
+        "var": float(-(mu + z * sigma)),
+        "cvar": float(-(mu - sigma * NormalDist().pdf(z) / alpha)),
+    }
+
+
+def monte_carlo(returns: pd.DataFrame, weights: np.ndarray, value: float = 1.0, n_paths: int = 100_000,
+                horizon: int = TRADING_DAYS, confidence: float = 0.95, chunk_size: int = 10_000,
+                seed: Optional[int] = None) -> Dict[str, float]:
+    """
+    Simulate buy-and-hold portfolio values with correlated log-normal asset returns.
+
+    Daily log returns are drawn as mu + L z, where L is the Cholesky factor of the
+    historical covariance. Paths are simulated chunk_size at a time and only the
+    terminal value and maximum drawdown of each path are kept.
+
+    Args:
+        returns: Daily simple returns (time x assets)
+        weights: Portfolio weights per asset (fractions of value)
+        value: Starting portfolio value
+        n_paths: Number of simulated paths
+        horizon: Days per path
+        confidence: VaR/CVaR confidence level
+        chunk_size: Paths simulated at once (bounds memory)
+        seed: Random seed for reproducible runs
+
+    Returns:
+        Dictionary with VaR/CVaR of the terminal value (losses from the starting value,
+        never negative), percentiles and drawdown figures
+    """
+    if horizon < 1:
+        raise ValueError(f"horizon must be at least 1 day, got {horizon}")
+    log_returns = np.log1p(np.asarray(returns, dtype=float))
+    mu = log_returns.mean(axis=0)
+    cov = np.atleast_2d(np.cov(log_returns, rowvar=False))
+    n_assets = cov.shape[0]
+    try:
+        chol = np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Singular covariance (e.g. duplicated assets), add a tiny ridge
+        chol = np.linalg.cholesky(cov + np.eye(n_assets) * 1e-10 * np.trace(cov) / n_assets)
+
+    # float32 halves memory and RNG time, plenty of precision for risk percentiles
+    mu32 = mu.astype(np.float32)
+    chol_t = chol.T.astype(np.float32)
+    start = (np.asarray(weights, dtype=float) * value).astype(np.float32)
+    rng = np.random.default_rng(seed)
+
+    terminal = np.empty(n_paths)
+    max_drawdown = np.empty(n_paths)
+    for first in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - first)
+        log_value = np.zeros((size, n_assets), dtype=np.float32)
+        peak = np.full(size, value, dtype=np.float32)
+        worst = np.zeros(size, dtype=np.float32)
+        for _ in range(horizon):
+            shocks = rng.standard_normal((size, n_assets), dtype=np.float32)
+            log_value += mu32 + shocks @ chol_t
+            portfolio = np.exp(log_value) @ start
+            np.maximum(peak, portfolio, out=peak)
+            np.minimum(worst, portfolio / peak - 1.0, out=worst)
+        terminal[first:first + size] = portfolio
+        max_drawdown[first:first + size] = worst
+
+    pnl = terminal / value - 1.0
+    tail = tail_loss(pnl, confidence)
+    return {
+        "paths": n_paths,
+        "horizon": horizon,
+        "var": tail["var"],
+        "cvar": tail["cvar"],
+        "var_value": tail["var"] * value,
+        "cvar_value": tail["cvar"] * value,
+        "expected_value": float(terminal.mean()),
+        "p05": float(np.quantile(terminal, 0.05)),
+        "p50": float(np.quantile(terminal, 0.50)),
+        "p95": float(np.quantile(terminal, 0.95)),
+        "prob_loss": float((terminal < value).mean()),
+        "median_max_drawdown": float(-np.median(max_drawdown)),
+    }
+
+
+class RiskAnalyst:
+    def __init__(self, period: str = "1y", confidence: float = 0.95, benchmark: str = DEFAULT_BENCHMARK):
+        """
+        Args:
+            period: History used to estimate returns
+            confidence: VaR/CVaR confidence level
+            benchmark: Ticker used for beta
+        """
+        self.period = period
+        self.confidence = confidence
+        self.benchmark = benchmark
+
+    def analyze(self, portfolio_data, simulate: bool = True, n_paths: int = 100_000,
+                horizon: int = TRADING_DAYS, seed: Optional[int] = None) -> Dict:
+        """
+        Risk figures for a portfolio.
+
+        Args:
+            portfolio_data: Records or DataFrame from PortfolioManager.calculate_portfolio
+                (uses Ticker and Market Value), or a holdings table with Ticker and Quantity
+            simulate: Also run the Monte Carlo simulation
+            n_paths: Monte Carlo paths
+            horizon: Monte Carlo horizon in trading days
+            seed: Random seed for the simulation
+
+        Returns:
+            Dictionary of risk figures; VaR/CVaR are positive loss fractions of portfolio value
+        """
+        df = pd.DataFrame(portfolio_data)
+        if df.empty or "Ticker" not in df.columns:
+            return {}
+
+        returns = load_returns(list(df["Ticker"].dropna()) + [self.benchmark], period=self.period)
+        if returns.empty:
+            return {}
+        benchmark = returns.pop(self.benchmark) if self.benchmark in returns.columns else None
+        # A holding that is also the benchmark still needs its own column
+        if benchmark is not None and self.benchmark in set(df["Ticker"]):
+            returns[self.benchmark] = benchmark
+
+        if "Market Value" in df.columns:
+            exposure = df.groupby("Ticker")["Market Value"].sum()
+        else:
+            # Raw holdings: value each position at its last close
+            last_close = {
+                ticker: float(hist["Close"].iloc[-1])
+                for ticker, hist in get_tickers_history(list(df["Ticker"].dropna().unique()), period="5d").items()
+                if not hist.empty
+            }
+            quantity = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0.0)
+            exposure = (quantity * df["Ticker"].map(last_close)).groupby(df["Ticker"]).sum()
+
+        exposure = exposure.reindex(returns.columns).fillna(0.0)
+        value = float(exposure.sum())
+        if value <= 0 or len(returns) < 2:
+            return {}
+        weights = (exposure / value).to_numpy()
+
+        asset_returns = returns.to_numpy()
+        portfolio_returns = asset_returns @ weights
+        equity = np.cumprod(1.0 + portfolio_returns)
+        dd = drawdowns(np.concatenate([[1.0], equity]))
+
+        historical = historical_var(portfolio_returns, self.confidence)
+        parametric = parametric_var(portfolio_returns, self.confidence)
+        result = {
+            "value": value,
+            "confidence": self.confidence,
+            "observations": len(portfolio_returns),
+            "volatility": float(portfolio_returns.std(ddof=1) * np.sqrt(TRADING_DAYS)),
+            "historical_var": historical["var"],
+            "historical_cvar": historical["cvar"],
+            "parametric_var": parametric["var"],
+            "parametric_cvar": parametric["cvar"],
+            "max_drawdown": float(-dd.min()),
+            "current_drawdown": float(-dd[-1]),
+            "beta": None,
+            "asset_volatility": dict(zip(returns.columns, (asset_returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)).tolist())),
+            "weights": dict(zip(returns.columns, weights.tolist())),
+        }
+
+        if benchmark is not None:
+            bench = benchmark.to_numpy()
+            variance = bench.var(ddof=1)
+            if variance > 0:
+                result["beta"] = float(np.cov(portfolio_returns, bench, ddof=1)[0, 1] / variance)
+
+        if simulate:
+            result["monte_carlo"] = monte_carlo(returns, weights, value, n_paths=n_paths, horizon=horizon,
+                                                confidence=self.confidence, seed=seed)
+        return result
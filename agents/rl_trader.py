@@ -0,0 +1,134 @@
+"""
+PPO trading agent built on the NumPy trading environments.
+
+Training runs either one in-process VecTradingEnv that steps every episode as
+whole-array operations (fastest for this light environment), or one
+TradingEnv per worker process via SubprocVecEnv to spread the work across CPU
+cores. stable-baselines3 (and torch) are optional imports, so the rest of the
+app works without them.
+"""
+import os
+import logging
+from functools import partial
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from rl_models.ppo_trading_agent import (
+    ACTIONS, Dataset, TradingEnv, VecTradingEnv, build_features, load_datasets
+)
+from utils.yfinance_helper import get_ticker_history
+
+try:
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+    SB3_AVAILABLE = True
+except ImportError:
+    SB3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "models", "ppo_trader")
+
+
+def _make_env(dataset: Dataset, window: int, fee_bps: float, episode_length: int, seed: int):
+    """Env factory for SubprocVecEnv workers (module level so it pickles)"""
+    env = TradingEnv(*dataset, window=window, fee_bps=fee_bps, episode_length=episode_length)
+    env.reset(seed=seed)
+    return env
+
+
+class RLTrader:
+    def __init__(self, tickers: Sequence[str], period: str = "5y", window: int = 30, fee_bps: float = 10.0,
+                 episode_length: int = 252, n_envs: int = 16, use_subprocess: bool = False,
+                 model_path: str = DEFAULT_MODEL_PATH):
+        """
+        Args:
+            tickers: Symbols to train on, every env trades one of them
+            period: History used for training
+            window: Bars of features per observation
+            fee_bps: Trading cost in basis points
+            episode_length: Steps per training episode
+            n_envs: Parallel environments
+            use_subprocess: One process per env (SubprocVecEnv) instead of the in-process vectorized env
+            model_path: Where the trained model is saved
+        """
+        self.tickers = list(tickers)
+        self.period = period
+        self.window = window
+        self.fee_bps = fee_bps
+        self.episode_length = episode_length
+        self.n_envs = n_envs
+        self.use_subprocess = use_subprocess
+        self.model_path = model_path
+        self.model = None
+
+    def build_env(self, datasets: Optional[Dict[str, Dataset]] = None):
+        """Vectorized training environment over the tickers' histories"""
+        datasets = datasets or load_datasets(self.tickers, period=self.period)
+        if not datasets:
+            raise ValueError("No usable history for any ticker")
+        data = list(datasets.values())
+
+        if self.use_subprocess:
+            factories = [
+                partial(_make_env, data[i % len(data)], self.window, self.fee_bps, self.episode_length, i)
+                for i in range(self.n_envs)
+            ]
+            return SubprocVecEnv(factories)
+        return VecTradingEnv(data, n_envs=self.n_envs, window=self.window, fee_bps=self.fee_bps,
+                             episode_length=self.episode_length)
+
+    def train(self, total_timesteps: int = 1_000_000, datasets: Optional[Dict[str, Dataset]] = None, **ppo_kwargs):
+        """
+        Train PPO and save the model.
+
+        Args:
+            total_timesteps: Environment steps across all envs
+            datasets: Preloaded feature arrays (loaded from cached histories when omitted)
+            **ppo_kwargs: Passed to stable_baselines3.PPO (e.g. learning_rate, n_steps)
+        """
+        if not SB3_AVAILABLE:
+            raise ImportError("stable-baselines3 is required for training: pip install stable-baselines3")
+
+        env = self.build_env(datasets)
+        try:
+            ppo_kwargs.setdefault("n_steps", 256)
+            ppo_kwargs.setdefault("batch_size", 1024)
+            self.model = PPO("MlpPolicy", env, verbose=0, **ppo_kwargs)
+            self.model.learn(total_timesteps=total_timesteps)
+        finally:
+            env.close()
+
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        self.model.save(self.model_path)
+        logger.info(f"Trained PPO on {len(self.tickers)} tickers for {total_timesteps} steps, saved to {self.model_path}")
+        return self.model
+
+    def load(self):
+        """Load a previously trained model"""
+        if not SB3_AVAILABLE:
+            raise ImportError("stable-baselines3 is required: pip install stable-baselines3")
+        self.model = PPO.load(self.model_path)
+        return self.model
+
+    def predict(self, ticker: str, position: float = 0.0) -> str:
+        """
+        Suggested action ("flat", "long" or "short") for the latest bar of a ticker.
+
+        Args:
+            ticker: Symbol to evaluate
+            position: Current position (-1 short, 0 flat, 1 long)
+        """
+        if self.model is None:
+            self.load()
+        data = get_ticker_history(ticker, period="1y", interval="1d")
+        if data.empty or "Close" not in data.columns:
+            raise ValueError(f"No price history for {ticker}")
+        features, _ = build_features(data)
+        if len(features) < self.window:
+            raise ValueError(f"Not enough history for {ticker}")
+
+        obs = np.append(features[-self.window:].reshape(-1), np.float32(position)).astype(np.float32)
+        action, _ = self.model.predict(obs, deterministic=True)
+        return ACTIONS[int(action)]
@@ -1,9 +1,16 @@
 import os
+import math
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
-from pycoingecko import CoinGeckoAPI
-from utils.yfinance_helper import get_ticker_history
+from utils.yfinance_helper import get_quotes, get_tickers_history, get_breaker_states
+from utils.quote_engine import AsyncQuoteEngine
+from utils.coingecko_helper import get_crypto_prices, MAX_IDS_PER_REQUEST
+from utils.send_queue import TelegramSendQueue, GLOBAL_MESSAGES_PER_SECOND
+from utils.state import WatchlistStore
+from utils.alerts import AlertBook, RULE_KINDS, RULE_NAMES, MOVE, CROSS_SMA20, DEFAULT_MOVE_PCT
+from utils.scheduler import ShardedMonitor
 
 # Enable logging
 logging.basicConfig(level=logging.INFO)
@@ -15,40 +22,70 @@ if not TOKEN:
     logger.error("TG_BOT_TOKEN environment variable is missing.")
     exit(1)
 
-# In-memory watchlist storage: {user: {"stocks": [...], "crypto": [...]}}
-watchlists = {}
+# Durable watchlist storage. The monitor fetches each symbol of alert_book once per cycle
+store = WatchlistStore()
 
-# YFinance & CoinGecko clients
-cg = CoinGeckoAPI()
+# This worker's shard of the users (FINBOT_WORKER_ID of FINBOT_NUM_WORKERS)
+monitor_shard = ShardedMonitor()
 
-def get_stock_price(symbol: str):
-    try:
-        # Use rate-limited helper to avoid 429 errors
-        data = get_ticker_history(symbol, period="1d", interval="1m")
-        if not data.empty:
-            return float(data['Close'].iloc[-1])
-    except Exception as e:
-        error_str = str(e)
-        if "429" in error_str or "Too Many Requests" in error_str:
-            logger.warning(f"Rate limited for {symbol}. Will retry on next cycle.")
-        else:
-            logger.error(f"Error fetching stock price for {symbol}: {e}")
-    return None
+# Alert rules of the users in this shard; users are only messaged when one of them fires
+alert_book = AlertBook()
 
-def get_crypto_price(symbol: str):
+def get_stock_prices(symbols):
+    """Fetch the latest price for many stocks with batched quote requests"""
+    prices = {}
     try:
-        coin = symbol.lower()
-        data = cg.get_price(ids=coin, vs_currencies='eur')
-        return data.get(coin, {}).get('eur')
+        for symbol, quote in get_quotes(symbols).items():
+            prices[symbol] = quote.price
     except Exception as e:
-        logger.error(f"Error fetching crypto price for {symbol}: {e}")
-    return None
+        logger.error(f"Error fetching stock prices for {symbols}: {e}")
+    return prices
+
+def get_sma20(symbols):
+    """Latest 20-day simple moving average for each stock (for sma20 alerts)"""
+    sma = {}
+    histories = get_tickers_history(symbols, period="3mo", interval="1d")
+    for symbol, data in histories.items():
+        if len(data) >= 20:
+            sma[symbol] = float(data['Close'].iloc[-20:].mean())
+    return sma
+
+# Runs the blocking fetchers on worker threads so the event loop stays responsive.
+# Each crypto batch is priced with a single CoinGecko simple/price request.
+quote_engine = AsyncQuoteEngine(get_stock_prices, get_crypto_prices, crypto_batch_size=MAX_IDS_PER_REQUEST)
+
+# Outgoing monitor messages go through a queue that respects Telegram's flood limits.
+# Every worker sends with the same token, so each gets its share of the global limit.
+send_queue = TelegramSendQueue(global_rate=GLOBAL_MESSAGES_PER_SECOND / monitor_shard.num_workers)
+
+def add_alert_rule(user, market, symbol, kind, threshold=float("nan")):
+    """Persist a rule and track it locally if this worker monitors the user"""
+    stored_threshold = None if math.isnan(threshold) else threshold
+    added = store.add_alert(user, market, symbol, RULE_NAMES[kind], stored_threshold)
+    if added and monitor_shard.owns(user):
+        alert_book.add_rule(user, market, symbol, kind, threshold)
+    return added
+
+def remove_alert_rules(user, market, symbol, kind=None):
+    store.remove_alerts(user, market, symbol, RULE_NAMES[kind] if kind else None)
+    alert_book.remove_rules(user, market, symbol, kind)
+
+def load_alert_rules():
+    """Rebuild this shard's alert book from the store (keeps state of unchanged rules)"""
+    alert_book.sync(
+        (user, market, symbol, RULE_KINDS[rule], float("nan") if threshold is None else threshold)
+        for user, market, symbol, rule, threshold in store.alerts()
+        if monitor_shard.owns(user)
+    )
 
 async def start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "Welcome to TradeBrokerAI!\n"
         "Use /watch_stock TSLA, /watch_crypto bitcoin\n"
-        "Use /list to view watchlist."
+        "Use /unwatch_stock TSLA, /unwatch_crypto bitcoin to remove\n"
+        "Use /list to view watchlist.\n"
+        "You get a message when a price moves 1% since your last alert.\n"
+        "Use /alert TSLA move 2, /alert TSLA above 250, /alert TSLA below 200 or /alert TSLA sma20 to customise, /alerts to list."
     )
 
 async def watch_stock(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
@@ -56,9 +93,8 @@ async def watch_stock(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     symbol = ctx.args[0].upper() if ctx.args else None
     if not symbol:
         return await update.message.reply_text("Usage: /watch_stock TSLA")
-    watchlists.setdefault(user, {"stocks": [], "crypto": []})
-    if symbol not in watchlists[user]["stocks"]:
-        watchlists[user]["stocks"].append(symbol)
+    if store.add(user, "stocks", symbol):
+        add_alert_rule(user, "stocks", symbol, MOVE, DEFAULT_MOVE_PCT)
         await update.message.reply_text(f"Added {symbol} to your stock watchlist.")
     else:
         await update.message.reply_text(f"{symbol} is already in your stock watchlist.")
@@ -68,45 +104,182 @@ async def watch_crypto(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     symbol = " ".join(ctx.args).lower() if ctx.args else None
     if not symbol:
         return await update.message.reply_text("Usage: /watch_crypto bitcoin")
-    watchlists.setdefault(user, {"stocks": [], "crypto": []})
-    if symbol not in watchlists[user]["crypto"]:
-        watchlists[user]["crypto"].append(symbol)
+    if store.add(user, "crypto", symbol):
+        add_alert_rule(user, "crypto", symbol, MOVE, DEFAULT_MOVE_PCT)
         await update.message.reply_text(f"Added {symbol} to your crypto watchlist.")
     else:
         await update.message.reply_text(f"{symbol} is already in your crypto watchlist.")
 
+async def unwatch_stock(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_chat.id
+    symbol = ctx.args[0].upper() if ctx.args else None
+    if not symbol:
+        return await update.message.reply_text("Usage: /unwatch_stock TSLA")
+    if store.remove(user, "stocks", symbol):
+        remove_alert_rules(user, "stocks", symbol)
+        await update.message.reply_text(f"Removed {symbol} from your stock watchlist.")
+    else:
+        await update.message.reply_text(f"{symbol} is not in your stock watchlist.")
+
+async def unwatch_crypto(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_chat.id
+    symbol = " ".join(ctx.args).lower() if ctx.args else None
+    if not symbol:
+        return await update.message.reply_text("Usage: /unwatch_crypto bitcoin")
+    if store.remove(user, "crypto", symbol):
+        remove_alert_rules(user, "crypto", symbol)
+        await update.message.reply_text(f"Removed {symbol} from your crypto watchlist.")
+    else:
+        await update.message.reply_text(f"{symbol} is not in your crypto watchlist.")
+
 async def list_watchlist(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     user = update.effective_chat.id
-    wl = watchlists.get(user, {"stocks": [], "crypto": []})
+    wl = store.get_watchlist(user)
     msg = "Your watchlist:\n"
     msg += "\n".join([f"📈 {s}" for s in wl["stocks"]] + [f"💱 {c}" for c in wl["crypto"]]) or "—Empty—"
     await update.message.reply_text(msg)
 
+async def set_alert(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_chat.id
+    usage = "Usage: /alert TSLA move 2 | above 250 | below 200 | sma20"
+    if not ctx.args or len(ctx.args) < 2 or ctx.args[1].lower() not in RULE_KINDS:
+        return await update.message.reply_text(usage)
+
+    wl = store.get_watchlist(user)
+    name, kind = ctx.args[0], RULE_KINDS[ctx.args[1].lower()]
+    if name.lower() in wl["crypto"]:
+        market, symbol = "crypto", name.lower()
+    elif name.upper() in wl["stocks"]:
+        market, symbol = "stocks", name.upper()
+    else:
+        return await update.message.reply_text(f"Add {name} with /watch_stock or /watch_crypto first.")
+
+    threshold = float("nan")
+    if kind != CROSS_SMA20:
+        try:
+            threshold = float(ctx.args[2])
+        except (IndexError, ValueError):
+            return await update.message.reply_text(usage)
+        # nan/inf would be stored as NULL or fire every cycle, and so would a move of 0% or less
+        if not math.isfinite(threshold) or (kind == MOVE and threshold <= 0):
+            return await update.message.reply_text(usage)
+    elif market == "crypto":
+        return await update.message.reply_text("SMA 20 alerts are only available for stocks.")
+
+    if kind == MOVE:
+        # One move rule per symbol, the new threshold replaces the old one
+        remove_alert_rules(user, market, symbol, MOVE)
+    if add_alert_rule(user, market, symbol, kind, threshold):
+        await update.message.reply_text(f"Alert added for {symbol}.")
+    else:
+        await update.message.reply_text(f"That alert already exists for {symbol}.")
+
+async def list_alerts(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_chat.id
+    lines = []
+    for market, symbol, rule, threshold in store.get_alerts(user):
+        if rule == "move":
+            lines.append(f"🔔 {symbol}: moves {threshold:g}%")
+        elif rule == "sma20":
+            lines.append(f"🔔 {symbol}: crosses SMA 20")
+        else:
+            lines.append(f"🔔 {symbol}: {rule} €{threshold:,.2f}")
+    await update.message.reply_text("Your alerts:\n" + ("\n".join(lines) or "—Empty—"))
+
+async def status(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    stats = await quote_engine.run(store.worker_stats)
+    lines = [
+        f"Worker {w['worker_id']}: {w['avg_duration']:.1f}s avg cycle, {w['last_lag']:.1f}s lag, "
+        f"{w['utilisation']:.0%} of {w['interval']:.0f}s, {w['skipped']} skipped"
+        for w in stats
+    ]
+    # Breakers are per process, so this lists the symbols failing in the worker answering commands
+    breakers = [
+        f"{symbol}: {b['state']}, {b['failures']} failures, retry in {b['retry_in']:.0f}s"
+        for symbol, b in sorted(get_breaker_states().items())
+    ]
+    await update.message.reply_text(
+        "Monitor workers:\n" + ("\n".join(lines) or "—No cycles yet—")
+        + "\n\nFailing symbols:\n" + ("\n".join(breakers) or "—None—")
+    )
+
 async def monitor(context: ContextTypes.DEFAULT_TYPE):
-    for user, wl in watchlists.items():
-        for symbol in wl["stocks"]:
-            price = get_stock_price(symbol)
-            if price:
-                await context.bot.send_message(user, f"📈 {symbol}: €{price:.2f}")
-        for coin in wl["crypto"]:
-            price = get_crypto_price(coin)
-            if price:
-                await context.bot.send_message(user, f"💱 {coin.capitalize()}: €{price:.2f}")
+    await monitor_shard.run(run_monitor_cycle)
+    await quote_engine.run(store.record_worker_stats, monitor_shard.worker_id, monitor_shard.stats())
+
+async def run_monitor_cycle():
+    # Pick up subscriptions and rules written by other workers
+    if await quote_engine.run(store.refresh_if_changed):
+        load_alert_rules()
+
+    # Fetch every symbol watched in this shard once, then fan the prices out to its subscribers
+    stock_prices, crypto_prices = await quote_engine.get_quotes(alert_book.symbols("stocks"), alert_book.symbols("crypto"))
+
+    sma20 = {}
+    sma_symbols = alert_book.symbols_with_rule(CROSS_SMA20, "stocks")
+    if sma_symbols:
+        sma = await quote_engine.run(get_sma20, sma_symbols)
+        sma20 = {("stocks", symbol): value for symbol, value in sma.items()}
+
+    prices = {("stocks", symbol): price for symbol, price in stock_prices.items()}
+    prices.update({("crypto", coin): price for coin, price in crypto_prices.items()})
+
+    # One vectorized pass over all rules, then one digest per user with fired alerts
+    for user, lines in alert_book.evaluate(prices, sma20).items():
+        send_queue.enqueue(user, "🔔 Price alerts:\n" + "\n".join(lines))
+
+async def post_init(app):
+    # Subscriptions stored before alert rules were persisted get the default rule
+    for user, wl in store.items():
+        stored = {(market, symbol) for market, symbol, _, _ in store.get_alerts(user)}
+        for market in ("stocks", "crypto"):
+            for symbol in wl[market]:
+                if (market, symbol) not in stored:
+                    store.add_alert(user, market, symbol, "move", DEFAULT_MOVE_PCT)
+    load_alert_rules()
+    await send_queue.start(app.bot)
+
+async def post_shutdown(app):
+    await send_queue.stop()
+    quote_engine.shutdown()
+    store.close()
+
+async def run_monitor_worker(app):
+    """Run the job queue without polling (only worker 0 receives commands)"""
+    async with app:
+        await post_init(app)
+        await app.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await app.stop()
+            await post_shutdown(app)
 
 def run_bot():
-    app = ApplicationBuilder().token(TOKEN).build()
+    app = ApplicationBuilder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("watch_stock", watch_stock))
     app.add_handler(CommandHandler("watch_crypto", watch_crypto))
+    app.add_handler(CommandHandler("unwatch_stock", unwatch_stock))
+    app.add_handler(CommandHandler("unwatch_crypto", unwatch_crypto))
     app.add_handler(CommandHandler("list", list_watchlist))
+    app.add_handler(CommandHandler("alert", set_alert))
+    app.add_handler(CommandHandler("alerts", list_alerts))
+    app.add_handler(CommandHandler("status", status))
 
-    # Schedule the monitor job to run every 60 seconds
+    # Schedule this worker's monitor job, staggered so workers do not fetch at the same moment
     job_queue = app.job_queue
-    job_queue.run_repeating(monitor, interval=60, first=10)
+    job_queue.run_repeating(monitor, interval=monitor_shard.interval, first=monitor_shard.first_delay())
 
-    print("Bot is running...")
-    app.run_polling()
+    print(f"Bot is running (worker {monitor_shard.worker_id + 1}/{monitor_shard.num_workers})...")
+    if monitor_shard.worker_id == 0:
+        app.run_polling()
+    else:
+        try:
+            asyncio.run(run_monitor_worker(app))
+        except KeyboardInterrupt:
+            pass
 
 if __name__ == "__main__":
     run_bot()
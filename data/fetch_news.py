@@ -1,11 +1,206 @@
+"""
+News pipeline for Yahoo Finance RSS feeds.
+
+Parsed entries are cached per ticker with a TTL, so the dashboard reads news
+from memory. Expired feeds are served stale while a background refresh runs.
+Refreshes use conditional GETs (ETag / If-Modified-Since), so an unchanged feed
+costs a 304 with no body. refresh_news() polls many tickers' feeds concurrently
+on a thread pool, and start_news_poller() runs it in the background for every
+ticker registered with watch_news(). Every new entry also goes into the local
+news index for search.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
 import feedparser
 
-def get_finance_news(ticker="AAPL"):
-    rss_url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"
-    feed = feedparser.parse(rss_url)
-    return [(entry.title, entry.link) for entry in feed.entries[:5]]  # Get the top 5 news articles
+from rag.financial_rag import get_news_index
+from utils.cache import BoundedTTLCache
+from utils.rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+RSS_URL = "https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"
+NEWS_TTL = float(os.getenv("FINBOT_NEWS_TTL", "300"))
+NEWS_WORKERS = 8
+MAX_WATCHED = 64  # Tickers kept fresh by the poller, least recently watched dropped first
+
+# Entries stay usable (and keep their ETag) for a day after the TTL, so a refresh
+# of a quiet feed is always a cheap conditional request
+_news_cache = BoundedTTLCache(max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=NEWS_TTL, max_stale=24 * 3600)
+_executor = ThreadPoolExecutor(max_workers=NEWS_WORKERS, thread_name_prefix="news")
+_in_flight: Dict[str, object] = {}
+_in_flight_lock = threading.Lock()
+_limiter = get_limiter("rss")
+_watched: Dict[str, None] = {}  # Insertion order doubles as recency
+_watched_lock = threading.Lock()
+
+
+def fetch_feed(ticker: str) -> List[Dict]:
+    """
+    Download one ticker's feed (conditionally) and update the cache.
+
+    Returns:
+        The ticker's entries as dicts with title, link, published (may be stale on errors)
+    """
+    ticker = ticker.upper()
+    previous = _news_cache.get(ticker, allow_expired=True)
+    kwargs = {}
+    if previous:
+        if previous.get("etag"):
+            kwargs["etag"] = previous["etag"]
+        if previous.get("modified"):
+            kwargs["modified"] = previous["modified"]
+
+    _limiter.acquire()
+    try:
+        feed = feedparser.parse(RSS_URL.format(ticker=ticker), **kwargs)
+    except Exception as e:
+        logger.error(f"Error fetching news for {ticker}: {e}")
+        return previous["entries"] if previous else []
+
+    if feed.get("status") == 429:
+        _limiter.on_rate_limited()
+        return previous["entries"] if previous else []
+    _limiter.on_success()
+
+    if feed.get("status") == 304 and previous:
+        # Unchanged: keep the entries, restart the TTL
+        _news_cache.set(ticker, previous)
+        return previous["entries"]
+
+    if not feed.entries and (feed.get("bozo") or feed.get("status", 200) >= 400):
+        # Failed fetch: keep what we had, and cache nothing so the next poll tries again
+        logger.warning(f"Could not fetch news feed for {ticker}: {feed.get('bozo_exception') or feed.get('status')}")
+        return previous["entries"] if previous else []
+    if not feed.entries and previous:
+        return previous["entries"]
+
+    entries = [{
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "published": entry.get("published", ""),
+    } for entry in feed.entries]
+    _news_cache.set(ticker, {
+        "entries": entries,
+        "etag": feed.get("etag"),
+        "modified": feed.get("modified"),
+    })
+
+    try:
+        get_news_index().add_entries(feed.entries, ticker)
+    except Exception as e:
+        logger.error(f"Failed to index news for {ticker}: {e}")
+    return entries
+
+
+def _is_fresh(ticker: str) -> bool:
+    age = _news_cache.age(ticker)
+    return age is not None and age < _news_cache.ttl
+
+
+def _refresh_in_background(ticker: str):
+    """Schedule a refresh unless one is already running for this ticker"""
+    with _in_flight_lock:
+        if ticker in _in_flight:
+            return
+        future = _executor.submit(fetch_feed, ticker)
+        _in_flight[ticker] = future
+    future.add_done_callback(lambda _: _in_flight.pop(ticker, None))
+
+
+def refresh_news(tickers: Iterable[str], force: bool = False, max_workers: int = NEWS_WORKERS) -> Dict[str, List[Dict]]:
+    """
+    Refresh many tickers' feeds concurrently.
+
+    Args:
+        tickers: Tickers to poll
+        force: Also refresh feeds that are still within their TTL
+        max_workers: Concurrent downloads
+
+    Returns:
+        Dictionary mapping each ticker to its entries
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    due = [t for t in tickers if force or not _is_fresh(t)]
+    if due:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(due)), thread_name_prefix="news-poll") as pool:
+            for ticker, entries in zip(due, pool.map(fetch_feed, due)):
+                logger.debug(f"News for {ticker}: {len(entries)} entries")
+    return {t: (_news_cache.get(t, allow_expired=True) or {}).get("entries", []) for t in tickers}
+
+
+def watch_news(tickers: Iterable[str]):
+    """Add tickers to the set the news poller keeps fresh"""
+    with _watched_lock:
+        for ticker in tickers:
+            ticker = ticker.upper()
+            _watched.pop(ticker, None)
+            _watched[ticker] = None
+        while len(_watched) > MAX_WATCHED:
+            del _watched[next(iter(_watched))]
+
+
+def start_news_poller(tickers: Iterable[str] = (), interval: float = NEWS_TTL) -> threading.Event:
+    """
+    Keep the feeds of every watched ticker fresh from a daemon thread.
+
+    Args:
+        tickers: Tickers to watch from the start, more can be added with watch_news()
+        interval: Seconds between polls
+
+    Returns:
+        Event that stops the poller when set
+    """
+    watch_news(tickers)
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            started = time.time()
+            with _watched_lock:
+                tickers = list(_watched)
+            try:
+                if tickers:
+                    refresh_news(tickers)
+            except Exception as e:
+                logger.error(f"News poll failed: {e}")
+            stop.wait(max(1.0, interval - (time.time() - started)))
+
+    threading.Thread(target=poll, name="news-poller", daemon=True).start()
+    return stop
+
+
+def get_finance_news(ticker="AAPL", limit=5):
+    """
+    Latest (title, link) pairs for a ticker, served from the cache.
+    Only the very first request for a ticker waits for the network.
+    """
+    ticker = ticker.upper()
+    cached = _news_cache.get(ticker, allow_expired=True)
+    if cached is None:
+        entries = fetch_feed(ticker)
+    else:
+        if not _is_fresh(ticker):
+            _refresh_in_background(ticker)  # Stale: serve it now, refresh for the next render
+        entries = cached["entries"]
+    return [(entry["title"], entry["link"]) for entry in entries[:limit]]
+
+
+def search_news(query, ticker=None, k=10):
+    """Search every article indexed so far, returns (title, link) pairs"""
+    return [(doc["title"], doc["link"]) for doc in get_news_index().search(query, ticker=ticker, k=k)]
+
+
+def clear_news_cache():
+    """Drop cached feeds (the next request downloads them in full)"""
+    _news_cache.clear()
+
 
 if __name__ == "__main__":
     for title, link in get_finance_news():
         print(f"Title: {title}\nLink: {link}\n")
-# This code fetches the latest finance news articles from Yahoo Finance using RSS feeds.
\ No newline at end of file
@@ -0,0 +1,319 @@
+"""
+Technical indicators.
+
+Panel functions (sma, ema, rsi, macd, bollinger, atr) take 2-D arrays shaped
+(time, symbols) and compute every column at once; they only loop over time,
+never over symbols, and leave NaN where a column has too little data.
+
+add_indicators() keeps incremental SMA 20/50 and RSI 14 state per (ticker,
+period, interval), so when a refreshed history only adds bars at the end, just
+the new bars are processed. State is only reused for a frame that starts at
+the same bar, so results never depend on earlier calls. Results match
+pandas_ta's sma() and rsi() (Wilder smoothing as an adjusted EWM with
+alpha = 1/length).
+
+The adjusted RSI depends on the first bar, so state cannot be re-sliced when a
+rolling period ("6mo", "1y") moves its start forward. The incremental path
+therefore only helps refreshes within a session; the first call after the
+window rolls is one full vectorized pass.
+"""
+import math
+import logging
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import BoundedTTLCache
+
+logger = logging.getLogger(__name__)
+
+SMA_LENGTHS = (20, 50)
+RSI_LENGTH = 14
+INDICATOR_COLUMNS = ["SMA_20", "SMA_50", "RSI"]
+
+# Indicator state lives as long as a trading day, the price cache decides freshness
+_state_cache = BoundedTTLCache(max_entries=256, max_bytes=64 * 1024 * 1024, ttl=24 * 3600)
+
+
+def _as_panel(values) -> np.ndarray:
+    """Accept a 1-D series or a 2-D (time, symbols) panel, always return 2-D floats"""
+    array = np.asarray(values, dtype=float)
+    return array[:, None] if array.ndim == 1 else array
+
+
+def _rolling_sum(panel: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling sums and counts of non-NaN values over `length` rows via cumulative sums"""
+    valid = ~np.isnan(panel)
+    padded = np.zeros((panel.shape[0] + 1, panel.shape[1]))
+    counts = np.zeros_like(padded)
+    np.cumsum(np.where(valid, panel, 0.0), axis=0, out=padded[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+
+    sums = np.full(panel.shape, np.nan)
+    window_counts = np.zeros(panel.shape)
+    if panel.shape[0] >= length:
+        sums[length - 1:] = padded[length:] - padded[:-length]
+        window_counts[length - 1:] = counts[length:] - counts[:-length]
+    return sums, window_counts
+
+
+def sma(prices, length: int = 20) -> np.ndarray:
+    """Simple moving average per column (NaN until `length` valid bars are in the window)"""
+    panel = _as_panel(prices)
+    sums, counts = _rolling_sum(panel, length)
+    return np.where(counts == length, sums / length, np.nan)
+
+
+def ema(prices, length: int = 20) -> np.ndarray:
+    """Exponential moving average per column (span=length, adjust=False, seeded at the first value)"""
+    panel = _as_panel(prices)
+    alpha = 2.0 / (length + 1)
+    out = np.full(panel.shape, np.nan)
+    state = np.full(panel.shape[1], np.nan)
+    seen = np.zeros(panel.shape[1])
+    for t in range(panel.shape[0]):
+        x = panel[t]
+        has_x = ~np.isnan(x)
+        state = np.where(np.isnan(state), x, np.where(has_x, alpha * x + (1 - alpha) * state, state))
+        seen += has_x
+        out[t] = np.where((seen >= length) & has_x, state, np.nan)
+    return out
+
+
+def _wilder(panel: np.ndarray, length: int, return_state: bool = False):
+    """
+    Wilder smoothing as pandas' ewm(alpha=1/length, min_periods=length).mean(),
+    i.e. an adjusted EWM, computed across all columns at once.
+    """
+    decay = 1.0 - 1.0 / length
+    numerator = np.zeros(panel.shape[1])
+    weight = np.zeros(panel.shape[1])
+    count = np.zeros(panel.shape[1])
+    out = np.full(panel.shape, np.nan)
+    for t in range(panel.shape[0]):
+        x = panel[t]
+        has_x = ~np.isnan(x)
+        numerator = np.where(has_x, np.where(has_x, x, 0.0) + decay * numerator, decay * numerator)
+        weight = np.where(has_x, 1.0 + decay * weight, decay * weight)
+        count += has_x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[t] = np.where((count >= length) & has_x, numerator / weight, np.nan)
+    if return_state:
+        return out, numerator, weight, count
+    return out
+
+
+def rsi(prices, length: int = RSI_LENGTH, return_state: bool = False):
+    """Relative Strength Index per column (Wilder smoothing, as pandas_ta.rsi)"""
+    panel = _as_panel(prices)
+    diff = np.full(panel.shape, np.nan)
+    diff[1:] = panel[1:] - panel[:-1]
+    gains = np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0))
+    losses = np.where(np.isnan(diff), np.nan, np.maximum(-diff, 0.0))
+
+    avg_gain, gain_sum, weight, count = _wilder(gains, length, return_state=True)
+    avg_loss, loss_sum, _, _ = _wilder(losses, length, return_state=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = 100.0 * avg_gain / (avg_gain + avg_loss)
+    if return_state:
+        return out, gain_sum, loss_sum, weight, count
+    return out
+
+
+def macd(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram per column"""
+    panel = _as_panel(prices)
+    line = ema(panel, fast) - ema(panel, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(prices, length: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bands (middle, upper, lower) per column, population standard deviation"""
+    panel = _as_panel(prices)
+    sums, counts = _rolling_sum(panel, length)
+    squares, _ = _rolling_sum(panel * panel, length)
+    full = counts == length
+    with np.errstate(invalid="ignore"):
+        middle = np.where(full, sums / length, np.nan)
+        variance = np.maximum(np.where(full, squares / length, np.nan) - middle * middle, 0.0)
+    std = np.sqrt(variance)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """Average True Range per column (Wilder smoothing of the true range)"""
+    high, low, close = _as_panel(high), _as_panel(low), _as_panel(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[1:] = close[:-1]
+    # fmax ignores NaN, so the first bar falls back to high - low
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return _wilder(true_range, length)
+
+
+class IndicatorState:
+    """Running SMA windows and RSI averages over one price series"""
+
+    def __init__(self):
+        self.window = deque(maxlen=max(SMA_LENGTHS))
+        self.prev_close = math.nan
+        # Adjusted EWM numerators/denominator for average gain and loss
+        self.alpha = 1.0 / RSI_LENGTH
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.weight = 0.0
+        self.diff_count = 0
+
+        self.first_index = None
+        self.last_index = None
+        self.fingerprint = None  # _fingerprint() of the committed closes
+
+    @classmethod
+    def from_history(cls, closes: np.ndarray) -> Tuple["IndicatorState", np.ndarray]:
+        """Build state for a whole series with the vectorized panel functions
+
+        Returns:
+            The state after the last close and a (len(closes), 3) array of SMA_20, SMA_50, RSI
+        """
+        state = cls()
+        columns = [sma(closes, length)[:, 0] for length in SMA_LENGTHS]
+        rsi_values, gain_sum, loss_sum, weight, count = rsi(closes, RSI_LENGTH, return_state=True)
+        columns.append(rsi_values[:, 0])
+
+        state.window.extend(float(c) for c in closes[-state.window.maxlen:])
+        if len(closes):
+            state.prev_close = float(closes[-1])
+        state.gain_sum = float(gain_sum[0])
+        state.loss_sum = float(loss_sum[0])
+        state.weight = float(weight[0])
+        state.diff_count = int(count[0])
+        return state, np.column_stack(columns)
+
+    def copy(self) -> "IndicatorState":
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.__dict__.update(self.__dict__)
+        clone.window = deque(self.window, maxlen=self.window.maxlen)
+        return clone
+
+    def step(self, close: float) -> Tuple[float, float, float]:
+        """Consume one bar and return (SMA_20, SMA_50, RSI) for it"""
+        self.window.append(close)
+        smas = []
+        for length in SMA_LENGTHS:
+            if len(self.window) < length:
+                smas.append(math.nan)
+                continue
+            recent = list(self.window)[-length:]
+            smas.append(math.nan if any(math.isnan(v) for v in recent) else sum(recent) / length)
+
+        diff = close - self.prev_close
+        self.prev_close = close
+        decay = 1.0 - self.alpha
+        if math.isnan(diff):
+            # Missing observations still decay earlier weights (pandas ignore_na=False)
+            if self.weight > 0:
+                self.gain_sum *= decay
+                self.loss_sum *= decay
+                self.weight *= decay
+        else:
+            self.gain_sum = max(diff, 0.0) + decay * self.gain_sum
+            self.loss_sum = max(-diff, 0.0) + decay * self.loss_sum
+            self.weight = 1.0 + decay * self.weight
+            self.diff_count += 1
+
+        rsi = math.nan
+        if self.diff_count >= RSI_LENGTH and not math.isnan(diff) and self.weight > 0:
+            total = self.gain_sum + self.loss_sum
+            rsi = 100.0 * self.gain_sum / total if total > 0 else math.nan
+
+        return smas[0], smas[1], rsi
+
+
+def _fingerprint(closes: np.ndarray) -> Tuple[int, float, float]:
+    """Cheap checksum of a series: count, sum and position-weighted sum (catches edits anywhere)"""
+    values = np.nan_to_num(np.asarray(closes, dtype=float), nan=0.0)
+    return len(values), float(values.sum()), float(values @ np.arange(1, len(values) + 1))
+
+
+def _same_prefix(closes: np.ndarray, fingerprint: Tuple[int, float, float]) -> bool:
+    count, total, weighted = _fingerprint(closes)
+    return (count == fingerprint[0] and math.isclose(total, fingerprint[1], rel_tol=1e-12)
+            and math.isclose(weighted, fingerprint[2], rel_tol=1e-12))
+
+
+def _cache_key(ticker: str, period: Optional[str], interval: str) -> str:
+    return f"{ticker}_{period}_{interval}"
+
+
+def add_indicators(data: pd.DataFrame, ticker: Optional[str] = None, interval: str = "1d",
+                   period: Optional[str] = None) -> pd.DataFrame:
+    """
+    Return a copy of `data` with SMA_20, SMA_50 and RSI columns.
+
+    With a ticker, rolling state is cached per (ticker, period, interval) and reused
+    when `data` starts at the same bar and extends the previously seen series, so
+    only new bars are processed. A rolling period whose first bar moved starts over.
+    The last bar is treated as provisional (it may still change intraday) and is
+    never committed to the state.
+    """
+    result = data.copy()
+    if data.empty:
+        for column in INDICATOR_COLUMNS:
+            result[column] = np.nan
+        return result
+
+    close = data["Close"].to_numpy(dtype=float)
+    index = data.index
+    n = len(close)
+
+    key = _cache_key(ticker, period, interval) if ticker else None
+    entry = _state_cache.get(key) if key else None
+
+    state, values, start = None, None, 0
+    if entry is not None:
+        cached_state, cached_values = entry
+        position = index.get_indexer([cached_state.last_index])[0] if cached_state.last_index is not None else -1
+        # Same first bar and unchanged closes up to the last committed one: the state was built
+        # from this frame's own history (a provider correction anywhere in it forces a rebuild)
+        if (position >= 0 and index[0] == cached_state.first_index
+                and _same_prefix(close[:position + 1], cached_state.fingerprint)):
+            state, values, start = cached_state.copy(), cached_values, position + 1
+
+    if state is None:
+        # Different series (or history was adjusted), rebuild from the first bar in one vectorized pass
+        state, committed = IndicatorState.from_history(close[:n - 1])
+        state.first_index = index[0]
+        values = pd.DataFrame(committed, index=index[:n - 1], columns=INDICATOR_COLUMNS) if n > 1 else None
+        start = n - 1
+
+    # Commit every new bar except the last one
+    rows = [state.step(close[i]) for i in range(start, n - 1)]
+    if n > 1:
+        state.last_index = index[n - 2]
+        state.fingerprint = _fingerprint(close[:n - 1])
+    if rows:
+        new_values = pd.DataFrame(rows, index=index[start:n - 1], columns=INDICATOR_COLUMNS)
+        values = new_values if values is None else pd.concat([values, new_values])
+
+    if key and n > 1:
+        _state_cache.set(key, (state, values))
+
+    latest = state.copy().step(close[-1])
+    if values is not None:
+        aligned = values.reindex(index)
+        for column in INDICATOR_COLUMNS:
+            result[column] = aligned[column].to_numpy()
+    else:
+        for column in INDICATOR_COLUMNS:
+            result[column] = np.nan
+    for column, value in zip(INDICATOR_COLUMNS, latest):
+        result.iloc[-1, result.columns.get_loc(column)] = value
+
+    return result
+
+
+def clear_indicator_cache():
+    """Drop all cached indicator state"""
+    _state_cache.clear()
@@ -1,7 +1,12 @@
 
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-import time
-from utils.yfinance_helper import get_ticker_history
+from utils.yfinance_helper import get_tickers_history
+from utils.coingecko_helper import get_crypto_quotes, coin_id_for_ticker
+from data import indicators
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,86 +15,94 @@ class PortfolioManager:
     def __init__(self):
         pass
 
+    def _fetch_prices(self, tickers):
+        """
+        Fetch (current price, previous close) for each ticker.
+        Known crypto pairs (e.g. BTC-USD) are priced in one batched CoinGecko call,
+        with the previous close derived from the 24h change. Everything else, and
+        any coin CoinGecko could not price, comes from batched Yahoo downloads.
+        """
+        prices = {}
+
+        coin_ids = {ticker: coin_id_for_ticker(ticker) for ticker in tickers}
+        coin_ids = {ticker: coin for ticker, coin in coin_ids.items() if coin}
+        if coin_ids:
+            quotes = get_crypto_quotes(coin_ids.values(), vs_currency="usd")
+            for ticker, coin in coin_ids.items():
+                quote = quotes.get(coin)
+                if quote:
+                    change_pct = quote.get("change_24h") or 0.0
+                    prices[ticker] = (quote["price"], quote["price"] / (1 + change_pct / 100))
+
+        remaining = [ticker for ticker in tickers if ticker not in prices]
+        histories = get_tickers_history(remaining, period="5d", interval="1d")
+        for ticker, hist in histories.items():
+            if hist.empty or "Close" not in hist.columns:
+                continue
+            current_price = float(hist["Close"].iloc[-1])
+            prev_close = float(hist["Close"].iloc[-2]) if len(hist) > 1 else current_price
+            prices[ticker] = (current_price, prev_close)
+
+        return prices
+
     def calculate_portfolio(self, holdings_df):
         """
         Calculate portfolio value based on a DataFrame of holdings.
         Expected columns: 'Ticker', 'Quantity', 'Avg Cost'
+        Lots of the same ticker are combined with a quantity-weighted average cost.
         """
         if holdings_df.empty:
             return [], {}
 
-        portfolio_data = []
-        total_value = 0.0
-        total_cost = 0.0
-        total_daily_change = 0.0
-
-        # Iterate through unique tickers
-        unique_holdings = holdings_df.groupby('Ticker').agg({
-            'Quantity': 'sum',
-            'Avg Cost': 'mean' # Simplified: weighted average would be better but keeping it simple for now
-        }).reset_index()
-
-        for _, row in unique_holdings.iterrows():
-            ticker = row['Ticker']
-            shares = float(row['Quantity'])
-            avg_cost = float(row['Avg Cost'])
-            
-            try:
-                # Fetch data
-                hist = get_ticker_history(ticker, period="5d", interval="1d")
-                
-                if hist.empty or "Close" not in hist.columns:
-                    raise ValueError("No price data found")
-
-                # Calculate metrics
-                current_price = float(hist["Close"].iloc[-1])
-                prev_close = float(hist["Close"].iloc[-2]) if len(hist) > 1 else current_price
-                
-                market_value = current_price * shares
-                daily_change_pct = ((current_price - prev_close) / prev_close) * 100
-                daily_change_val = (current_price - prev_close) * shares
-                
-                total_return_val = market_value - (avg_cost * shares)
-                total_return_pct = ((current_price - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0
-                
-                portfolio_data.append({
-                    "Ticker": ticker,
-                    "Quantity": shares,
-                    "Avg Cost": avg_cost,
-                    "Current Price": current_price,
-                    "Market Value": market_value,
-                    "Daily Change (%)": daily_change_pct,
-                    "Total Return ($)": total_return_val,
-                    "Total Return (%)": total_return_pct
-                })
-                
-                total_value += market_value
-                total_cost += (avg_cost * shares)
-                total_daily_change += daily_change_val
-                
-                # Rate limit politeness
-                time.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Error processing {ticker}: {e}")
-                portfolio_data.append({
-                    "Ticker": ticker,
-                    "Quantity": shares,
-                    "Avg Cost": avg_cost,
-                    "Current Price": 0.0,
-                    "Market Value": 0.0,
-                    "Daily Change (%)": 0.0,
-                    "Total Return ($)": 0.0,
-                    "Total Return (%)": 0.0,
-                    "Error": str(e)
-                })
+        holdings = holdings_df.dropna(subset=['Ticker'])
+        quantity = pd.to_numeric(holdings['Quantity'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+        lot_cost = pd.to_numeric(holdings['Avg Cost'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+
+        # Aggregate lots per ticker: total shares and total cost basis
+        codes, tickers = pd.factorize(holdings['Ticker'], sort=True)
+        if len(tickers) == 0:
+            return [], {}
+        shares = np.bincount(codes, weights=quantity, minlength=len(tickers))
+        cost_basis = np.bincount(codes, weights=quantity * lot_cost, minlength=len(tickers))
+        avg_cost = np.divide(cost_basis, shares, out=np.zeros_like(cost_basis), where=shares != 0)
+
+        # Fetch all holdings in batched requests and align prices to the tickers
+        prices = self._fetch_prices(list(tickers))
+        quotes = np.array([prices.get(ticker, (np.nan, np.nan)) for ticker in tickers], dtype=float).reshape(-1, 2)
+        current_price, prev_close = quotes[:, 0], quotes[:, 1]
+        priced = ~np.isnan(current_price)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            market_value = np.where(priced, current_price * shares, 0.0)
+            daily_change_pct = np.where(priced & (prev_close > 0), (current_price - prev_close) / prev_close * 100, 0.0)
+            daily_change_val = np.where(priced, (current_price - prev_close) * shares, 0.0)
+            total_return_val = np.where(priced, market_value - cost_basis, 0.0)
+            total_return_pct = np.where(priced & (avg_cost > 0), (current_price - avg_cost) / avg_cost * 100, 0.0)
+
+        portfolio_data = pd.DataFrame({
+            "Ticker": tickers,
+            "Quantity": shares,
+            "Avg Cost": avg_cost,
+            "Current Price": np.where(priced, current_price, 0.0),
+            "Market Value": market_value,
+            "Daily Change (%)": daily_change_pct,
+            "Total Return ($)": total_return_val,
+            "Total Return (%)": total_return_pct
+        }).to_dict('records')
+
+        for i in np.flatnonzero(~priced):
+            logger.error(f"Error processing {tickers[i]}: No price data found")
+            portfolio_data[i]["Error"] = "No price data found"
+
+        total_value = float(market_value.sum())
+        total_cost = float(cost_basis[priced].sum())
 
         summary = {
             "total_value": total_value,
             "total_cost": total_cost,
             "total_return": total_value - total_cost,
             "total_return_pct": ((total_value - total_cost) / total_cost * 100) if total_cost > 0 else 0,
-            "daily_change": total_daily_change
+            "daily_change": float(daily_change_val.sum())
         }
 
         return portfolio_data, summary
@@ -101,3 +114,190 @@ class PortfolioManager:
             {"Ticker": "TSLA", "Quantity": 5.0, "Avg Cost": 200.0},
             {"Ticker": "BTC-USD", "Quantity": 0.5, "Avg Cost": 30000.0}
         ])
+
+
+def sma_crossover_signals(prices: pd.DataFrame, fast: int = 20, slow: int = 50) -> pd.DataFrame:
+    """Long (1) while the fast SMA is above the slow SMA, flat (0) otherwise, for every column"""
+    fast_sma = indicators.sma(prices.to_numpy(dtype=float), fast)
+    slow_sma = indicators.sma(prices.to_numpy(dtype=float), slow)
+    return pd.DataFrame((fast_sma > slow_sma).astype(float), index=prices.index, columns=prices.columns)
+
+
+def rsi_signals(prices: pd.DataFrame, length: int = 14, lower: float = 30.0, upper: float = 70.0) -> pd.DataFrame:
+    """Enter long when RSI drops below `lower`, exit when it rises above `upper`"""
+    values = indicators.rsi(prices.to_numpy(dtype=float), length)
+    # Entries and exits as 1/0, holding the last state in between (vectorized position latch)
+    state = np.where(values < lower, 1.0, np.where(values > upper, 0.0, np.nan))
+    return pd.DataFrame(state, index=prices.index, columns=prices.columns).ffill().fillna(0.0)
+
+
+def signals_from_indicators(data: pd.DataFrame, rsi_upper: float = 70.0) -> pd.Series:
+    """
+    Signal for one symbol from get_historical_data() output: long while SMA_20 is
+    above SMA_50 and RSI is not overbought.
+    """
+    return ((data["SMA_20"] > data["SMA_50"]) & (data["RSI"] < rsi_upper)).astype(float)
+
+
+class Backtester:
+    """
+    Vectorized backtests over a (time x symbols) price panel.
+
+    Signals are target exposures per symbol (0 = flat, 1 = fully allocated, negative
+    for shorts). A signal observed at a bar's close is filled at that close plus
+    slippage and held over the next bar, so there is no look-ahead. Positions are
+    rebalanced to target every bar (including drift back to target) and fees are
+    charged on the traded notional.
+    """
+
+    def __init__(self, initial_capital: float = 10_000.0, fee_bps: float = 10.0, slippage_bps: float = 5.0,
+                 sizing: str = "equal", max_position: float = 1.0, periods_per_year: int = 252):
+        """
+        Args:
+            initial_capital: Starting equity
+            fee_bps: Commission per trade in basis points of traded notional
+            slippage_bps: Slippage per trade in basis points of traded notional
+            sizing: "equal" gives every symbol 1/N of equity, "signal" splits equity
+                across the symbols with a non-zero signal
+            max_position: Cap on any single symbol's weight
+            periods_per_year: Bars per year, for annualised figures
+        """
+        if sizing not in ("equal", "signal"):
+            raise ValueError(f"Unknown sizing '{sizing}', use 'equal' or 'signal'")
+        self.initial_capital = initial_capital
+        self.cost_rate = (fee_bps + slippage_bps) / 10_000
+        self.sizing = sizing
+        self.max_position = max_position
+        self.periods_per_year = periods_per_year
+
+    def target_weights(self, signals: np.ndarray) -> np.ndarray:
+        """Portfolio weights per bar and symbol from raw signals"""
+        signals = np.nan_to_num(signals)
+        if self.sizing == "equal":
+            weights = signals / signals.shape[1]
+        else:
+            gross = np.abs(signals).sum(axis=1, keepdims=True)
+            weights = np.divide(signals, gross, out=np.zeros_like(signals), where=gross > 0)
+        return np.clip(weights, -self.max_position, self.max_position)
+
+    def run(self, prices: pd.DataFrame, signals: pd.DataFrame) -> dict:
+        """
+        Backtest signals against prices.
+
+        Args:
+            prices: Close prices (time x symbols)
+            signals: Target exposures aligned to prices (missing entries count as flat)
+
+        Returns:
+            Dictionary with equity curve, returns, weights and summary statistics
+        """
+        signals = signals.reindex(index=prices.index, columns=prices.columns)
+        close = prices.to_numpy(dtype=float)
+        asset_returns = np.zeros_like(close)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            asset_returns[1:] = close[1:] / close[:-1] - 1.0
+        asset_returns = np.nan_to_num(asset_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        # Weights decided at bar t are held over bar t + 1
+        weights = self.target_weights(signals.to_numpy(dtype=float))
+        weights[np.isnan(close)] = 0.0  # Cannot hold what has no price
+        held = np.zeros_like(weights)
+        held[1:] = weights[:-1]
+
+        # Trades go from the weights as drifted by bar t's returns, w_{t-1} (1 + r_t) / (1 + w_{t-1}.r_t),
+        # to the new targets, so costs include rebalancing the drift away
+        gross_returns = (held * asset_returns).sum(axis=1)
+        growth = 1.0 + gross_returns
+        drifted = np.divide(held * (1.0 + asset_returns), growth[:, None],
+                            out=np.zeros_like(held), where=growth[:, None] > 0)
+        trades = weights - drifted
+        turnover = np.abs(trades).sum(axis=1)
+        costs = turnover * self.cost_rate
+        # Costs are paid out of the equity after bar t's returns, not the equity at t - 1
+        net_returns = growth * (1.0 - costs) - 1.0
+        equity = self.initial_capital * np.cumprod(1.0 + net_returns)
+
+        stats = self.summary(net_returns, equity, turnover, trades)
+        return {
+            "equity": pd.Series(equity, index=prices.index, name="Equity"),
+            "returns": pd.Series(net_returns, index=prices.index, name="Returns"),
+            "weights": pd.DataFrame(weights, index=prices.index, columns=prices.columns),
+            "turnover": pd.Series(turnover, index=prices.index, name="Turnover"),
+            "stats": stats,
+        }
+
+    def summary(self, returns: np.ndarray, equity: np.ndarray, turnover: np.ndarray, trades: np.ndarray) -> dict:
+        """Summary statistics for a backtest"""
+        periods = len(returns)
+        years = periods / self.periods_per_year if periods else 0.0
+        std = returns.std(ddof=1) if periods > 1 else 0.0
+        costs = turnover * self.cost_rate
+        peaks = np.maximum.accumulate(equity) if periods else equity
+        drawdown = equity / peaks - 1.0 if periods else np.zeros(0)
+        final = float(equity[-1]) if periods else self.initial_capital
+        return {
+            "final_equity": final,
+            "total_return_pct": (final / self.initial_capital - 1.0) * 100,
+            "cagr_pct": ((final / self.initial_capital) ** (1 / years) - 1.0) * 100 if years > 0 and final > 0 else 0.0,
+            "sharpe": float(returns.mean() / std * np.sqrt(self.periods_per_year)) if std > 0 else 0.0,
+            "max_drawdown_pct": float(-drawdown.min() * 100) if periods else 0.0,
+            "annual_turnover": float(turnover.sum() / years) if years > 0 else 0.0,
+            "trades": int(np.count_nonzero(trades)),
+            # Each bar's costs came out of equity / (1 - cost) before they were paid
+            "total_costs": float((equity * costs / (1.0 - costs)).sum()) if periods else 0.0,
+        }
+
+    def sweep(self, prices: pd.DataFrame, signal_fn, param_grid: dict, max_workers: int = None) -> pd.DataFrame:
+        """
+        Run a backtest for every parameter combination in parallel processes.
+
+        Args:
+            prices: Close prices (time x symbols)
+            signal_fn: Module-level function (picklable) called as signal_fn(prices, **params)
+            param_grid: Parameter name -> list of values, e.g. {"fast": [10, 20], "slow": [50, 100]}
+            max_workers: Worker processes (defaults to the CPU count)
+
+        Returns:
+            DataFrame with one row of parameters and statistics per combination, best Sharpe first
+        """
+        names = list(param_grid)
+        combos = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        if not combos:
+            return pd.DataFrame()
+
+        max_workers = min(max_workers or os.cpu_count() or 1, len(combos))
+        # Prices are shipped once per worker process rather than once per job
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                                 initargs=(self, prices, signal_fn)) as pool:
+            stats = list(pool.map(_run_sweep_job, combos, chunksize=max(1, len(combos) // (max_workers * 4))))
+
+        rows = [dict(params, **result) for params, result in zip(combos, stats)]
+        return pd.DataFrame(rows).sort_values("sharpe", ascending=False, ignore_index=True)
+
+
+_sweep_context = {}
+
+
+def _init_sweep_worker(backtester: Backtester, prices: pd.DataFrame, signal_fn):
+    _sweep_context.update(backtester=backtester, prices=prices, signal_fn=signal_fn)
+
+
+def _run_sweep_job(params: dict) -> dict:
+    prices = _sweep_context["prices"]
+    signals = _sweep_context["signal_fn"](prices, **params)
+    return _sweep_context["backtester"].run(prices, signals)["stats"]
+
+
+def load_price_panel(tickers, period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+    """Close prices (time x tickers) from batched downloads, for backtests"""
+    closes = {}
+    for ticker, hist in get_tickers_history(list(tickers), period=period, interval=interval).items():
+        if hist.empty or "Close" not in hist.columns:
+            continue
+        close = hist["Close"]
+        if interval == "1d" and isinstance(close.index, pd.DatetimeIndex) and close.index.tz is not None:
+            # Key daily bars by local date so stock and crypto rows line up
+            close = close.copy()
+            close.index = close.index.tz_localize(None).normalize()
+        closes[ticker] = close
+    return pd.DataFrame(closes).sort_index()
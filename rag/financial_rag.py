@@ -0,0 +1,436 @@
+"""
+Local retrieval index for financial news.
+
+Every fetched RSS entry is appended to docs.jsonl, deduplicated by link. That
+file is the source of truth. Search runs on a BM25 inverted index stored in
+CSR form (term offsets, doc ids, term frequencies) as .npy files that are
+memory-mapped on load. New documents go into a small in-memory delta segment
+that is merged into the on-disk segment once it grows past merge_threshold.
+Optional local embeddings are appended to a float32 file, memory-mapped, and
+mixed into the BM25 scores for hybrid search. Everything runs in-process,
+with no external service.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import calendar
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEWS_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "news_index")
+NEWS_INDEX_DIR = os.getenv("FINBOT_NEWS_INDEX", DEFAULT_NEWS_INDEX_DIR)
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9.$&'-]*[a-z0-9]|[a-z0-9]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+_SEGMENT_ARRAYS = ("term_offsets", "post_docs", "post_tfs", "doc_len")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords (keeps tickers like brk.b and $aapl intact)"""
+    return [token.lstrip("$") for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _link_key(link: str) -> int:
+    """Stable 64-bit key for a link, cheaper to keep in memory than the URL itself"""
+    return int.from_bytes(hashlib.blake2b(link.strip().encode(), digest_size=8).digest(), "little")
+
+
+class LocalEmbedder:
+    """Sentence embeddings from a local sentence-transformers model (normalized float32)"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError("sentence-transformers is required for embeddings: pip install sentence-transformers")
+        self.model = SentenceTransformer(model_name)
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+class NewsIndex:
+    """Incremental BM25 (plus optional embedding) index over news articles with ticker filters"""
+
+    def __init__(self, path: str = NEWS_INDEX_DIR, embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 k1: float = 1.5, b: float = 0.75, merge_threshold: int = 2000):
+        """
+        Args:
+            path: Directory for the index files
+            embedder: Callable mapping texts to normalized vectors, enables hybrid search
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            merge_threshold: Delta documents kept in memory before merging into the disk segment
+        """
+        self.path = path
+        self.embedder = embedder
+        self.k1 = k1
+        self.b = b
+        self.merge_threshold = merge_threshold
+        self._lock = threading.RLock()
+        self._load()
+
+    # Loading and persistence
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._vocab: Dict[str, int] = {}
+        self._segment_docs = 0
+        self._segment = None
+        meta_path = self._file("segment.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self._vocab = {term: i for i, term in enumerate(meta["vocab"])}
+            self._segment_docs = meta["n_docs"]
+            self._segment = {name: np.load(self._file(f"{name}.npy"), mmap_mode="r") for name in _SEGMENT_ARRAYS}
+
+        self._offsets: List[int] = []            # Byte offset of each document in docs.jsonl
+        self._published: List[float] = []
+        self._links: Dict[int, int] = {}         # Link key -> doc id
+        self._doc_tags: List[tuple] = []         # Tickers per doc id
+        self._tickers: Dict[str, List[int]] = {} # Ticker -> doc ids
+        self._ticker_arrays: Dict[str, np.ndarray] = {}
+        self._delta: Dict[int, List] = {}        # Term id -> [(doc id, tf), ...] for unmerged docs
+        self._delta_len: List[int] = []
+
+        docs_path = self._file("docs.jsonl")
+        if os.path.exists(docs_path):
+            with open(docs_path, "rb") as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if "tag" in record:
+                            self._tag(record["tag"], record["tickers"])
+                        else:
+                            self._register(record, offset)
+                    offset += len(line)
+
+        self._embeddings = None
+        if self.embedder is not None:
+            self._load_embeddings()
+        logger.info(f"News index loaded: {len(self._offsets)} articles ({len(self._delta_len)} unmerged)")
+
+    def _register(self, record: Dict, offset: int) -> int:
+        """Add a stored document to the in-memory structures (and the delta segment if unmerged)"""
+        doc_id = len(self._offsets)
+        self._offsets.append(offset)
+        self._published.append(record.get("published") or 0.0)
+        self._links[_link_key(record["link"])] = doc_id
+        self._doc_tags.append(())
+        self._tag(doc_id, record.get("tickers", []))
+        if doc_id >= self._segment_docs:
+            self._index_delta(doc_id, record.get("title", "") + " " + record.get("summary", ""))
+        return doc_id
+
+    def _tag(self, doc_id: int, tickers: Iterable[str]) -> List[str]:
+        """Tag a document with tickers, returns the tags it did not have yet"""
+        new_tags = [t for t in dict.fromkeys(t.upper() for t in tickers) if t not in self._doc_tags[doc_id]]
+        if new_tags:
+            self._doc_tags[doc_id] += tuple(new_tags)
+            for ticker in new_tags:
+                self._tickers.setdefault(ticker, []).append(doc_id)
+                self._ticker_arrays.pop(ticker, None)
+        return new_tags
+
+    def _index_delta(self, doc_id: int, text: str):
+        tokens = tokenize(text)
+        self._delta_len.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            term_id = self._vocab.setdefault(term, len(self._vocab))
+            self._delta.setdefault(term_id, []).append((doc_id, tf))
+
+    def _load_embeddings(self):
+        """Memory-map stored embeddings, embedding any documents stored before the embedder was set"""
+        emb_path = self._file("embeddings.f32")
+        stored = os.path.getsize(emb_path) // 4 // self._embedding_dim() if os.path.exists(emb_path) else 0
+        missing = range(stored, len(self._offsets))
+        if len(missing):
+            docs = self.get_documents(list(missing))
+            for start in range(0, len(docs), 256):
+                batch = docs[start:start + 256]
+                self._append_embeddings([d["title"] + " " + d.get("summary", "") for d in batch])
+        self._map_embeddings()
+
+    def _embedding_dim(self) -> int:
+        dim_path = self._file("embeddings.json")
+        if os.path.exists(dim_path):
+            with open(dim_path) as f:
+                return json.load(f)["dim"]
+        dim = int(self.embedder(["dimension probe"]).shape[1])
+        with open(dim_path, "w") as f:
+            json.dump({"dim": dim}, f)
+        return dim
+
+    def _append_embeddings(self, texts: List[str]):
+        vectors = np.ascontiguousarray(self.embedder(texts), dtype=np.float32)
+        with open(self._file("embeddings.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+
+    def _map_embeddings(self):
+        emb_path = self._file("embeddings.f32")
+        dim = self._embedding_dim()
+        rows = os.path.getsize(emb_path) // 4 // dim if os.path.exists(emb_path) else 0
+        self._embeddings = np.memmap(emb_path, dtype=np.float32, mode="r", shape=(rows, dim)) if rows else None
+
+    # Ingestion
+
+    def add(self, title: str, link: str, summary: str = "", published: Optional[float] = None,
+            tickers: Iterable[str] = ()) -> bool:
+        """Add one article. Returns False if the link is already indexed (its tickers are still merged)."""
+        return self.add_many([{"title": title, "link": link, "summary": summary,
+                               "published": published, "tickers": list(tickers)}]) == 1
+
+    def add_entries(self, entries: Iterable, ticker: Optional[str] = None) -> int:
+        """
+        Add feedparser entries, tagged with the ticker whose feed they came from.
+
+        Returns:
+            Number of new articles
+        """
+        records = []
+        for entry in entries:
+            link = entry.get("link")
+            if not link:
+                continue
+            parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+            records.append({
+                "title": entry.get("title", ""),
+                "link": link,
+                "summary": re.sub(r"<[^>]+>", " ", entry.get("summary", "")).strip(),
+                "published": float(calendar.timegm(parsed)) if parsed else time.time(),
+                "tickers": [ticker.upper()] if ticker else [],
+            })
+        return self.add_many(records)
+
+    def add_many(self, records: List[Dict]) -> int:
+        """Add article dicts (title, link, summary, published, tickers), skipping known links"""
+        with self._lock:
+            lines, new_records, batch_links = [], [], set()
+            for record in records:
+                key = _link_key(record["link"])
+                tickers = [t.upper() for t in record.get("tickers") or []]
+                existing = self._links.get(key)
+                if existing is not None:
+                    # Known article seen in another ticker's feed: just add the new tags
+                    new_tags = self._tag(existing, tickers)
+                    if new_tags:
+                        lines.append(json.dumps({"tag": existing, "tickers": new_tags}))
+                    continue
+                if key in batch_links:
+                    continue
+                batch_links.add(key)
+                new_records.append(dict(record, tickers=tickers))
+
+            with open(self._file("docs.jsonl"), "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                for line in lines:
+                    f.write(line.encode() + b"\n")
+                    offset += len(line.encode()) + 1
+                for record in new_records:
+                    encoded = json.dumps(record).encode() + b"\n"
+                    f.write(encoded)
+                    self._register(record, offset)
+                    offset += len(encoded)
+
+            if new_records and self.embedder is not None:
+                self._append_embeddings([r["title"] + " " + r.get("summary", "") for r in new_records])
+                self._map_embeddings()
+
+            if len(self._delta_len) >= self.merge_threshold:
+                self.commit()
+            return len(new_records)
+
+    def commit(self):
+        """Merge the delta segment into the on-disk CSR segment (written atomically)"""
+        with self._lock:
+            if not self._delta_len:
+                return
+            n_docs = len(self._offsets)
+            vocab_size = len(self._vocab)
+
+            # Expand both segments to (term, doc, tf) triplets and re-sort by term
+            terms, docs, tfs = [], [], []
+            if self._segment is not None:
+                offsets = np.asarray(self._segment["term_offsets"])
+                counts = np.diff(offsets)
+                terms.append(np.repeat(np.arange(len(counts), dtype=np.int32), counts))
+                docs.append(np.asarray(self._segment["post_docs"]))
+                tfs.append(np.asarray(self._segment["post_tfs"]))
+            for term_id, postings in self._delta.items():
+                array = np.asarray(postings, dtype=np.int64).reshape(-1, 2)
+                terms.append(np.full(len(array), term_id, dtype=np.int32))
+                docs.append(array[:, 0].astype(np.int32))
+                tfs.append(array[:, 1].astype(np.uint16))
+            terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+            order = np.lexsort((docs, terms))
+            term_offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=vocab_size), out=term_offsets[1:])
+
+            doc_len = np.concatenate([
+                np.asarray(self._segment["doc_len"]) if self._segment is not None else np.zeros(0, dtype=np.float32),
+                np.asarray(self._delta_len, dtype=np.float32),
+            ])
+            arrays = {"term_offsets": term_offsets, "post_docs": docs[order], "post_tfs": tfs[order], "doc_len": doc_len}
+
+            # Release the old memory maps before replacing the files
+            self._segment = None
+            for name, array in arrays.items():
+                tmp = self._file(f"{name}.tmp.npy")
+                np.save(tmp, array)
+                os.replace(tmp, self._file(f"{name}.npy"))
+            vocab = sorted(self._vocab, key=self._vocab.get)
+            tmp = self._file("segment.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"n_docs": n_docs, "vocab": vocab}, f)
+            os.replace(tmp, self._file("segment.json"))
+
+            self._segment = {name: np.load(self._file(f"{name}.npy"), mmap_mode="r") for name in _SEGMENT_ARRAYS}
+            self._segment_docs = n_docs
+            self._delta, self._delta_len = {}, []
+            logger.info(f"News index segment rebuilt: {n_docs} articles, {len(vocab)} terms")
+
+    # Queries
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _ticker_docs(self, ticker: str) -> np.ndarray:
+        ticker = ticker.upper()
+        array = self._ticker_arrays.get(ticker)
+        if array is None:
+            array = np.asarray(self._tickers.get(ticker, []), dtype=np.int64)
+            self._ticker_arrays[ticker] = array
+        return array
+
+    def _bm25(self, tokens: List[str], n_docs: int) -> np.ndarray:
+        """BM25 scores for every document (dense, float64)"""
+        scores = np.zeros(n_docs)
+        if not tokens:
+            return scores
+        segment_len = np.asarray(self._segment["doc_len"]) if self._segment is not None else np.zeros(0)
+        doc_len = np.concatenate([segment_len, np.asarray(self._delta_len, dtype=float)])
+        avg_len = doc_len.mean() if len(doc_len) else 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / max(avg_len, 1e-9))
+
+        for term, query_tf in Counter(tokens).items():
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                continue
+            parts_docs, parts_tfs = [], []
+            if self._segment is not None and term_id + 1 < len(self._segment["term_offsets"]):
+                start, end = self._segment["term_offsets"][term_id], self._segment["term_offsets"][term_id + 1]
+                parts_docs.append(np.asarray(self._segment["post_docs"][start:end], dtype=np.int64))
+                parts_tfs.append(np.asarray(self._segment["post_tfs"][start:end], dtype=float))
+            delta = self._delta.get(term_id)
+            if delta:
+                array = np.asarray(delta, dtype=np.int64).reshape(-1, 2)
+                parts_docs.append(array[:, 0])
+                parts_tfs.append(array[:, 1].astype(float))
+            if not parts_docs:
+                continue
+            docs = np.concatenate(parts_docs)
+            tf = np.concatenate(parts_tfs)
+            df = len(docs)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            weights = query_tf * idf * tf * (self.k1 + 1.0) / (tf + norm[docs])
+            scores += np.bincount(docs, weights=weights, minlength=n_docs)
+        return scores
+
+    def search(self, query: str, ticker: Optional[str] = None, k: int = 10, hybrid_weight: float = 0.5,
+               since: Optional[float] = None) -> List[Dict]:
+        """
+        Top-k articles for a query.
+
+        Args:
+            query: Free text
+            ticker: Only articles tagged with this ticker
+            k: Number of results
+            hybrid_weight: Weight of embedding similarity against normalized BM25 (needs an embedder)
+            since: Only articles published at or after this Unix timestamp
+
+        Returns:
+            Article dicts (title, link, summary, published, tickers) with a score, best first
+        """
+        with self._lock:
+            n_docs = len(self._offsets)
+            if n_docs == 0:
+                return []
+            scores = self._bm25(tokenize(query), n_docs)
+
+            if self.embedder is not None and self._embeddings is not None and hybrid_weight > 0:
+                peak = scores.max()
+                if peak > 0:
+                    scores /= peak
+                query_vector = self.embedder([query])[0].astype(np.float32)
+                rows = self._embeddings.shape[0]
+                scores[:rows] += hybrid_weight * (self._embeddings @ query_vector)
+
+            mask = scores > 0
+            if ticker:
+                allowed = np.zeros(n_docs, dtype=bool)
+                allowed[self._ticker_docs(ticker)] = True
+                mask &= allowed
+            if since is not None:
+                mask &= np.asarray(self._published) >= since
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            results = self.get_documents(candidates.tolist())
+            for result, doc_id in zip(results, candidates):
+                result["score"] = float(scores[doc_id])
+            return results
+
+    def latest(self, ticker: Optional[str] = None, k: int = 10) -> List[Dict]:
+        """Most recently published articles, optionally for one ticker"""
+        with self._lock:
+            published = np.asarray(self._published)
+            docs = self._ticker_docs(ticker) if ticker else np.arange(len(published))
+            if len(docs) > k:
+                docs = docs[np.argpartition(-published[docs], k - 1)[:k]]
+            docs = docs[np.argsort(-published[docs], kind="stable")]
+            return self.get_documents(docs.tolist())
+
+    def get_documents(self, doc_ids: List[int]) -> List[Dict]:
+        """Load stored articles by id (seeks into docs.jsonl, nothing else is kept in memory)"""
+        results = []
+        with open(self._file("docs.jsonl"), "rb") as f:
+            for doc_id in doc_ids:
+                f.seek(self._offsets[doc_id])
+                record = json.loads(f.readline())
+                record["tickers"] = list(self._doc_tags[doc_id])
+                results.append(record)
+        return results
+
+
+_news_index: Optional[NewsIndex] = None
+_news_index_lock = threading.Lock()
+
+
+def get_news_index() -> NewsIndex:
+    """Shared index instance, loaded on first use"""
+    global _news_index
+    with _news_index_lock:
+        if _news_index is None:
+            _news_index = NewsIndex()
+        return _news_index
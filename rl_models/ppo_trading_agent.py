@@ -0,0 +1,308 @@
+"""
+NumPy trading environments for PPO.
+
+OHLCV histories are turned into float32 feature arrays once, and observation
+windows are strided views into them, so a step is a few array lookups with
+no pandas indexing. VecTradingEnv steps many (ticker, start) episodes at once
+with whole-array operations. TradingEnv is the single-episode Gym interface
+over the same engine.
+
+gymnasium and stable-baselines3 are optional. Without gymnasium, the
+environments still work with the same reset/step API. With
+stable-baselines3, VecTradingEnv is a drop-in VecEnv for PPO.
+"""
+import time
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data import indicators
+from utils.yfinance_helper import get_tickers_history
+
+try:
+    import gymnasium as gym
+    from gymnasium import spaces
+    GYM_AVAILABLE = True
+except ImportError:
+    gym = None
+    spaces = None
+    GYM_AVAILABLE = False
+
+try:
+    from stable_baselines3.common.vec_env import VecEnv
+    SB3_AVAILABLE = True
+except ImportError:
+    VecEnv = object
+    SB3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = ["log_return", "close_sma20", "close_sma50", "rsi", "volume_ratio", "range", "atr"]
+WARMUP_BARS = 50  # Bars needed before SMA 50 is defined
+
+# Discrete actions map to target positions
+ACTIONS = {0: "flat", 1: "long", 2: "short"}
+ACTION_POSITIONS = np.array([0.0, 1.0, -1.0], dtype=np.float32)
+
+Dataset = Tuple[np.ndarray, np.ndarray]  # (features (T, F) float32, close (T,) float64)
+
+
+def build_features(data: pd.DataFrame) -> Dataset:
+    """
+    Scale-free features for one OHLCV history, computed once up front.
+
+    Returns:
+        (features shaped (bars, len(FEATURE_NAMES)) as float32, close prices)
+        with the indicator warm-up bars removed
+    """
+    close = data["Close"].to_numpy(dtype=float)
+    high = data["High"].to_numpy(dtype=float) if "High" in data.columns else close
+    low = data["Low"].to_numpy(dtype=float) if "Low" in data.columns else close
+    volume = data["Volume"].to_numpy(dtype=float) if "Volume" in data.columns else np.ones_like(close)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_return = np.zeros_like(close)
+        log_return[1:] = np.log(close[1:] / close[:-1])
+        features = np.column_stack([
+            log_return,
+            close / indicators.sma(close, 20)[:, 0] - 1.0,
+            close / indicators.sma(close, 50)[:, 0] - 1.0,
+            indicators.rsi(close)[:, 0] / 100.0 - 0.5,
+            np.clip(np.log(volume / indicators.sma(volume, 20)[:, 0]), -5.0, 5.0),
+            (high - low) / close,
+            indicators.atr(high, low, close)[:, 0] / close,
+        ])
+    features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+    return features[WARMUP_BARS:], close[WARMUP_BARS:]
+
+
+def load_datasets(tickers: Sequence[str], period: str = "5y", interval: str = "1d",
+                  min_bars: int = 200) -> Dict[str, Dataset]:
+    """Feature arrays per ticker from batched (cached) downloads"""
+    datasets = {}
+    for ticker, hist in get_tickers_history(list(tickers), period=period, interval=interval).items():
+        if len(hist) < min_bars + WARMUP_BARS:
+            logger.warning(f"Skipping {ticker}: only {len(hist)} bars of history")
+            continue
+        datasets[ticker] = build_features(hist)
+    return datasets
+
+
+class VecTradingEnv(VecEnv):
+    """
+    Many trading episodes stepped together.
+
+    Environment i trades dataset i % len(datasets). The reward for each step is the
+    position's log return over the next bar minus trading costs. Episodes end at the
+    end of the data (terminated) or after episode_length steps (truncated), and are
+    reset automatically.
+    """
+
+    def __init__(self, datasets: Sequence[Dataset], n_envs: int = 8, window: int = 30, fee_bps: float = 10.0,
+                 episode_length: Optional[int] = 252, random_start: bool = True, seed: Optional[int] = None):
+        """
+        Args:
+            datasets: (features, close) pairs, e.g. from build_features() or load_datasets().values()
+            n_envs: Number of parallel episodes
+            window: Bars of features in each observation
+            fee_bps: Cost per unit of position change in basis points
+            episode_length: Steps before an episode is truncated (None runs to the end of the data)
+            random_start: Start episodes at random bars instead of the first one (needs episode_length)
+            seed: Random seed for start positions
+        """
+        datasets = list(datasets)
+        if not datasets:
+            raise ValueError("At least one dataset is required")
+        lengths = np.array([len(close) for _, close in datasets])
+        if lengths.min() <= window + 1:
+            raise ValueError(f"Every dataset needs more than {window + 1} bars")
+
+        n_features = datasets[0][0].shape[1]
+        max_len = int(lengths.max())
+        # Pad into one (datasets, time, features) block so any env's window is a single index
+        self._features = np.zeros((len(datasets), max_len, n_features), dtype=np.float32)
+        self._log_returns = np.zeros((len(datasets), max_len), dtype=np.float32)
+        for k, (features, close) in enumerate(datasets):
+            self._features[k, :len(close)] = features
+            self._log_returns[k, :len(close) - 1] = np.log(close[1:] / close[:-1])
+        # Strided view: windows[k, t] is the window ending at bar t + window - 1 (no copy)
+        self._windows = np.lib.stride_tricks.sliding_window_view(self._features, window, axis=1)
+
+        self.window = window
+        self.fee = fee_bps / 10_000
+        self.episode_length = episode_length
+        self.random_start = random_start
+        self._lengths = lengths
+        self._rng = np.random.default_rng(seed)
+
+        self.num_envs = n_envs
+        self.obs_size = window * n_features + 1
+        self._dataset = np.arange(n_envs) % len(datasets)
+        self._t = np.zeros(n_envs, dtype=np.int64)
+        self._steps = np.zeros(n_envs, dtype=np.int64)
+        self._position = np.zeros(n_envs, dtype=np.float32)
+        self._equity = np.ones(n_envs)
+        self._actions = np.zeros(n_envs, dtype=np.int64)
+
+        if GYM_AVAILABLE:
+            self.observation_space = spaces.Box(-np.inf, np.inf, shape=(self.obs_size,), dtype=np.float32)
+            self.action_space = spaces.Discrete(len(ACTIONS))
+            if SB3_AVAILABLE:
+                super().__init__(n_envs, self.observation_space, self.action_space)
+
+    def _reset_envs(self, mask: np.ndarray):
+        """Start new episodes for the masked envs"""
+        count = int(mask.sum())
+        if not count:
+            return
+        first = self.window - 1
+        last = self._lengths[self._dataset[mask]] - 2  # Need one more bar for the reward
+        if self.episode_length:
+            last = np.maximum(first, last - self.episode_length)
+        if self.random_start and self.episode_length:
+            self._t[mask] = first + (self._rng.random(count) * (last - first + 1)).astype(np.int64)
+        else:
+            self._t[mask] = first
+        self._steps[mask] = 0
+        self._position[mask] = 0.0
+        self._equity[mask] = 1.0
+
+    def _observe(self, envs: Optional[np.ndarray] = None) -> np.ndarray:
+        envs = np.arange(self.num_envs) if envs is None else envs
+        windows = self._windows[self._dataset[envs], self._t[envs] - self.window + 1]  # (n, features, window)
+        obs = np.empty((len(envs), self.obs_size), dtype=np.float32)
+        obs[:, :-1] = windows.transpose(0, 2, 1).reshape(len(envs), -1)
+        obs[:, -1] = self._position[envs]
+        return obs
+
+    def reset(self) -> np.ndarray:
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._observe()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        obs, rewards, terminated, truncated, infos = self.step_arrays(self._actions)
+        dones = terminated | truncated
+        if dones.any():
+            # VecEnv convention: return the first observation of the next episode, keep the last one in info
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i]
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+            self._reset_envs(dones)
+            obs[dones] = self._observe(np.flatnonzero(dones))
+        return obs, rewards, dones, infos
+
+    def step(self, actions):
+        """Step every env (auto-resets finished episodes). Returns (obs, rewards, dones, infos)."""
+        self.step_async(actions)
+        return self.step_wait()
+
+    def step_arrays(self, actions: np.ndarray):
+        """Step without resetting. Returns (obs, rewards, terminated, truncated, infos)."""
+        new_position = ACTION_POSITIONS[actions]
+        costs = self.fee * np.abs(new_position - self._position)
+        rewards = new_position * self._log_returns[self._dataset, self._t] - costs
+
+        self._position = new_position
+        self._equity *= np.exp(rewards)
+        self._t += 1
+        self._steps += 1
+
+        terminated = self._t >= self._lengths[self._dataset] - 1
+        truncated = np.zeros(self.num_envs, dtype=bool) if not self.episode_length else self._steps >= self.episode_length
+        infos = [{"equity": float(self._equity[i]), "position": float(self._position[i])} for i in range(self.num_envs)]
+        return self._observe(), rewards.astype(np.float32), terminated, truncated, infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed: Optional[int] = None):
+        self._rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._indices(indices))
+
+    def _indices(self, indices) -> List[int]:
+        if indices is None:
+            return list(range(self.num_envs))
+        return [indices] if isinstance(indices, int) else list(indices)
+
+
+class TradingEnv(gym.Env if GYM_AVAILABLE else object):
+    """Single trading episode with the Gym API, backed by a one-env VecTradingEnv"""
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, features: np.ndarray, close: np.ndarray, window: int = 30, fee_bps: float = 10.0,
+                 episode_length: Optional[int] = 252, random_start: bool = True):
+        self._core = VecTradingEnv([(features, close)], n_envs=1, window=window, fee_bps=fee_bps,
+                                   episode_length=episode_length, random_start=random_start)
+        if GYM_AVAILABLE:
+            self.observation_space = self._core.observation_space
+            self.action_space = self._core.action_space
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None):
+        if seed is not None:
+            self._core.seed(seed)
+        return self._core.reset()[0], {}
+
+    def step(self, action):
+        obs, rewards, terminated, truncated, infos = self._core.step_arrays(np.array([action]))
+        return obs[0], float(rewards[0]), bool(terminated[0]), bool(truncated[0]), infos[0]
+
+
+def benchmark(env, steps: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """
+    Measure environment throughput with random actions.
+
+    Returns:
+        Dictionary with steps per second (counting every parallel env step)
+    """
+    rng = np.random.default_rng(seed)
+    vectorized = isinstance(env, VecTradingEnv)
+    n_envs = env.num_envs if vectorized else 1
+    calls = max(1, steps // n_envs)
+
+    env.reset()
+    start = time.perf_counter()
+    if vectorized:
+        for _ in range(calls):
+            env.step(rng.integers(0, len(ACTIONS), n_envs))
+    else:
+        for _ in range(calls):
+            _, _, terminated, truncated, _ = env.step(int(rng.integers(0, len(ACTIONS))))
+            if terminated or truncated:
+                env.reset()
+    elapsed = time.perf_counter() - start
+    return {"envs": n_envs, "steps": calls * n_envs, "seconds": elapsed, "steps_per_sec": calls * n_envs / elapsed}
+
+
+def _synthetic_history(bars: int, rng: np.random.Generator) -> pd.DataFrame:
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, bars)))
+    return pd.DataFrame({
+        "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.lognormal(12, 0.4, bars),
+    })
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    data = [build_features(_synthetic_history(2500, rng)) for _ in range(32)]
+    print(f"single env:  {benchmark(TradingEnv(*data[0]))['steps_per_sec']:,.0f} steps/s")
+    for n_envs in (8, 64, 256):
+        result = benchmark(VecTradingEnv(data, n_envs=n_envs), steps=500_000)
+        print(f"{n_envs:>3} envs:    {result['steps_per_sec']:,.0f} steps/s")
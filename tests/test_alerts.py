@@ -0,0 +1,36 @@
+from utils.alerts import ABOVE, BELOW, MOVE, AlertBook
+
+KEY = ("stocks", "AAPL")
+
+
+def test_level_rules_record_the_side_on_the_first_quote():
+    book = AlertBook()
+    book.add_rule(1, "stocks", "AAPL", ABOVE, 250.0)
+    book.add_rule(2, "stocks", "AAPL", BELOW, 260.0)
+
+    # Already above 250 and below 260: nothing has been crossed yet
+    assert book.evaluate({KEY: 255.0}) == {}
+    assert book.evaluate({KEY: 256.0}) == {}
+
+    # The below rule needs the price to come back down through 260 first
+    assert book.evaluate({KEY: 261.0}) == {}
+    assert book.evaluate({KEY: 259.0}) == {2: ["📈 AAPL: €259.00 crossed below €260.00"]}
+
+
+def test_level_rules_fire_on_a_later_crossing():
+    book = AlertBook()
+    book.add_rule(1, "stocks", "AAPL", ABOVE, 250.0)
+    book.add_rule(2, "stocks", "AAPL", BELOW, 240.0)
+
+    assert book.evaluate({KEY: 245.0}) == {}
+    assert book.evaluate({KEY: 251.0}) == {1: ["📈 AAPL: €251.00 crossed above €250.00"]}
+    assert book.evaluate({KEY: 252.0}) == {}
+    assert book.evaluate({KEY: 239.0}) == {2: ["📈 AAPL: €239.00 crossed below €240.00"]}
+
+
+def test_move_rules_seed_on_the_first_quote():
+    book = AlertBook()
+    book.add_rule(1, "stocks", "AAPL", MOVE, 1.0)
+
+    assert book.evaluate({KEY: 100.0}) == {}
+    assert book.evaluate({KEY: 102.0}) == {1: ["📈 AAPL: €102.00 (+2.00% since last alert)"]}
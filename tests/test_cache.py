@@ -0,0 +1,66 @@
+import time
+
+import pandas as pd
+
+from utils import yfinance_helper
+from utils.cache import BoundedTTLCache, estimate_size
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = BoundedTTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_byte_limit_evicts_until_the_new_entry_fits():
+    frame = pd.DataFrame({"Close": range(1000)}, dtype=float)
+    size = estimate_size(frame)
+    cache = BoundedTTLCache(max_entries=100, max_bytes=int(size * 2.5))
+    for key in ("a", "b", "c"):
+        cache.set(key, frame)
+
+    assert cache.keys() == ["b", "c"]
+    assert cache.stats()["bytes"] == 2 * size
+
+    cache.set("huge", pd.concat([frame] * 3))
+    assert "huge" not in cache.keys()
+
+
+def test_expired_entries_are_served_stale_only_within_max_stale():
+    cache = BoundedTTLCache(ttl=10, max_stale=20)
+    cache.set("a", 1)
+    value, _, size = cache._entries["a"]
+
+    cache._entries["a"] = (value, time.time() - 15, size)
+    assert cache.get("a") is None
+    assert cache.get("a", allow_expired=True) == 1
+
+    cache._entries["a"] = (value, time.time() - 31, size)
+    assert cache.get("a", allow_expired=True) is None
+    assert cache.keys() == []
+    assert cache.expirations == 1
+
+
+def test_cached_fetch_counts_each_read_once(monkeypatch):
+    cache = BoundedTTLCache(ttl=10, max_stale=60)
+    monkeypatch.setattr(yfinance_helper, "_cache", cache)
+    refreshes = []
+    monkeypatch.setattr(yfinance_helper, "_refresh_in_background", lambda key, fetch: refreshes.append(key))
+
+    def fetch():
+        cache.set("k", "value")
+        return "value"
+
+    assert yfinance_helper._cached_fetch("k", fetch) == "value"
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    value, _, size = cache._entries["k"]
+    cache._entries["k"] = (value, time.time() - 15, size)
+    assert yfinance_helper._cached_fetch("k", fetch) == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert refreshes == ["k"]
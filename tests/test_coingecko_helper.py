@@ -0,0 +1,58 @@
+import pytest
+
+from utils import coingecko_helper
+from utils.cache import BoundedTTLCache
+from utils.coingecko_helper import MAX_IDS_LENGTH, MAX_IDS_PER_REQUEST, _chunk_ids, get_crypto_quotes
+from utils.rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Fresh cache and limiter, and a fake simple/price endpoint recording each request"""
+    calls = []
+
+    def get_price(ids, vs_currencies, include_24hr_change):
+        calls.append(ids.split(","))
+        return {coin: {vs_currencies: 1.0, f"{vs_currencies}_24h_change": 2.5}
+                for coin in ids.split(",") if coin != "unlisted"}
+
+    monkeypatch.setattr(coingecko_helper, "_cache", BoundedTTLCache(max_entries=100, ttl=60))
+    monkeypatch.setattr(coingecko_helper, "_limiter", TokenBucket("test", rate=1000, burst=1000))
+    monkeypatch.setattr(coingecko_helper.cg, "get_price", get_price)
+    return calls
+
+
+def test_chunks_respect_count_and_length_limits():
+    short = [f"c{i}" for i in range(600)]
+    assert [len(chunk) for chunk in _chunk_ids(short)] == [MAX_IDS_PER_REQUEST, MAX_IDS_PER_REQUEST, 100]
+
+    long = [f"coin-{i:04d}-" + "x" * 40 for i in range(100)]
+    chunks = _chunk_ids(long)
+    assert sum(chunks, []) == long
+    assert all(len(",".join(chunk)) <= MAX_IDS_LENGTH for chunk in chunks)
+
+
+def test_one_request_per_chunk_and_cached_coins_are_skipped(api):
+    quotes = get_crypto_quotes(["bitcoin", "ethereum", "Bitcoin", "unlisted"])
+
+    assert api == [["bitcoin", "ethereum", "unlisted"]]
+    assert quotes == {"bitcoin": {"price": 1.0, "change_24h": 2.5}, "ethereum": {"price": 1.0, "change_24h": 2.5}}
+
+    get_crypto_quotes(["bitcoin", "solana"])
+    assert api[1:] == [["solana"]]
+
+
+def test_failed_chunk_does_not_drop_the_others(api, monkeypatch):
+    monkeypatch.setattr(coingecko_helper, "MAX_IDS_PER_REQUEST", 2)
+    fake = coingecko_helper.cg.get_price
+
+    def flaky(ids, **kwargs):
+        if "cardano" in ids:
+            raise ConnectionError("connection reset")
+        return fake(ids, **kwargs)
+
+    monkeypatch.setattr(coingecko_helper.cg, "get_price", flaky)
+
+    quotes = get_crypto_quotes(["bitcoin", "ethereum", "cardano", "solana", "ripple"])
+
+    assert sorted(quotes) == ["bitcoin", "ethereum", "ripple"]
@@ -0,0 +1,25 @@
+import feedparser
+
+from data import fetch_news
+
+
+def _feed(entries, **fields):
+    feed = feedparser.FeedParserDict(fields)
+    feed["entries"] = [feedparser.FeedParserDict(entry) for entry in entries]
+    return feed
+
+
+def test_failed_first_fetch_is_not_cached(monkeypatch):
+    fetch_news.clear_news_cache()
+    responses = [
+        _feed([], bozo=True, bozo_exception="connection reset"),
+        _feed([{"title": "Earnings beat", "link": "https://example.com/a"}], status=200),
+    ]
+    monkeypatch.setattr(fetch_news.feedparser, "parse", lambda url, **kwargs: responses.pop(0))
+    monkeypatch.setattr(fetch_news, "get_news_index", lambda: type("Index", (), {"add_entries": lambda *a: None})())
+
+    assert fetch_news.fetch_feed("ZZZT") == []
+    assert fetch_news._news_cache.get("ZZZT", allow_expired=True) is None
+
+    assert fetch_news.get_finance_news("ZZZT") == [("Earnings beat", "https://example.com/a")]
+    fetch_news.clear_news_cache()
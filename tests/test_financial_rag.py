@@ -0,0 +1,86 @@
+import math
+from collections import Counter
+
+from rag.financial_rag import NewsIndex, tokenize
+
+ARTICLES = [
+    ("Apple earnings beat estimates", "iPhone sales lift Apple revenue", ["AAPL"]),
+    ("Apple faces EU fine", "Regulators fine Apple over app store rules", ["AAPL"]),
+    ("Microsoft cloud growth", "Azure revenue beats estimates again", ["MSFT"]),
+    ("Chip stocks rally", "Nvidia and AMD lead semiconductor earnings rally", ["NVDA", "AMD"]),
+    ("Fed holds rates", "Markets await guidance on rate cuts", []),
+]
+
+
+def _reference_bm25(query, docs, k1=1.5, b=0.75):
+    """Textbook BM25 over tokenized documents"""
+    lengths = [len(doc) for doc in docs]
+    avg_len = sum(lengths) / len(lengths)
+    scores = [0.0] * len(docs)
+    for term, query_tf in Counter(tokenize(query)).items():
+        df = sum(term in doc for doc in docs)
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+        for i, doc in enumerate(docs):
+            tf = doc.count(term)
+            scores[i] += query_tf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[i] / avg_len))
+    return scores
+
+
+def _build(path, merge_threshold=2000):
+    index = NewsIndex(str(path), merge_threshold=merge_threshold)
+    for i, (title, summary, tickers) in enumerate(ARTICLES):
+        index.add(title, f"https://news.example/{i}", summary, published=1000.0 + i, tickers=tickers)
+    return index
+
+
+def _expected(query):
+    docs = [tokenize(title + " " + summary) for title, summary, _ in ARTICLES]
+    scores = _reference_bm25(query, docs)
+    ranked = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: -scores[i])
+    return [ARTICLES[i][0] for i in ranked], [scores[i] for i in ranked]
+
+
+def _check(index, query):
+    titles, scores = _expected(query)
+    results = index.search(query, k=len(ARTICLES))
+    assert [r["title"] for r in results] == titles
+    for result, score in zip(results, scores):
+        assert math.isclose(result["score"], score, rel_tol=1e-9)
+
+
+def test_ranking_matches_bm25_in_delta_segment_and_after_reload(tmp_path):
+    index = _build(tmp_path)
+    for query in ("apple fine", "revenue estimates", "earnings"):
+        _check(index, query)
+
+    index.commit()
+    for query in ("apple fine", "revenue estimates", "earnings"):
+        _check(index, query)
+
+    reloaded = NewsIndex(str(tmp_path))
+    assert len(reloaded) == len(ARTICLES)
+    _check(reloaded, "apple fine")
+
+
+def test_mixed_segments_score_like_one_index(tmp_path):
+    # Two articles merged to disk, the rest still in the delta segment
+    index = _build(tmp_path, merge_threshold=2)
+    assert 0 < index._segment_docs < len(ARTICLES)
+    _check(index, "revenue estimates")
+
+
+def test_ticker_filter_and_duplicate_links(tmp_path):
+    index = _build(tmp_path)
+
+    assert [r["title"] for r in index.search("revenue", ticker="aapl")] == ["Apple earnings beat estimates"]
+    assert index.search("azure", ticker="AAPL") == []
+
+    # Seeing a known article in another ticker's feed only adds the tag
+    assert not index.add("Microsoft cloud growth", "https://news.example/2", tickers=["AMZN"])
+    assert len(index) == len(ARTICLES)
+    assert [r["tickers"] for r in index.search("azure", ticker="AMZN")] == [["MSFT", "AMZN"]]
+    assert NewsIndex(str(tmp_path)).search("azure", ticker="AMZN")[0]["tickers"] == ["MSFT", "AMZN"]
+
+    assert [r["title"] for r in index.latest(k=2)] == ["Fed holds rates", "Chip stocks rally"]
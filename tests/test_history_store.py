@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from utils import history_store as history_store_module
+from utils.history_store import HistoryStore
+
+
+def _bars(start, closes):
+    index = pd.date_range(start, periods=len(closes), freq="D", tz="America/New_York", name="Date")
+    return pd.DataFrame({"Close": closes, "Volume": [1000.0] * len(closes)}, index=index)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    if not store.enabled:
+        pytest.skip("history store disabled (pyarrow missing or FINBOT_HISTORY_STORE=0)")
+    return store
+
+
+def test_append_replaces_the_overlapping_bar_and_persists(store):
+    store.save("AAPL", "1d", _bars("2024-01-01", [1.0, 2.0, 3.0]))
+    merged = store.append("AAPL", "1d", _bars("2024-01-03", [3.5, 4.0]))
+
+    assert merged["Close"].tolist() == [1.0, 2.0, 3.5, 4.0]
+    pd.testing.assert_frame_equal(store.load("AAPL", "1d"), merged, check_freq=False)
+
+
+def test_failed_write_leaves_the_stored_file_intact(store, monkeypatch):
+    original = _bars("2024-01-01", [1.0, 2.0, 3.0])
+    store.save("AAPL", "1d", original)
+
+    def broken_write(table, path):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(history_store_module.pq, "write_table", broken_write)
+    store.append("AAPL", "1d", _bars("2024-01-04", [4.0]))
+
+    pd.testing.assert_frame_equal(store.load("AAPL", "1d"), original, check_freq=False)
+
+
+def test_changed_overlap_is_reported_as_a_new_adjustment(store):
+    stored = _bars("2024-01-01", [10.0, 20.0, 30.0, 40.0])
+    assert not store.adjustment_changed(stored, _bars("2024-01-02", [20.0, 30.0, 41.0]))
+    # A 2:1 split halves every earlier close
+    assert store.adjustment_changed(stored, _bars("2024-01-02", [10.0, 15.0, 20.0]))
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from data.indicators import INDICATOR_COLUMNS, add_indicators, clear_indicator_cache
+
+
+def _history(n=120, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    return pd.DataFrame({"Close": close}, index=pd.bdate_range("2024-01-01", periods=n))
+
+
+def test_incremental_update_matches_a_cold_computation():
+    clear_indicator_cache()
+    full = _history()
+    add_indicators(full.iloc[:100], ticker="AAA", period="6mo")
+    warm = add_indicators(full, ticker="AAA", period="6mo")
+
+    cold = add_indicators(full)
+    pd.testing.assert_frame_equal(warm[INDICATOR_COLUMNS], cold[INDICATOR_COLUMNS])
+
+
+def test_correction_inside_the_reused_prefix_forces_a_rebuild():
+    clear_indicator_cache()
+    full = _history()
+    add_indicators(full.iloc[:100], ticker="AAA", period="6mo")
+
+    corrected = full.copy()
+    corrected.iloc[60, 0] *= 1.1  # Provider correction well before the last committed bar
+    warm = add_indicators(corrected, ticker="AAA", period="6mo")
+
+    cold = add_indicators(corrected)
+    pd.testing.assert_frame_equal(warm[INDICATOR_COLUMNS], cold[INDICATOR_COLUMNS])
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from agents import market_watch
+from agents.market_watch import MarketScanner
+
+
+def _history(rng, n=80, gap=0.0, volume_spike=1.0):
+    dates = pd.date_range("2024-01-01", periods=n, freq="D", tz="America/New_York")
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    open_ = close * (1 + rng.normal(0.0, 0.001, n))
+    open_[-1] = close[-2] * (1 + gap / 100)
+    volume = np.full(n, 1e6)
+    volume[-1] *= volume_spike
+    return pd.DataFrame({"Open": open_, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": volume},
+                        index=dates)
+
+
+def test_refresh_tolerates_duplicated_bars(monkeypatch):
+    rng = np.random.default_rng(5)
+    hist = _history(rng)
+    duplicated = pd.concat([hist, hist.iloc[[-1]]])
+    monkeypatch.setattr(market_watch, "get_tickers_history",
+                        lambda symbols, period, interval: {"AAA": duplicated, "BBB": _history(rng)})
+
+    scanner = MarketScanner(universe=["AAA", "BBB"], rules={"sma_cross": None})
+    scanner.refresh()
+
+    assert scanner.panel["Close"].index.is_unique
+    assert scanner.panel["Close"]["AAA"].iloc[-1] == hist["Close"].iloc[-1]
+
+
+def test_scan_scores_are_comparable_across_rules(monkeypatch):
+    rng = np.random.default_rng(5)
+    histories = {f"S{i}": _history(rng) for i in range(10)}
+    histories["GAP"] = _history(rng, gap=8.0)
+    histories["VOL"] = _history(rng, volume_spike=3.0)
+    monkeypatch.setattr(market_watch, "get_tickers_history", lambda symbols, period, interval: histories)
+
+    scanner = MarketScanner(universe=list(histories), rules={"rsi_oversold": None, "rsi_overbought": None,
+                                                            "sma_cross": None})
+    scanner.refresh()
+    hits = scanner.scan()
+
+    assert {"GAP", "VOL"} <= set(hits["Symbol"])
+    assert hits["Score"].between(0.0, 1.0, inclusive="right").all()
+    top = hits.set_index("Symbol")["Score"]
+    assert top["GAP"] == top["VOL"] == 1.0
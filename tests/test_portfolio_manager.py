@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from agents.portfolio_manager import PortfolioRebalancer, risk_parity_weights
+
+
+def test_risk_parity_equalises_contributions_with_mixed_correlations():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        factors = rng.normal(size=(8, 8))
+        cov = factors @ factors.T + 0.1 * np.eye(8)
+        vol = np.sqrt(np.diag(cov))
+        assert ((cov / np.outer(vol, vol)) < 0).any()
+
+        weights, _ = risk_parity_weights(cov)
+        contributions = weights * (cov @ weights) / (weights @ cov @ weights)
+
+        assert np.isclose(weights.sum(), 1.0)
+        assert (weights > 0).all()
+        np.testing.assert_allclose(contributions, 1.0 / 8, atol=1e-8)
+
+
+def test_risk_parity_respects_max_weight():
+    cov = np.diag([0.01, 0.04, 0.09, 0.16, 0.25])
+    weights, _ = risk_parity_weights(cov, max_weight=0.3)
+    assert np.isclose(weights.sum(), 1.0)
+    assert weights.max() <= 0.3 + 1e-12
+
+
+def test_rebalance_keeps_holdings_without_enough_history():
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range("2024-01-01", periods=250)
+    prices = pd.DataFrame(100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, size=(250, 3)), axis=0)),
+                          index=dates, columns=["AAA", "BBB", "CCC"])
+    prices.iloc[:150, 2] = np.nan
+    holdings = pd.DataFrame({"Ticker": ["AAA", "BBB", "CCC"], "Quantity": [10.0, 10.0, 5.0]})
+
+    trades, summary = PortfolioRebalancer().rebalance(holdings, objective="min_variance", prices=prices)
+    trades = {t["Ticker"]: t for t in trades}
+
+    assert summary["excluded"] == ["CCC"]
+    assert trades["CCC"]["Side"] == "HOLD"
+    assert trades["CCC"]["Target Qty"] == 5.0
+    kept_value = 5.0 * prices["CCC"].iloc[-1]
+    assert trades["AAA"]["Target Qty"] * trades["AAA"]["Price"] + trades["BBB"]["Target Qty"] * trades["BBB"]["Price"] \
+        <= summary["total_value"] - kept_value + 1e-9
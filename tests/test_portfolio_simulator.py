@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from data.portfolio_simulator import Backtester, sma_crossover_signals
+
+
+def _prices(n=120, symbols=("AAA", "BBB"), seed=3):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(n, len(symbols)))
+    index = pd.date_range("2024-01-01", periods=n, freq="B")
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index, columns=list(symbols))
+
+
+def _loop_backtest(prices, weights, cost_rate, capital):
+    """Bar-by-bar reference: hold shares, rebalance to target at each close, pay costs on traded notional"""
+    close = prices.to_numpy(dtype=float)
+    shares = np.zeros(close.shape[1])
+    cash = capital
+    equity, costs = [], 0.0
+    for t in range(len(close)):
+        value = cash + shares @ close[t]
+        traded = np.abs(weights[t] * value - shares * close[t]).sum()
+        value -= traded * cost_rate
+        costs += traded * cost_rate
+        shares = weights[t] * value / close[t]
+        cash = value - shares @ close[t]
+        equity.append(value)
+    return np.array(equity), costs
+
+
+def test_costs_follow_drifted_weights_like_a_share_ledger():
+    prices = _prices()
+    signals = pd.DataFrame(1.0, index=prices.index, columns=prices.columns)
+    signals.iloc[40:60, 0] = 0.0
+    backtester = Backtester(initial_capital=10_000, fee_bps=10, slippage_bps=5)
+
+    result = backtester.run(prices, signals)
+
+    weights = result["weights"].to_numpy()
+    expected, costs = _loop_backtest(prices, weights, backtester.cost_rate, 10_000)
+    np.testing.assert_allclose(result["equity"].to_numpy(), expected, rtol=1e-12)
+    assert np.isclose(result["stats"]["total_costs"], costs, rtol=1e-9)
+
+
+def test_buy_and_hold_trades_once():
+    prices = _prices(symbols=("AAA",))
+    signals = pd.DataFrame(1.0, index=prices.index, columns=prices.columns)
+
+    result = Backtester(fee_bps=10, slippage_bps=0).run(prices, signals)
+
+    turnover = result["turnover"].to_numpy()
+    assert np.isclose(turnover[0], 1.0)
+    np.testing.assert_allclose(turnover[1:], 0.0, atol=1e-12)
+    expected = 10_000 * (1 - 0.001) * prices["AAA"].iloc[-1] / prices["AAA"].iloc[0]
+    assert np.isclose(result["stats"]["final_equity"], expected)
+
+
+def test_signal_is_held_over_the_next_bar_only():
+    prices = pd.DataFrame({"AAA": [100.0, 110.0, 121.0, 60.5]})
+    signals = pd.DataFrame({"AAA": [0.0, 1.0, 0.0, 0.0]})
+
+    result = Backtester(fee_bps=0, slippage_bps=0).run(prices, signals)
+
+    # Long from bar 1's close to bar 2's close only: the +10% at bar 1 and -50% at bar 3 are missed
+    np.testing.assert_allclose(result["returns"].to_numpy(), [0.0, 0.0, 0.1, 0.0])
+
+
+def test_sweep_matches_single_runs():
+    prices = _prices(n=200)
+    backtester = Backtester()
+
+    table = backtester.sweep(prices, sma_crossover_signals, {"fast": [5, 10], "slow": [30, 50]}, max_workers=2)
+
+    assert len(table) == 4
+    assert table["sharpe"].is_monotonic_decreasing
+    for row in table.itertuples():
+        single = backtester.run(prices, sma_crossover_signals(prices, fast=row.fast, slow=row.slow))["stats"]
+        assert np.isclose(row.final_equity, single["final_equity"])
@@ -0,0 +1,46 @@
+from utils.rate_limiter import TokenBucket, worker_budget
+
+
+def test_worker_budget_splits_rates_across_workers():
+    budget = {"rate": 1.0, "burst": 5, "min_rate": 0.1, "max_rate": 2.0}
+
+    share = worker_budget(budget, num_workers=4)
+
+    assert share == {"rate": 0.25, "burst": 1, "min_rate": 0.025, "max_rate": 0.5}
+    assert worker_budget(budget, num_workers=1) == budget
+
+
+def test_rate_halves_on_429_and_recovers_additively():
+    bucket = TokenBucket("test", rate=1.0, burst=2, min_rate=0.2, max_rate=1.0, recovery=0.1)
+
+    bucket.on_rate_limited()
+    assert bucket.rate == 0.5
+    assert bucket.stats()["paused_for"] > 0
+
+    # Other requests of the same burst hitting 429 don't back off again
+    bucket.on_rate_limited()
+    assert bucket.rate == 0.5
+    assert bucket.rate_limited == 2
+
+    for _ in range(3):
+        bucket.on_success()
+    assert abs(bucket.rate - 0.8) < 1e-9
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 1.0
+
+
+def test_rate_never_drops_below_min_rate():
+    bucket = TokenBucket("test", rate=1.0, min_rate=0.3)
+    for _ in range(5):
+        bucket._paused_until = 0.0  # Each 429 in a separate burst
+        bucket.on_rate_limited()
+    assert bucket.rate == 0.3
+
+
+def test_burst_goes_through_then_callers_wait_their_turn():
+    bucket = TokenBucket("test", rate=10.0, burst=3)
+    waits = [bucket._reserve(1.0) for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.09 < waits[3] < 0.11 and 0.19 < waits[4] < 0.21
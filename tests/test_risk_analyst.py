@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from agents.risk_analyst import monte_carlo, tail_loss
+
+
+def test_monte_carlo_var_is_a_non_negative_loss_with_positive_drift():
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.normal(0.002, 0.01, size=(250, 2)), columns=["A", "B"])
+
+    result = monte_carlo(returns, np.array([0.5, 0.5]), value=1000.0, n_paths=2000, horizon=252, seed=1)
+
+    assert result["prob_loss"] < 0.05
+    assert result["cvar"] >= result["var"] >= 0.0
+    assert result["cvar_value"] >= result["var_value"] >= 0.0
+
+
+def test_monte_carlo_cvar_exceeds_var_when_the_tail_loses():
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.normal(0.0, 0.02, size=(250, 2)), columns=["A", "B"])
+
+    result = monte_carlo(returns, np.array([0.5, 0.5]), value=1000.0, n_paths=2000, horizon=60, seed=1)
+
+    assert 0.0 < result["var"] <= result["cvar"]
+
+
+def test_tail_loss_averages_the_worst_paths():
+    pnl = -np.arange(100) / 100.0
+
+    tail = tail_loss(pnl, 0.95)
+
+    assert np.isclose(tail["var"], 0.9405)
+    assert np.isclose(tail["cvar"], np.mean([0.99, 0.98, 0.97, 0.96, 0.95]))
+
+
+def test_tail_loss_keeps_a_tail_when_few_paths_lose():
+    # 3 losing paths out of 1,000, the 5% tail is the worst 50
+    pnl = np.full(1000, 0.05)
+    pnl[:3] = [-0.1, -0.2, -0.3]
+
+    tail = tail_loss(pnl, 0.95)
+
+    assert tail["var"] == 0.0 and str(tail["var"]) == "0.0"
+    assert np.isclose(tail["cvar"], 0.6 / 50)
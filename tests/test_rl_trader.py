@@ -0,0 +1,15 @@
+import pandas as pd
+import pytest
+
+from agents import rl_trader
+from agents.rl_trader import RLTrader
+
+
+@pytest.mark.parametrize("history", [pd.DataFrame(), pd.DataFrame({"Open": [1.0, 2.0]})])
+def test_predict_rejects_a_ticker_without_prices(monkeypatch, history):
+    monkeypatch.setattr(rl_trader, "get_ticker_history", lambda ticker, period, interval: history)
+    trader = RLTrader(["AAPL"])
+    trader.model = object()  # Never reached
+
+    with pytest.raises(ValueError, match="No price history for TYPO"):
+        trader.predict("TYPO")
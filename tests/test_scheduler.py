@@ -0,0 +1,54 @@
+import os
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from utils.scheduler import ShardedMonitor, shard_for
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_shards_are_stable_across_processes():
+    users = [123456789, 987654321, 42]
+    code = f"from utils.scheduler import shard_for; print([shard_for(u, 4) for u in {users}])"
+    other = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert other.stdout.strip() == str([shard_for(u, 4) for u in users])
+
+
+def test_every_user_is_owned_by_exactly_one_worker():
+    monitors = [ShardedMonitor(worker_id=i, num_workers=3, interval=60) for i in range(3)]
+    users = range(100_000, 103_000)
+
+    owners = [[m.owns(user) for m in monitors].count(True) for user in users]
+    shares = [sum(m.owns(user) for user in users) for m in monitors]
+
+    assert set(owners) == {1}
+    assert min(shares) > 800
+    assert [m.first_delay(base=0) for m in monitors] == [0.0, 20.0, 40.0]
+
+
+def test_rejects_worker_id_outside_the_pool():
+    with pytest.raises(ValueError):
+        ShardedMonitor(worker_id=2, num_workers=2)
+
+
+def test_overlapping_cycle_is_skipped_and_errors_counted():
+    monitor = ShardedMonitor(worker_id=0, num_workers=1, interval=60)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def main():
+        await asyncio.gather(monitor.run(slow), monitor.run(slow))
+        await monitor.run(failing)
+
+    asyncio.run(main())
+
+    stats = monitor.stats()
+    assert (stats["cycles"], stats["skipped"], stats["errors"]) == (2, 1, 1)
+    assert not monitor.running
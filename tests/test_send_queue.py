@@ -0,0 +1,62 @@
+import time
+import asyncio
+
+from telegram.error import Forbidden, RetryAfter
+
+from utils.send_queue import TelegramSendQueue
+
+
+class FakeBot:
+    """Records delivery times and fails with the queued errors first"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+async def _deliver(queue, bot, messages):
+    await queue.start(bot)
+    started = time.monotonic()
+    for chat_id, text in messages:
+        queue.enqueue(chat_id, text)
+    await asyncio.wait_for(queue._queue.join(), timeout=10)
+    await queue.stop()
+    return started
+
+
+def test_retry_after_pauses_all_sends_and_requeues():
+    queue = TelegramSendQueue(global_rate=1000, per_chat_interval=0, workers=1)
+    bot = FakeBot(errors=[RetryAfter(1)])
+
+    started = asyncio.run(_deliver(queue, bot, [(1, "a"), (2, "b"), (3, "c")]))
+
+    assert queue.flood_waits == 1
+    assert queue.sent == 3 and queue.failed == 0
+    # Other chats wait for the pause too, and the rejected message goes back in the queue
+    assert [text for _, text, _ in bot.sent] == ["b", "c", "a"]
+    assert all(at - started >= 0.9 for _, _, at in bot.sent)
+
+
+def test_gives_up_after_max_retries():
+    queue = TelegramSendQueue(global_rate=1000, per_chat_interval=0, workers=1, max_retries=2)
+    bot = FakeBot(errors=[RetryAfter(0), RetryAfter(0)])
+
+    asyncio.run(_deliver(queue, bot, [(1, "a")]))
+
+    assert queue.flood_waits == 2
+    assert queue.sent == 0 and queue.failed == 1
+
+
+def test_forbidden_is_dropped_without_retry():
+    queue = TelegramSendQueue(global_rate=1000, per_chat_interval=0, workers=1)
+    bot = FakeBot(errors=[Forbidden("bot was blocked by the user")])
+
+    asyncio.run(_deliver(queue, bot, [(1, "a"), (2, "b")]))
+
+    assert queue.failed == 1
+    assert [text for _, text, _ in bot.sent] == ["b"]
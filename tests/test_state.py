@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from utils.state import WatchlistStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rows_on_disk(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT user_id, market, symbol FROM watchlist").fetchall()
+    finally:
+        conn.close()
+
+
+def test_reverse_index_follows_watch_and_unwatch(tmp_path):
+    store = WatchlistStore(str(tmp_path / "state.db"), flush_interval=0.01)
+    store.add(1, "stocks", "AAPL")
+    store.add(2, "stocks", "AAPL")
+    store.add(2, "crypto", "bitcoin")
+
+    assert store.subscribers("stocks", "AAPL") == {1, 2}
+    assert store.symbols("crypto") == ["bitcoin"]
+
+    store.remove(1, "stocks", "AAPL")
+    store.remove(2, "crypto", "bitcoin")
+    assert store.subscribers("stocks", "AAPL") == {2}
+    assert store.symbols("crypto") == []
+
+    # Rebuilt from disk the same way
+    assert store.refresh()
+    assert store.subscribers("stocks", "AAPL") == {2}
+    store.close()
+
+
+def test_workers_backfilling_the_same_rule_store_it_once(tmp_path):
+    path = str(tmp_path / "state.db")
+    workers = [WatchlistStore(path, flush_interval=0.01) for _ in range(2)]
+    for store in workers:
+        store.add_alert(1, "stocks", "AAPL", "move", 1.0)
+        store.add_alert(1, "stocks", "AAPL", "sma20", None)
+        store.flush()
+
+    assert workers[0].refresh()
+    assert workers[0].alerts() == [(1, "stocks", "AAPL", "move", 1.0), (1, "stocks", "AAPL", "sma20", None)]
+    for store in workers:
+        store.close()
+
+
+def test_writes_are_served_from_memory_and_flushed_in_the_background(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = WatchlistStore(path, flush_interval=0.2)
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    store.add(1, "stocks", "AAPL")
+    store.add(1, "stocks", "MSFT")
+    store.remove(1, "stocks", "MSFT")
+    assert store.get_watchlist(1) == {"stocks": ["AAPL"], "crypto": []}
+    assert _rows_on_disk(path) == []  # Still waiting for the writer's batch
+
+    deadline = time.time() + 5
+    while not _rows_on_disk(path) and time.time() < deadline:
+        time.sleep(0.05)
+    assert _rows_on_disk(path) == [(1, "stocks", "AAPL")]
+    store.close()
+
+
+def test_refresh_if_changed_picks_up_another_process(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = WatchlistStore(path, flush_interval=0.01)
+    store.add(1, "stocks", "AAPL")
+    store.flush()
+    # Our own write doesn't need a reload
+    assert not store.refresh_if_changed()
+
+    subprocess.run([sys.executable, "-c", (
+        "from utils.state import WatchlistStore\n"
+        f"store = WatchlistStore({path!r})\n"
+        "store.add(2, 'crypto', 'bitcoin')\n"
+        "store.close()\n"
+    )], cwd=ROOT, check=True)
+
+    assert store.refresh_if_changed()
+    assert store.subscribers("crypto", "bitcoin") == {2}
+    assert store.get_watchlist(1) == {"stocks": ["AAPL"], "crypto": []}
+    assert not store.refresh_if_changed()
+    store.close()
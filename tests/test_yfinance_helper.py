@@ -0,0 +1,38 @@
+import pytest
+
+from utils import yfinance_helper
+from utils.circuit_breaker import CircuitBreaker
+from utils.yfinance_helper import NoDataError, _guarded
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test")
+    monkeypatch.setattr(yfinance_helper, "_breaker", breaker)
+    return breaker
+
+
+def _fail(error):
+    def fetch():
+        raise error
+    return fetch
+
+
+def test_empty_answer_during_an_outage_is_not_held_against_the_symbol(breaker):
+    with pytest.raises(NoDataError):
+        _guarded("AAPL", _fail(NoDataError("Empty history returned for AAPL")))
+    assert breaker.states() == {}
+
+
+def test_empty_answer_counts_while_other_symbols_succeed(breaker):
+    assert _guarded("AAPL", lambda: "bars") == "bars"
+    with pytest.raises(NoDataError):
+        _guarded("TYPO", _fail(NoDataError("Empty history returned for TYPO")))
+    assert breaker.states()["TYPO"]["failures"] == 1
+
+
+def test_request_errors_are_not_held_against_the_symbol(breaker):
+    _guarded("AAPL", lambda: "bars")
+    with pytest.raises(ConnectionError):
+        _guarded("MSFT", _fail(ConnectionError("connection reset")))
+    assert breaker.states() == {}
@@ -22,11 +22,8 @@ def render_metric_card(label, value, delta=None, prefix="", suffix="", help_text
         help=help_text
     )
 
-def plot_price_chart(data, ticker, show_sma_20=True, show_sma_50=True):
-    if data.empty or 'Close' not in data.columns:
-        st.error("No data available for chart.")
-        return
-
+def build_price_chart(data, ticker, show_sma_20=True, show_sma_50=True):
+    """Price chart figure (pure, so the data layer can cache it)"""
     fig = go.Figure()
 
     # Candlestick if OHLC available, else Line
@@ -77,7 +74,15 @@ def plot_price_chart(data, ticker, show_sma_20=True, show_sma_50=True):
         hovermode='x unified',
         margin=dict(l=20, r=20, t=40, b=20)
     )
-    
+    return fig
+
+def plot_price_chart(data, ticker, show_sma_20=True, show_sma_50=True, fig=None):
+    if data.empty or 'Close' not in data.columns:
+        st.error("No data available for chart.")
+        return
+
+    if fig is None:
+        fig = build_price_chart(data, ticker, show_sma_20, show_sma_50)
     st.plotly_chart(fig, use_container_width=True)
 
 def plot_portfolio_allocation(df):
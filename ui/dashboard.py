@@ -9,10 +9,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from ui.styles import apply_styles
 from ui.components import render_header, render_metric_card, plot_price_chart, plot_portfolio_allocation
+from ui.data_layer import (
+    load_quote, load_history, load_price_chart, load_news, load_news_search,
+    load_portfolio, load_risk, clear_dashboard_cache
+)
 from data.portfolio_simulator import PortfolioManager
-from data.historical_charts import get_historical_data
-from data.fetch_news import get_finance_news
-from utils.yfinance_helper import get_ticker_info, clear_cache
+from agents.portfolio_manager import PortfolioRebalancer
+from data.fetch_news import clear_news_cache
+from utils.yfinance_helper import clear_cache, get_breaker_states
 
 # Page Config
 st.set_page_config(page_title="FinBot360 Pro", page_icon="📈", layout="wide")
@@ -28,8 +32,15 @@ def main():
     st.sidebar.markdown("---")
     if st.sidebar.button("🔄 Clear Cache"):
         clear_cache()
+        clear_news_cache()
+        clear_dashboard_cache()
         st.sidebar.success("Cache cleared!")
 
+    breakers = get_breaker_states()
+    if breakers:
+        with st.sidebar.expander(f"⚠️ Failing symbols ({len(breakers)})"):
+            st.dataframe(pd.DataFrame.from_dict(breakers, orient="index").round({"retry_in": 0}), use_container_width=True)
+
     # Main Header
     render_header()
 
@@ -46,32 +57,27 @@ def render_market_analysis():
     if ticker:
         try:
             with st.spinner(f"Analyzing {ticker}..."):
-                info = get_ticker_info(ticker)
+                quote = load_quote(ticker)
                 
-                if info:
+                if quote:
                     # Top Metrics Row
                     m1, m2, m3, m4 = st.columns(4)
                     
-                    price = info.get('currentPrice') or info.get('regularMarketPrice')
-                    prev = info.get('previousClose')
-                    
-                    if price and prev:
-                        delta = price - prev
-                        delta_pct = (delta / prev) * 100
-                        with m1:
-                            render_metric_card("Price", f"${price:,.2f}", f"{delta:+.2f} ({delta_pct:+.2f}%)")
+                    with m1:
+                        delta = f"{quote.change:+.2f} ({quote.change_pct:+.2f}%)" if quote.previous_close else None
+                        render_metric_card("Price", f"${quote.price:,.2f}", delta)
                     
                     with m2:
-                        mkt_cap = info.get('marketCap')
+                        mkt_cap = quote.market_cap
                         val = f"${mkt_cap/1e9:.2f}B" if mkt_cap else "N/A"
                         render_metric_card("Market Cap", val)
                         
                     with m3:
-                        pe = info.get('trailingPE')
+                        pe = quote.trailing_pe
                         render_metric_card("P/E Ratio", f"{pe:.2f}" if pe else "N/A")
                         
                     with m4:
-                        vol = info.get('volume')
+                        vol = quote.volume
                         val = f"{vol/1e6:.1f}M" if vol else "N/A"
                         render_metric_card("Volume", val)
 
@@ -80,11 +86,14 @@ def render_market_analysis():
                     
                     with tab1:
                         period = st.select_slider("Period", options=["1mo", "3mo", "6mo", "1y", "5y"], value="6mo")
-                        hist_data = get_historical_data(ticker, period=period)
-                        plot_price_chart(hist_data, ticker)
+                        hist_data = load_history(ticker, period=period)
+                        plot_price_chart(hist_data, ticker, fig=load_price_chart(ticker, period=period))
                         
                     with tab2:
-                        news = get_finance_news(ticker)
+                        news = load_news(ticker)
+                        query = st.text_input("Search past news", key=f"news_search_{ticker}")
+                        if query:
+                            news = load_news_search(query, ticker=ticker)
                         if news:
                             for title, link in news:
                                 st.markdown(f"""
@@ -126,9 +135,8 @@ def render_portfolio_tracker():
 
     if st.button("Analyze Portfolio", type="primary"):
         if not edited_df.empty:
-            pm = PortfolioManager()
             with st.spinner("Calculating portfolio performance..."):
-                results, summary = pm.calculate_portfolio(edited_df)
+                results, summary = load_portfolio(edited_df)
             
             # Summary Cards
             c1, c2, c3, c4 = st.columns(4)
@@ -159,5 +167,78 @@ def render_portfolio_tracker():
                         hide_index=True
                     )
 
+            # Risk figures
+            st.divider()
+            st.subheader("Risk")
+            with st.spinner("Running risk analysis..."):
+                risk = load_risk(results)
+            if risk:
+                r1, r2, r3, r4, r5 = st.columns(5)
+                with r1:
+                    render_metric_card("1-Day VaR (95%)", f"${risk['historical_var'] * risk['value']:,.2f}",
+                                       help_text=f"Parametric: ${risk['parametric_var'] * risk['value']:,.2f}")
+                with r2:
+                    render_metric_card("1-Day CVaR (95%)", f"${risk['historical_cvar'] * risk['value']:,.2f}",
+                                       help_text=f"Parametric: ${risk['parametric_cvar'] * risk['value']:,.2f}")
+                with r3:
+                    render_metric_card("Volatility (ann.)", f"{risk['volatility'] * 100:.1f}%")
+                with r4:
+                    render_metric_card("Beta (SPY)", f"{risk['beta']:.2f}" if risk['beta'] is not None else "N/A")
+                with r5:
+                    render_metric_card("Max Drawdown", f"{risk['max_drawdown'] * 100:.1f}%",
+                                       help_text=f"Current drawdown: {risk['current_drawdown'] * 100:.1f}%")
+
+                mc = risk.get("monte_carlo")
+                if mc:
+                    m1, m2, m3, m4 = st.columns(4)
+                    with m1:
+                        render_metric_card("1-Year MC VaR (95%)", f"${mc['var_value']:,.2f}")
+                    with m2:
+                        render_metric_card("1-Year MC CVaR (95%)", f"${mc['cvar_value']:,.2f}")
+                    with m3:
+                        render_metric_card("Median 1-Year Value", f"${mc['p50']:,.2f}",
+                                           help_text=f"5th-95th percentile: ${mc['p05']:,.2f} - ${mc['p95']:,.2f}")
+                    with m4:
+                        render_metric_card("Chance of Loss", f"{mc['prob_loss'] * 100:.1f}%")
+            else:
+                st.info("Not enough price history for risk figures.")
+
+    # Rebalancing
+    with st.expander("Rebalance"):
+        objectives = {"Minimum Variance": "min_variance", "Maximum Sharpe": "max_sharpe", "Risk Parity": "risk_parity"}
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            objective = st.selectbox("Objective", list(objectives))
+        with c2:
+            max_weight = st.slider("Max weight per asset", 0.05, 1.0, 1.0, 0.05)
+        with c3:
+            cash = st.number_input("Cash to invest ($)", min_value=0.0, value=0.0, step=100.0)
+
+        if st.button("Suggest Trades") and not edited_df.empty:
+            # Keep the rebalancer between reruns so each optimization warm-starts from the last one
+            rebalancer = st.session_state.setdefault("rebalancer", PortfolioRebalancer())
+            rebalancer.max_weight = max_weight
+            with st.spinner("Optimizing portfolio..."):
+                try:
+                    trades, rebalance_summary = rebalancer.rebalance(edited_df, objective=objectives[objective], cash=cash)
+                except ValueError as e:
+                    st.error(f"Could not optimize portfolio: {e}")
+                    trades = None
+            if trades:
+                r1, r2, r3 = st.columns(3)
+                with r1:
+                    render_metric_card("Buys", f"${rebalance_summary['buy_value']:,.2f}")
+                with r2:
+                    render_metric_card("Sells", f"${rebalance_summary['sell_value']:,.2f}")
+                with r3:
+                    render_metric_card("Cash After", f"${rebalance_summary['cash_after']:,.2f}")
+                if rebalance_summary["excluded"]:
+                    st.info(f"Not enough price history to optimize {', '.join(rebalance_summary['excluded'])}, kept as they are.")
+                st.dataframe(
+                    pd.DataFrame(trades)[['Ticker', 'Side', 'Trade Qty', 'Price', 'Trade Value', 'Current Weight', 'Target Weight']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,170 @@
+"""
+Dashboard data layer.
+
+Streamlit reruns the whole script on every widget change. These wrappers cache
+results across reruns and sessions with st.cache_data, keyed on their arguments
+(ticker, period, interval), with TTLs matched to how fast each kind of data
+changes. Switching tabs or moving the period slider back is then served from
+memory. Shared services, including the background news poller, are created
+once per process with st.cache_resource.
+"""
+import pandas as pd
+import streamlit as st
+
+from data.historical_charts import get_historical_data
+from data.fetch_news import get_finance_news, search_news, start_news_poller, watch_news
+from data.portfolio_simulator import PortfolioManager
+from agents.risk_analyst import RiskAnalyst
+from utils.yfinance_helper import get_quote
+from ui.components import build_price_chart
+
+QUOTE_TTL = 30            # Price, volume and market cap from the batched quote endpoint
+INTRADAY_HISTORY_TTL = 60
+DAILY_HISTORY_TTL = 900   # Daily bars only change once the session closes
+NEWS_TTL = 60             # The news pipeline keeps its own feed cache, this only skips rerun work
+PORTFOLIO_TTL = 60
+RISK_TTL = 900
+
+INTRADAY_INTERVALS = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+
+
+@st.cache_resource
+def get_portfolio_manager():
+    return PortfolioManager()
+
+
+@st.cache_resource
+def get_risk_analyst():
+    return RiskAnalyst()
+
+
+@st.cache_resource
+def get_news_poller():
+    """Polls the feeds of viewed tickers in the background, so news is fresh before it is opened"""
+    return start_news_poller()
+
+
+class _NoQuote(LookupError):
+    """Raised inside the cached loader, st.cache_data does not store exceptions"""
+
+
+@st.cache_data(ttl=QUOTE_TTL, max_entries=512, show_spinner=False)
+def _load_quote(ticker):
+    quote = get_quote(ticker)
+    if quote is None:
+        raise _NoQuote(ticker)
+    return quote
+
+
+def load_quote(ticker):
+    """Quote for a ticker or None; a failed lookup is retried on the next rerun instead of cached"""
+    try:
+        return _load_quote(ticker)
+    except _NoQuote:
+        return None
+
+
+@st.cache_data(ttl=INTRADAY_HISTORY_TTL, max_entries=256, show_spinner=False)
+def _load_intraday_history(ticker, period, interval):
+    return get_historical_data(ticker, period=period, interval=interval)
+
+
+@st.cache_data(ttl=DAILY_HISTORY_TTL, max_entries=512, show_spinner=False)
+def _load_daily_history(ticker, period, interval):
+    return get_historical_data(ticker, period=period, interval=interval)
+
+
+def load_history(ticker, period="1mo", interval="1d"):
+    """History with indicators; intraday bars expire sooner than daily ones"""
+    if interval in INTRADAY_INTERVALS:
+        return _load_intraday_history(ticker, period, interval)
+    return _load_daily_history(ticker, period, interval)
+
+
+@st.cache_data(ttl=INTRADAY_HISTORY_TTL, max_entries=128, show_spinner=False)
+def _load_intraday_chart(ticker, period, interval):
+    return build_price_chart(_load_intraday_history(ticker, period, interval), ticker)
+
+
+@st.cache_data(ttl=DAILY_HISTORY_TTL, max_entries=256, show_spinner=False)
+def _load_daily_chart(ticker, period, interval):
+    return build_price_chart(_load_daily_history(ticker, period, interval), ticker)
+
+
+def load_price_chart(ticker, period="1mo", interval="1d"):
+    """Price chart figure, built once per (ticker, period, interval)"""
+    if interval in INTRADAY_INTERVALS:
+        return _load_intraday_chart(ticker, period, interval)
+    return _load_daily_chart(ticker, period, interval)
+
+
+@st.cache_data(ttl=NEWS_TTL, max_entries=512, show_spinner=False)
+def _load_news(ticker, limit):
+    return get_finance_news(ticker, limit=limit)
+
+
+def load_news(ticker, limit=5):
+    """Latest news for a ticker, which the poller then keeps refreshing"""
+    get_news_poller()
+    watch_news([ticker])
+    return _load_news(ticker, limit)
+
+
+@st.cache_data(ttl=NEWS_TTL, max_entries=256, show_spinner=False)
+def load_news_search(query, ticker=None, k=10):
+    return search_news(query, ticker=ticker, k=k)
+
+
+@st.cache_data(ttl=PORTFOLIO_TTL, max_entries=64, show_spinner=False)
+def load_portfolio(holdings_df: pd.DataFrame):
+    return get_portfolio_manager().calculate_portfolio(holdings_df)
+
+
+# Monte Carlo dollar figures, they scale linearly with the portfolio value at fixed weights
+_MONTE_CARLO_VALUE_KEYS = ("var_value", "cvar_value", "expected_value", "p05", "p50", "p95")
+
+
+@st.cache_data(ttl=RISK_TTL, max_entries=64, show_spinner=False)
+def _load_risk(holdings, period):
+    """Risk figures for (ticker, quantity) holdings, valued at the last daily close"""
+    records = [{"Ticker": ticker, "Quantity": quantity} for ticker, quantity in holdings]
+    return get_risk_analyst().analyze(records)
+
+
+def load_risk(portfolio_data):
+    """
+    Risk figures for calculate_portfolio() records (includes the Monte Carlo run).
+
+    The analysis is cached on (ticker, quantity) and the history window only, so
+    live price ticks and cost basis edits don't rerun it; dollar figures are
+    rescaled to the live value of the same tickers. If any of them has no live
+    value, the figures stay at the last daily close.
+    """
+    records = pd.DataFrame(portfolio_data)
+    if records.empty or "Ticker" not in records.columns:
+        return {}
+    holdings = tuple(sorted(
+        (str(ticker), float(quantity)) for ticker, quantity in zip(records["Ticker"], records["Quantity"])
+    ))
+    risk = _load_risk(holdings, get_risk_analyst().period)
+    if not risk or "Market Value" not in records.columns or not risk.get("value"):
+        return risk
+
+    # Only tickers the analysis valued (holdings without history or a close are not in it)
+    valued = {ticker for ticker, weight in risk.get("weights", {}).items() if weight > 0}
+    covered = records[records["Ticker"].isin(valued)]
+    live = pd.to_numeric(covered["Market Value"], errors="coerce")
+    if set(covered["Ticker"]) != valued or live.isna().any() or live.sum() <= 0:
+        return risk
+    scale = float(live.sum()) / risk["value"]
+    risk["value"] *= scale
+    monte_carlo = risk.get("monte_carlo")
+    if monte_carlo:
+        for key in _MONTE_CARLO_VALUE_KEYS:
+            monte_carlo[key] *= scale
+    return risk
+
+
+def clear_dashboard_cache():
+    """Drop every cached dashboard result (the shared resources are kept)"""
+    st.cache_data.clear()
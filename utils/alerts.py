@@ -0,0 +1,247 @@
+"""
+Change-driven price alerts evaluated in one vectorized pass per monitor cycle
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rule kinds (0 marks a removed row)
+MOVE = 1          # Percent move since the last notification
+ABOVE = 2         # Price crosses above a level
+BELOW = 3         # Price crosses below a level
+CROSS_SMA20 = 4   # Price crosses the 20-day SMA in either direction
+
+RULE_NAMES = {MOVE: "move", ABOVE: "above", BELOW: "below", CROSS_SMA20: "sma20"}
+RULE_KINDS = {name: kind for kind, name in RULE_NAMES.items()}
+
+# Every watched symbol gets this rule so users still hear about meaningful moves
+DEFAULT_MOVE_PCT = 1.0
+
+SymbolKey = Tuple[str, str]  # (market, symbol) where market is "stocks" or "crypto"
+
+
+class AlertBook:
+    """
+    Alert rules stored as parallel NumPy arrays (one row per rule).
+
+    Symbols are interned to integer codes, so evaluating every rule against a
+    quote batch is a handful of array operations regardless of the user count.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._symbols: List[SymbolKey] = []
+        self._codes: Dict[SymbolKey, int] = {}
+        # Live rule counts per symbol, so the monitor reads the watched symbols without a scan
+        self._counts: Dict[str, Dict[str, int]] = {}                # market -> symbol -> rules
+        self._kind_counts: Dict[Tuple[int, str], Dict[str, int]] = {}  # (kind, market) -> symbol -> rules
+        self._size = 0
+        self._removed = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        def grow(name, dtype, fill):
+            new = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+        grow("_user", np.int64, 0)
+        grow("_symbol", np.int32, 0)
+        grow("_kind", np.int8, 0)
+        grow("_threshold", np.float64, np.nan)
+        grow("_ref_price", np.float64, np.nan)  # Price at the last notification or first quote
+        grow("_side", np.int8, 0)               # Last side of the level (-1 below, +1 above, 0 unknown)
+
+    def _code(self, key: SymbolKey) -> int:
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self._symbols)
+            self._symbols.append(key)
+            self._codes[key] = code
+        return code
+
+    def _active(self) -> np.ndarray:
+        return self._kind[:self._size] != 0
+
+    def _count(self, code: int, kind: int, delta: int):
+        market, symbol = self._symbols[code]
+        for counts in (self._counts.setdefault(market, {}), self._kind_counts.setdefault((kind, market), {})):
+            left = counts.get(symbol, 0) + delta
+            if left > 0:
+                counts[symbol] = left
+            else:
+                counts.pop(symbol, None)
+
+    def _drop(self, mask: np.ndarray) -> int:
+        """Mark the masked rows removed and compact once half the rows are dead"""
+        rows = np.flatnonzero(mask)
+        for i in rows:
+            self._count(int(self._symbol[i]), int(self._kind[i]), -1)
+        self._kind[rows] = 0
+        self._removed += len(rows)
+        if self._removed > self._size // 2:
+            self._compact()
+        return len(rows)
+
+    def add_rule(self, user: int, market: str, symbol: str, kind: int, threshold: float = np.nan) -> bool:
+        """Add a rule, returns False if the same rule already exists"""
+        code = self._code((market, symbol))
+        n = self._size
+        same = (self._user[:n] == user) & (self._symbol[:n] == code) & (self._kind[:n] == kind)
+        if kind in (ABOVE, BELOW, MOVE):
+            same &= np.isclose(self._threshold[:n], threshold, equal_nan=True)
+        if same.any():
+            return False
+        self._append(user, code, kind, threshold)
+        return True
+
+    def _append(self, user: int, code: int, kind: int, threshold: float):
+        n = self._size
+        if n == len(self._kind):
+            self._allocate(len(self._kind) * 2)
+        self._user[n] = user
+        self._symbol[n] = code
+        self._kind[n] = kind
+        self._threshold[n] = threshold
+        self._ref_price[n] = np.nan
+        self._side[n] = 0
+        self._size += 1
+        self._count(code, kind, 1)
+
+    def remove_rules(self, user: int, market: Optional[str] = None, symbol: Optional[str] = None,
+                     kind: Optional[int] = None) -> int:
+        """Remove a user's rules, optionally limited to one symbol and rule kind. Returns the number removed."""
+        n = self._size
+        mask = self._active() & (self._user[:n] == user)
+        if market is not None and symbol is not None:
+            code = self._codes.get((market, symbol))
+            if code is None:
+                return 0
+            mask &= self._symbol[:n] == code
+        if kind is not None:
+            mask &= self._kind[:n] == kind
+
+        return self._drop(mask)
+
+    def _compact(self):
+        """Drop removed rows so evaluation only touches live rules"""
+        keep = np.flatnonzero(self._active())
+        for name in ("_user", "_symbol", "_kind", "_threshold", "_ref_price", "_side"):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self._size = len(keep)
+        self._removed = 0
+
+    def sync(self, rules: Iterable[Tuple[int, str, str, int, float]]):
+        """
+        Make the book hold exactly the given (user, market, symbol, kind, threshold) rules.
+        Rules that already exist keep their notification state.
+        """
+        wanted = {}
+        for user, market, symbol, kind, threshold in rules:
+            code = self._code((market, symbol))
+            key = (user, code, kind, None if np.isnan(threshold) else round(threshold, 9))
+            wanted[key] = (user, code, kind, threshold)
+
+        n = self._size
+        stale = np.zeros(n, dtype=bool)
+        for i in np.flatnonzero(self._active()):
+            threshold = self._threshold[i]
+            key = (int(self._user[i]), int(self._symbol[i]), int(self._kind[i]),
+                   None if np.isnan(threshold) else round(float(threshold), 9))
+            if wanted.pop(key, None) is None:
+                stale[i] = True
+
+        self._drop(stale)
+        for rule in wanted.values():
+            self._append(*rule)
+
+    def symbols(self, market: str) -> List[str]:
+        """Symbols in a market with at least one live rule"""
+        return list(self._counts.get(market, ()))
+
+    def symbols_with_rule(self, kind: int, market: str) -> List[str]:
+        """Symbols in a market that have at least one rule of the given kind"""
+        return list(self._kind_counts.get((kind, market), ()))
+
+    def evaluate(self, prices: Dict[SymbolKey, float], sma20: Optional[Dict[SymbolKey, float]] = None) -> Dict[int, List[str]]:
+        """
+        Check every rule against the latest quotes and update rule state.
+
+        Args:
+            prices: Latest price per (market, symbol)
+            sma20: Latest 20-day SMA per (market, symbol), for sma20 rules
+
+        Returns:
+            Dictionary mapping each user with fired rules to their alert lines
+        """
+        n = self._size
+        if n == 0:
+            return {}
+
+        price_by_code = np.full(len(self._symbols), np.nan)
+        sma_by_code = np.full(len(self._symbols), np.nan)
+        for key, price in prices.items():
+            code = self._codes.get(key)
+            if code is not None and price:
+                price_by_code[code] = price
+        for key, value in (sma20 or {}).items():
+            code = self._codes.get(key)
+            if code is not None:
+                sma_by_code[code] = value
+
+        kind = self._kind[:n]
+        symbol = self._symbol[:n]
+        threshold = self._threshold[:n]
+        ref_price = self._ref_price[:n]
+        side = self._side[:n]
+
+        price = price_by_code[symbol]
+        quoted = (kind != 0) & ~np.isnan(price)
+
+        # Percent move since the last notification. The first quote only seeds the reference,
+        # which is not persisted, so a restart or reload must not alert on every symbol.
+        seed = quoted & (kind == MOVE) & np.isnan(ref_price)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            move_pct = (price / ref_price - 1.0) * 100
+        move_fired = quoted & (kind == MOVE) & ~np.isnan(ref_price) & (np.abs(move_pct) >= threshold)
+
+        # Level crossings: fixed levels for above/below, the SMA for sma20. Like the move reference,
+        # the side is not persisted, so the first quote only records it and a later change fires.
+        level = np.where(kind == CROSS_SMA20, sma_by_code[symbol], threshold)
+        level_rule = quoted & np.isin(kind, (ABOVE, BELOW, CROSS_SMA20)) & ~np.isnan(level)
+        distance = price - level
+        new_side = np.sign(np.where(np.isnan(distance), 0.0, distance)).astype(np.int8)
+        level_fired = level_rule & (
+            ((kind == ABOVE) & (new_side > 0) & (side < 0))
+            | ((kind == BELOW) & (new_side < 0) & (side > 0))
+            | ((kind == CROSS_SMA20) & (side != 0) & (new_side != 0) & (new_side != side))
+        )
+
+        fired = np.flatnonzero(move_fired | level_fired)
+        alerts: Dict[int, List[str]] = {}
+        for i in fired:
+            market, name = self._symbols[symbol[i]]
+            label = f"📈 {name}" if market == "stocks" else f"💱 {name.capitalize()}"
+            line = f"{label}: €{price[i]:.2f}"
+            if kind[i] == MOVE:
+                line += f" ({move_pct[i]:+.2f}% since last alert)"
+            elif kind[i] == ABOVE:
+                line += f" crossed above €{threshold[i]:.2f}"
+            elif kind[i] == BELOW:
+                line += f" crossed below €{threshold[i]:.2f}"
+            elif kind[i] == CROSS_SMA20:
+                direction = "above" if new_side[i] > 0 else "below"
+                line += f" crossed {direction} SMA 20 (€{level[i]:.2f})"
+            alerts.setdefault(int(self._user[i]), []).append(line)
+
+        # Update state after rendering so messages can show the previous reference
+        update_side = level_rule & (new_side != 0)
+        side[update_side] = new_side[update_side]
+        ref_price[fired] = price[fired]
+        ref_price[seed] = price[seed]
+        return alerts
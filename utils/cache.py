@@ -0,0 +1,185 @@
+"""
+Bounded, size-aware LRU cache with TTL expiry and background sweeping
+"""
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the memory footprint of a cached value in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, dict):
+        # One level deep is enough for the flat dicts returned by yfinance .info
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedTTLCache:
+    """
+    Thread-safe LRU cache bounded by entry count and total bytes.
+
+    Entries are fresh for `ttl` seconds. Expired entries are kept for another
+    `max_stale` seconds so callers can still fall back to them (allow_expired).
+    Older entries are never returned; the background sweeper drops them.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 256 * 1024 * 1024,
+                 ttl: float = 30.0, max_stale: float = 300.0, sweep_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.sweep_interval = sweep_interval
+
+        # key -> (value, timestamp, size)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def get(self, key: str, allow_expired: bool = False) -> Any:
+        """Return the cached value, or None if missing or expired
+
+        Args:
+            key: Cache key
+            allow_expired: If True, return the value even if it is past its TTL (up to max_stale more)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, timestamp, _ = entry
+            age = time.time() - timestamp
+            if age >= self.ttl + self.max_stale:
+                # Past the stale bound, drop it now rather than wait for the sweeper
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if not allow_expired and age >= self.ttl:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def age(self, key: str) -> Optional[float]:
+        """Return the age of an entry in seconds, or None if missing"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else time.time() - entry[1]
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting least-recently-used entries to stay within bounds"""
+        if value is None:
+            return
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds cache limit of {self.max_bytes}")
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.time(), size)
+            self._total_bytes += size
+
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+        self._ensure_sweeper()
+
+    def delete(self, key: str):
+        """Remove an entry if present"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def keys(self) -> List[str]:
+        """Return all keys from least to most recently used"""
+        with self._lock:
+            return list(self._entries.keys())
+
+    def sweep(self) -> int:
+        """Drop entries older than ttl + max_stale. Returns the number removed."""
+        cutoff = time.time() - (self.ttl + self.max_stale)
+        with self._lock:
+            expired = [key for key, (_, timestamp, _) in self._entries.items() if timestamp < cutoff]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        if expired:
+            logger.debug(f"Cache sweep removed {len(expired)} expired entries")
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def stop(self):
+        """Stop the background sweeper"""
+        self._stop_event.set()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _ensure_sweeper(self):
+        """Start the background sweeper thread on first use"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop_event.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Cache sweep failed: {e}")
@@ -0,0 +1,129 @@
+"""
+Per-symbol circuit breaker with negative caching for symbols that keep failing
+"""
+import time
+import logging
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching a symbol whose breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Tracks failures per key (ticker) and skips keys that keep failing.
+
+    A single failure negatively caches the key for `negative_ttl` seconds.
+    After `failure_threshold` consecutive failures the breaker opens for
+    `base_cooldown`, then lets one half-open probe through; every failed
+    probe doubles the cooldown up to `max_cooldown`. A success closes it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, negative_ttl: float = 60.0,
+                 base_cooldown: float = 300.0, max_cooldown: float = 6 * 3600.0, probe_timeout: float = 120.0):
+        """
+        Args:
+            name: Used in logs
+            failure_threshold: Consecutive failures that open the breaker
+            negative_ttl: Seconds a key is skipped after a failure while still closed
+            base_cooldown: First open period in seconds
+            max_cooldown: Cap for the doubling open period
+            probe_timeout: Seconds after which an unanswered half-open probe is given up
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.negative_ttl = negative_ttl
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+
+        # key -> {"failures", "blocked_until", "state", "probe_started", "last_error"}
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.last_success = 0.0  # Time of the latest success for any key
+
+    def allow(self, key: str) -> bool:
+        """True if the key may be fetched now (claims the probe when half-open)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return True
+            now = time.time()
+            if now < entry["blocked_until"]:
+                self.skipped += 1
+                return False
+            if entry["state"] == CLOSED:
+                return True
+            if entry["state"] == HALF_OPEN and now - entry["probe_started"] < self.probe_timeout:
+                # Someone else is probing
+                self.skipped += 1
+                return False
+            entry["state"] = HALF_OPEN
+            entry["probe_started"] = now
+            return True
+
+    def record_success(self, key: str):
+        with self._lock:
+            self.last_success = time.time()
+            entry = self._entries.pop(key, None)
+        if entry is not None and entry["state"] != CLOSED:
+            logger.info(f"{self.name} breaker closed for {key}")
+
+    def record_failure(self, key: str, error: str = ""):
+        with self._lock:
+            now = time.time()
+            entry = self._entries.setdefault(key, {"failures": 0, "blocked_until": 0.0, "state": CLOSED,
+                                                   "probe_started": 0.0, "last_error": ""})
+            entry["failures"] += 1
+            entry["last_error"] = error[:200]
+            if entry["failures"] < self.failure_threshold:
+                entry["blocked_until"] = now + self.negative_ttl
+                return
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (entry["failures"] - self.failure_threshold))
+            entry["state"] = OPEN
+            entry["blocked_until"] = now + cooldown
+        logger.warning(f"{self.name} breaker open for {key} after {entry['failures']} failures, "
+                       f"next probe in {cooldown:.0f}s")
+
+    def recently_succeeded(self, window: float) -> bool:
+        """True if any key succeeded in the last `window` seconds, i.e. the upstream itself is answering"""
+        return time.time() - self.last_success < window
+
+    def release(self, key: str):
+        """Give up a half-open probe without counting it (e.g. the request was rate limited)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["state"] == HALF_OPEN:
+                entry["state"] = OPEN
+                entry["probe_started"] = 0.0
+
+    def reset(self, key: str = None):
+        """Forget one key's failures, or every key's"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def states(self) -> Dict[str, Dict]:
+        """Every key with recorded failures: state, failure count, seconds until the next attempt and last error"""
+        now = time.time()
+        with self._lock:
+            return {
+                key: {
+                    "state": entry["state"],
+                    "failures": entry["failures"],
+                    "retry_in": max(0.0, entry["blocked_until"] - now),
+                    "last_error": entry["last_error"],
+                }
+                for key, entry in self._entries.items()
+            }
@@ -0,0 +1,121 @@
+"""
+Helper module for CoinGecko with batched price requests, caching, and rate limiting
+"""
+import re
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from pycoingecko import CoinGeckoAPI
+from utils.cache import BoundedTTLCache
+from utils.rate_limiter import get_limiter, is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+cg = CoinGeckoAPI()
+
+# Prices are shared by the bot and the portfolio tracker for this long
+CRYPTO_CACHE_DURATION = 60
+_cache = BoundedTTLCache(max_entries=2048, max_bytes=8 * 1024 * 1024, ttl=CRYPTO_CACHE_DURATION)
+
+# Keep each simple/price request well inside URL length limits
+MAX_IDS_PER_REQUEST = 250
+MAX_IDS_LENGTH = 1500  # Characters in the comma-separated ids parameter
+
+# Rate limiting (free tier allows roughly 10-30 calls per minute, see utils.rate_limiter)
+_limiter = get_limiter("coingecko")
+
+# Yahoo-style crypto pairs (BTC-USD) to CoinGecko coin ids
+COINGECKO_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "USDT": "tether",
+    "BNB": "binancecoin",
+    "SOL": "solana",
+    "XRP": "ripple",
+    "USDC": "usd-coin",
+    "ADA": "cardano",
+    "DOGE": "dogecoin",
+    "TRX": "tron",
+    "AVAX": "avalanche-2",
+    "DOT": "polkadot",
+    "LINK": "chainlink",
+    "MATIC": "matic-network",
+    "LTC": "litecoin",
+    "BCH": "bitcoin-cash",
+    "XLM": "stellar",
+    "ATOM": "cosmos",
+    "UNI": "uniswap",
+    "ETC": "ethereum-classic",
+}
+
+
+def coin_id_for_ticker(ticker: str) -> Optional[str]:
+    """Map a Yahoo crypto pair such as BTC-USD to its CoinGecko id (None if unknown)"""
+    match = re.fullmatch(r"([A-Z0-9]+)-USD", ticker.upper())
+    if not match:
+        return None
+    return COINGECKO_IDS.get(match.group(1))
+
+
+def _chunk_ids(coins: List[str]) -> List[List[str]]:
+    """Split coin ids into chunks that respect the per-request count and length limits"""
+    chunks, current, length = [], [], 0
+    for coin in coins:
+        if current and (len(current) >= MAX_IDS_PER_REQUEST or length + len(coin) + 1 > MAX_IDS_LENGTH):
+            chunks.append(current)
+            current, length = [], 0
+        current.append(coin)
+        length += len(coin) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def get_crypto_quotes(coins: Iterable[str], vs_currency: str = "eur") -> Dict[str, Dict[str, float]]:
+    """
+    Get prices for many coins with one simple/price request per chunk.
+
+    Args:
+        coins: CoinGecko coin ids (e.g. bitcoin, ethereum)
+        vs_currency: Quote currency
+
+    Returns:
+        Dictionary mapping each priced coin id to {"price": ..., "change_24h": ...}
+        (change_24h in percent, may be None). Coins without a price are omitted.
+    """
+    ids = list(dict.fromkeys(coin.lower() for coin in coins if coin))
+    quotes = {}
+    missing = []
+    for coin in ids:
+        cached = _cache.get(f"{coin}_{vs_currency}")
+        if cached is not None:
+            quotes[coin] = cached
+        else:
+            missing.append(coin)
+
+    for chunk in _chunk_ids(missing):
+        _limiter.acquire()
+        try:
+            data = cg.get_price(ids=",".join(chunk), vs_currencies=vs_currency, include_24hr_change="true")
+            _limiter.on_success()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                _limiter.on_rate_limited()
+            logger.error(f"Error fetching crypto prices for {len(chunk)} coins: {e}")
+            continue
+
+        for coin in chunk:
+            entry = data.get(coin) or {}
+            price = entry.get(vs_currency)
+            if price is None:
+                continue
+            quote = {"price": float(price), "change_24h": entry.get(f"{vs_currency}_24h_change")}
+            _cache.set(f"{coin}_{vs_currency}", quote)
+            quotes[coin] = quote
+
+    return quotes
+
+
+def get_crypto_prices(coins: Iterable[str], vs_currency: str = "eur") -> Dict[str, float]:
+    """Get the latest price for many coins (coins without a price are omitted)"""
+    return {coin: quote["price"] for coin, quote in get_crypto_quotes(coins, vs_currency).items()}
@@ -0,0 +1,192 @@
+"""
+Persistent on-disk store for historical price bars.
+
+Histories are kept as one Parquet file per (ticker, interval) so a restart
+only needs to download the bars added since the last stored timestamp.
+Yahoo bars are split/dividend adjusted as of the download date, so every delta
+overlaps a few stored bars; if their closes moved, the adjustment changed and
+the caller re-downloads the whole history instead of appending.
+"""
+import os
+import re
+import logging
+import threading
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "history")
+HISTORY_DIR = os.getenv("FINBOT_HISTORY_DIR", DEFAULT_HISTORY_DIR)
+HISTORY_STORE_ENABLED = os.getenv("FINBOT_HISTORY_STORE", "1") != "0"
+
+# Only bar sizes that are stable once published are worth persisting
+STORABLE_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+# Bars re-downloaded before the last stored one to detect new split/dividend adjustments
+OVERLAP_BARS = 3
+ADJUSTMENT_TOLERANCE = 5e-4  # Relative Close difference that counts as a changed adjustment
+
+# How far the first stored bar may sit after the requested period start and still
+# count as covering it (weekends, holidays, bar alignment)
+COVERAGE_TOLERANCE = {
+    "1d": pd.Timedelta(days=5),
+    "5d": pd.Timedelta(days=7),
+    "1wk": pd.Timedelta(days=8),
+    "1mo": pd.Timedelta(days=32),
+    "3mo": pd.Timedelta(days=93),
+}
+
+
+def period_start(period: str, tz=None) -> Optional[pd.Timestamp]:
+    """Convert a yfinance period string (5d, 6mo, 5y, ytd) to its start timestamp
+
+    Returns None for 'max' or unrecognised periods.
+    """
+    now = pd.Timestamp.now(tz=tz)
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        return None
+
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        offset = pd.DateOffset(days=count)
+    elif unit == "wk":
+        offset = pd.DateOffset(weeks=count)
+    elif unit == "mo":
+        offset = pd.DateOffset(months=count)
+    else:
+        offset = pd.DateOffset(years=count)
+    return (now - offset).normalize()
+
+
+class HistoryStore:
+    """Parquet-backed store of OHLCV bars keyed by (ticker, interval)"""
+
+    def __init__(self, base_dir: str = HISTORY_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._file_locks = {}
+
+    @property
+    def enabled(self) -> bool:
+        return HISTORY_STORE_ENABLED and PYARROW_AVAILABLE
+
+    def _path(self, ticker: str, interval: str) -> str:
+        safe_ticker = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.base_dir, interval, f"{safe_ticker}.parquet")
+
+    def _file_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._file_locks.setdefault(path, threading.Lock())
+
+    def load(self, ticker: str, interval: str) -> Optional[pd.DataFrame]:
+        """Load stored bars, or None if nothing is stored"""
+        if not self.enabled:
+            return None
+
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with self._file_lock(path):
+                table = pq.read_table(path)
+            data = table.to_pandas()
+            return data if not data.empty else None
+        except Exception as e:
+            logger.warning(f"Could not read stored history for {ticker} ({interval}): {e}")
+            return None
+
+    def save(self, ticker: str, interval: str, data: pd.DataFrame):
+        """Replace the stored bars for a ticker (atomic write)"""
+        if not self.enabled or data is None or data.empty:
+            return
+
+        path = self._path(ticker, interval)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            table = pa.Table.from_pandas(data, preserve_index=True)
+            with self._file_lock(path):
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not store history for {ticker} ({interval}): {e}")
+
+    def adjustment_changed(self, stored: Optional[pd.DataFrame], new_data: Optional[pd.DataFrame]) -> bool:
+        """Check whether overlapping closes differ, i.e. a split or dividend re-adjusted the series
+
+        The last stored bar is ignored since it may have been saved while still partial.
+        """
+        if stored is None or new_data is None or len(stored) < 2 or new_data.empty:
+            return False
+        if stored.index.tz is not None and new_data.index.tz is not None:
+            new_data = new_data.tz_convert(stored.index.tz)
+        old = stored['Close'].iloc[:-1]
+        overlap = old.index.intersection(new_data.index)
+        if overlap.empty:
+            return False
+        old, new = old.loc[overlap].astype(float), new_data['Close'].loc[overlap].astype(float)
+        relative = ((new - old).abs() / old.abs()).max()
+        return bool(relative > ADJUSTMENT_TOLERANCE)
+
+    def append(self, ticker: str, interval: str, new_data: pd.DataFrame,
+               stored: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Merge new bars into the stored history and persist the result
+
+        Bars with a timestamp that is already stored are replaced, since the
+        latest bar may have been partial when it was first saved.
+
+        Returns:
+            The merged history
+        """
+        if stored is None:
+            stored = self.load(ticker, interval)
+
+        if stored is None or stored.empty:
+            merged = new_data
+        elif new_data is None or new_data.empty:
+            return stored
+        else:
+            if stored.index.tz is not None and new_data.index.tz is not None:
+                new_data = new_data.tz_convert(stored.index.tz)
+            columns = [col for col in stored.columns if col in new_data.columns]
+            merged = pd.concat([stored, new_data[columns]])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        self.save(ticker, interval, merged)
+        return merged
+
+    def covers(self, stored: Optional[pd.DataFrame], period: str, interval: str) -> bool:
+        """Check whether stored bars reach back to the start of the requested period"""
+        if stored is None or stored.empty:
+            return False
+        start = period_start(period, tz=stored.index.tz)
+        if start is None:
+            return False
+        tolerance = COVERAGE_TOLERANCE.get(interval, pd.Timedelta(days=5))
+        return stored.index[0] <= start + tolerance
+
+    def clear(self):
+        """Delete every stored history file"""
+        if not os.path.isdir(self.base_dir):
+            return
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                if name.endswith(".parquet"):
+                    os.remove(os.path.join(root, name))
+
+
+history_store = HistoryStore()
@@ -0,0 +1,87 @@
+"""
+Asyncio quote engine that runs the blocking price fetchers in a bounded thread pool
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PriceFetcher = Callable[[List[str]], Dict[str, float]]
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class AsyncQuoteEngine:
+    """
+    Fetch stock and crypto prices without blocking the event loop.
+
+    Symbols are split into batches and each batch runs on a worker thread, so
+    rate-limit sleeps and retry backoff happen off the loop and a full cycle
+    takes about as long as its slowest batch.
+    """
+
+    def __init__(self, stock_fetcher: PriceFetcher, crypto_fetcher: PriceFetcher,
+                 max_workers: int = 4, stock_batch_size: int = 50, crypto_batch_size: int = 1,
+                 timeout: Optional[float] = 45.0):
+        """
+        Args:
+            stock_fetcher: Blocking function mapping a list of stock symbols to prices
+            crypto_fetcher: Blocking function mapping a list of coin ids to prices
+            max_workers: Maximum number of batches fetched at the same time
+            stock_batch_size: Stock symbols per fetcher call
+            crypto_batch_size: Coin ids per fetcher call
+            timeout: Seconds to wait for a batch before giving up on it (None waits forever)
+        """
+        self.stock_fetcher = stock_fetcher
+        self.crypto_fetcher = crypto_fetcher
+        self.stock_batch_size = stock_batch_size
+        self.crypto_batch_size = crypto_batch_size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quotes")
+
+    async def _run_batch(self, fetcher: PriceFetcher, batch: List[str]) -> Dict[str, float]:
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, fetcher, batch)
+            return await asyncio.wait_for(future, timeout=self.timeout) or {}
+        except asyncio.TimeoutError:
+            logger.warning(f"Quote batch timed out after {self.timeout}s: {batch}")
+        except Exception as e:
+            logger.error(f"Quote batch failed for {batch}: {e}")
+        return {}
+
+    async def _fetch(self, fetcher: PriceFetcher, symbols: Iterable[str], batch_size: int) -> Dict[str, float]:
+        unique = list(dict.fromkeys(symbols))
+        if not unique:
+            return {}
+        results = await asyncio.gather(*(self._run_batch(fetcher, batch) for batch in _chunks(unique, batch_size)))
+        prices = {}
+        for result in results:
+            prices.update(result)
+        return prices
+
+    async def get_stock_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Fetch prices for stock symbols"""
+        return await self._fetch(self.stock_fetcher, symbols, self.stock_batch_size)
+
+    async def get_crypto_prices(self, coins: Iterable[str]) -> Dict[str, float]:
+        """Fetch prices for coin ids"""
+        return await self._fetch(self.crypto_fetcher, coins, self.crypto_batch_size)
+
+    async def get_quotes(self, stocks: Iterable[str], coins: Iterable[str]) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Fetch stock and crypto prices concurrently"""
+        stock_prices, crypto_prices = await asyncio.gather(self.get_stock_prices(stocks), self.get_crypto_prices(coins))
+        return stock_prices, crypto_prices
+
+    async def run(self, fn: Callable, *args):
+        """Run any other blocking fetch on the engine's worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False)
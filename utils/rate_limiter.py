@@ -0,0 +1,169 @@
+"""
+Token-bucket rate limiting with per-endpoint budgets and adaptive 429 backoff
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from utils.scheduler import NUM_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint budgets: steady rate (requests/second), burst size and the range the
+# adaptive rate may move in. Yahoo throttles quoteSummary (.info) harder than chart.
+# They are for the whole deployment: with FINBOT_NUM_WORKERS bot processes sharing
+# one IP, each process gets 1/FINBOT_NUM_WORKERS of every rate and burst.
+DEFAULT_BUDGETS = {
+    "yahoo_chart": {"rate": 1.0, "burst": 5, "min_rate": 0.1, "max_rate": 2.0},
+    "yahoo_quote_summary": {"rate": 0.5, "burst": 2, "min_rate": 0.05, "max_rate": 1.0},
+    "yahoo_quote": {"rate": 1.0, "burst": 4, "min_rate": 0.1, "max_rate": 2.0},
+    # Free tier allows roughly 10-30 calls per minute
+    "coingecko": {"rate": 0.25, "burst": 3, "min_rate": 0.05, "max_rate": 0.5},
+    "rss": {"rate": 2.0, "burst": 8, "min_rate": 0.2, "max_rate": 5.0},
+}
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True if an exception looks like an HTTP 429 (yfinance, requests and pycoingecko phrase it differently)"""
+    text = str(error)
+    return "429" in text or "Too Many Requests" in text or "Rate limited" in text
+
+
+class TokenBucket:
+    """
+    Thread- and asyncio-safe token bucket with AIMD rate control.
+
+    Callers reserve a token under a short lock and then sleep outside it, so
+    waiters are served in order and bursts up to `burst` go through at once.
+    A 429 halves the rate and pauses the bucket; each success adds a small
+    step back until the rate reaches max_rate again.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, min_rate: Optional[float] = None,
+                 max_rate: Optional[float] = None, decrease: float = 0.5, recovery: Optional[float] = None):
+        """
+        Args:
+            name: Endpoint name used in logs and stats
+            rate: Initial steady rate in requests per second
+            burst: Bucket capacity (requests allowed back to back)
+            min_rate: Floor for the adaptive rate
+            max_rate: Ceiling for the adaptive rate
+            decrease: Rate multiplier applied on a 429
+            recovery: Rate added per successful request (default 2% of max_rate)
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.decrease = decrease
+        self.recovery = recovery if recovery is not None else self.max_rate * 0.02
+
+        self._tokens = float(burst)  # May go negative: those are reservations
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.waited = 0.0
+        self.rate_limited = 0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens now and return how long the caller has to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            # While paused, _updated sits at the end of the pause and the deficit is counted from there
+            wait = max(0.0, self._updated - now) + max(0.0, -self._tokens / self.rate)
+            self.acquired += 1
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens: float = 1.0):
+        """Block the calling thread until a request may be sent"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """Wait without blocking the event loop until a request may be sent"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additive increase after a request went through"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.recovery)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """
+        Multiplicative decrease after a 429: lower the rate and pause the bucket.
+
+        Args:
+            retry_after: Server-provided pause in seconds (defaults to one interval at the new rate)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            if now < self._paused_until:
+                # Other in-flight requests from the same burst, already backed off
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self._paused_until = now + (retry_after if retry_after is not None else 1.0 / self.rate)
+            self._updated = max(self._updated, self._paused_until)  # Nothing accrues while paused
+            logger.warning(f"Rate limited on {self.name}, slowing to {self.rate:.3g} req/s "
+                           f"and pausing {self._paused_until - now:.1f}s")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "acquired": self.acquired,
+                "waited": round(self.waited, 3),
+                "rate_limited": self.rate_limited,
+                "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def worker_budget(budget: Dict[str, float], num_workers: int = NUM_WORKERS) -> Dict[str, float]:
+    """This process's share of a deployment-wide budget (rates divided, burst at least 1)"""
+    share = dict(budget)
+    for key in ("rate", "min_rate", "max_rate"):
+        if key in share:
+            share[key] = share[key] / num_workers
+    share["burst"] = max(1, int(share.get("burst", 1)) // num_workers)
+    return share
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """Shared limiter for an endpoint (this worker's share of DEFAULT_BUDGETS, 1 req/s if unknown)"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            budget = worker_budget(DEFAULT_BUDGETS.get(name, {"rate": 1.0, "burst": 1}))
+            limiter = _limiters[name] = TokenBucket(name, **budget)
+        return limiter
+
+
+def get_limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Current rate and counters of every limiter created so far"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
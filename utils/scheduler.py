@@ -0,0 +1,98 @@
+"""
+Sharded, non-overlapping scheduling for the bot's monitor cycle.
+
+Users are hash-partitioned across FINBOT_NUM_WORKERS processes. Each worker
+only monitors its own shard, starts at a staggered offset within the interval,
+and never starts a cycle while the previous one is still running.
+"""
+import os
+import time
+import zlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = int(os.getenv("FINBOT_WORKER_ID", "0"))
+NUM_WORKERS = int(os.getenv("FINBOT_NUM_WORKERS", "1"))
+MONITOR_INTERVAL = float(os.getenv("FINBOT_MONITOR_INTERVAL", "60"))
+
+
+def shard_for(key: Any, num_workers: int) -> int:
+    """Stable shard number for a key (same result in every process, unlike hash())"""
+    return zlib.crc32(str(key).encode()) % num_workers
+
+
+class ShardedMonitor:
+    """Runs one worker's share of the monitor cycle and keeps timing statistics"""
+
+    def __init__(self, worker_id: int = WORKER_ID, num_workers: int = NUM_WORKERS, interval: float = MONITOR_INTERVAL):
+        if not 0 <= worker_id < num_workers:
+            raise ValueError(f"Worker id {worker_id} is outside 0..{num_workers - 1}")
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.interval = interval
+
+        self.running = False
+        self.cycles = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.avg_duration = 0.0
+        self.last_lag = 0.0
+        self._expected_start: Optional[float] = None
+
+    def owns(self, user: int) -> bool:
+        """Whether this worker monitors the given user"""
+        return self.num_workers == 1 or shard_for(user, self.num_workers) == self.worker_id
+
+    def first_delay(self, base: float = 10.0) -> float:
+        """Initial delay that spreads workers evenly across the interval"""
+        return base + self.interval * self.worker_id / self.num_workers
+
+    async def run(self, cycle: Callable[[], Awaitable[None]]):
+        """Run one cycle unless the previous one is still in progress"""
+        start = time.monotonic()
+        if self.running:
+            self.skipped += 1
+            logger.warning(f"Monitor worker {self.worker_id}: previous cycle still running, skipping this one")
+            return
+
+        if self._expected_start is not None:
+            self.last_lag = max(0.0, start - self._expected_start)
+        self._expected_start = start + self.interval
+
+        self.running = True
+        try:
+            await cycle()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Monitor worker {self.worker_id}: cycle failed: {e}")
+        finally:
+            self.running = False
+            duration = time.monotonic() - start
+            self.cycles += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            # Exponential moving average, smooths over single slow cycles
+            self.avg_duration = duration if self.cycles == 1 else 0.8 * self.avg_duration + 0.2 * duration
+
+        level = logging.WARNING if duration > 0.8 * self.interval else logging.INFO
+        logger.log(level, f"Monitor worker {self.worker_id}/{self.num_workers}: cycle took {duration:.1f}s "
+                          f"(avg {self.avg_duration:.1f}s, lag {self.last_lag:.1f}s, interval {self.interval:.0f}s)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cycle statistics; utilisation near 1.0 means it is time to add workers"""
+        return {
+            "num_workers": self.num_workers,
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_duration": self.last_duration,
+            "avg_duration": self.avg_duration,
+            "max_duration": self.max_duration,
+            "last_lag": self.last_lag,
+            "utilisation": self.avg_duration / self.interval if self.interval else 0.0,
+        }
@@ -0,0 +1,132 @@
+"""
+Background Telegram send queue that respects the Bot API flood limits
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from telegram.error import Forbidden, BadRequest, RetryAfter, TimedOut, NetworkError
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages per second overall and 1 per second per chat. The
+# global limit is per bot token, so sharded workers each get an equal part of it.
+GLOBAL_MESSAGES_PER_SECOND = 30
+PER_CHAT_INTERVAL = 1.0
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    # retry_after is an int in python-telegram-bot 20.0 and a timedelta in later releases
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+class TelegramSendQueue:
+    """
+    Rate-limited queue for outgoing messages.
+
+    enqueue() returns immediately; worker tasks deliver messages in the
+    background while keeping global and per-chat spacing, pausing all sends
+    when Telegram answers with RetryAfter.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_MESSAGES_PER_SECOND, per_chat_interval: float = PER_CHAT_INTERVAL,
+                 workers: int = 8, max_retries: int = 3):
+        self.global_interval = 1.0 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._bot = None
+
+        # Next free send slot, globally and per chat (monotonic clock)
+        self._next_global = 0.0
+        self._next_chat: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._slot_lock: Optional[asyncio.Lock] = None
+
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    async def start(self, bot):
+        """Start the worker tasks on the running event loop"""
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._slot_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Telegram send queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Cancel the workers (messages still queued are dropped)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, chat_id: int, text: str, **kwargs):
+        """Queue a message for delivery"""
+        if self._queue is None:
+            raise RuntimeError("TelegramSendQueue.start() has not been called")
+        self._queue.put_nowait((chat_id, text, kwargs, 0))
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _reserve_slot(self, chat_id: int) -> float:
+        """Reserve the next send time for a chat, honouring both limits"""
+        async with self._slot_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global, self._next_chat.get(chat_id, 0.0), self._paused_until)
+            self._next_global = slot + self.global_interval
+            self._next_chat[chat_id] = slot + self.per_chat_interval
+            return slot - now
+
+    async def _worker(self):
+        while True:
+            chat_id, text, kwargs, attempts = await self._queue.get()
+            try:
+                delay = await self._reserve_slot(chat_id)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._bot.send_message(chat_id, text, **kwargs)
+                self.sent += 1
+
+            except RetryAfter as e:
+                # Flood control applies to the whole bot, so pause every worker
+                wait = _retry_after_seconds(e)
+                self.flood_waits += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+                logger.warning(f"Telegram flood control, pausing sends for {wait:.0f}s")
+                self._requeue(chat_id, text, kwargs, attempts)
+
+            except (TimedOut, NetworkError) as e:
+                if isinstance(e, BadRequest):
+                    # BadRequest subclasses NetworkError but retrying will not help
+                    self.failed += 1
+                    logger.error(f"Dropping message to {chat_id}: {e}")
+                else:
+                    logger.warning(f"Send to {chat_id} failed (attempt {attempts + 1}/{self.max_retries}): {e}")
+                    self._requeue(chat_id, text, kwargs, attempts)
+
+            except Forbidden as e:
+                # User blocked the bot or left the chat
+                self.failed += 1
+                logger.info(f"Dropping message to {chat_id}: {e}")
+
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error sending message to {chat_id}: {e}")
+
+            finally:
+                self._queue.task_done()
+
+    def _requeue(self, chat_id: int, text: str, kwargs: dict, attempts: int):
+        if attempts + 1 >= self.max_retries:
+            self.failed += 1
+            logger.error(f"Giving up on message to {chat_id} after {self.max_retries} attempts")
+            return
+        self._queue.put_nowait((chat_id, text, kwargs, attempts + 1))
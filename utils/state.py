@@ -0,0 +1,309 @@
+"""
+Durable watchlist state backed by SQLite (WAL mode).
+
+Reads are served from in-memory indexes (user -> symbols, symbol -> users and
+user -> alert rules), so handlers never wait on disk. Writes update the indexes
+immediately and are persisted in batches by a background writer thread.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "state.db")
+STATE_DB = os.getenv("FINBOT_STATE_DB", DEFAULT_STATE_DB)
+
+MARKETS = ("stocks", "crypto")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    user_id  INTEGER NOT NULL,
+    market   TEXT    NOT NULL,
+    symbol   TEXT    NOT NULL,
+    added_at REAL    NOT NULL,
+    PRIMARY KEY (user_id, market, symbol)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS watchlist_symbol ON watchlist (market, symbol);
+CREATE TABLE IF NOT EXISTS alert_rules (
+    user_id   INTEGER NOT NULL,
+    market    TEXT    NOT NULL,
+    symbol    TEXT    NOT NULL,
+    rule      TEXT    NOT NULL,
+    threshold REAL
+);
+CREATE INDEX IF NOT EXISTS alert_rules_user ON alert_rules (user_id, market, symbol);
+-- Every worker backfills default rules at startup; duplicates from older databases are dropped
+-- before the unique index is built. NULL thresholds (sma20) would otherwise never collide.
+DELETE FROM alert_rules WHERE rowid NOT IN (
+    SELECT MIN(rowid) FROM alert_rules GROUP BY user_id, market, symbol, rule, threshold
+);
+CREATE UNIQUE INDEX IF NOT EXISTS alert_rules_unique
+    ON alert_rules (user_id, market, symbol, rule, IFNULL(threshold, ''));
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS worker_stats (
+    worker_id  INTEGER PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    stats      TEXT NOT NULL
+);
+"""
+
+
+AlertRule = Tuple[str, str, str, Optional[float]]  # (market, symbol, rule, threshold)
+
+
+class WatchlistStore:
+    """Watchlists and alert rules with a symbol -> subscribers reverse index and write-behind persistence"""
+
+    def __init__(self, path: str = STATE_DB, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        # Dicts keep insertion order, so they double as ordered sets
+        self._watchlists: Dict[int, Dict[str, Dict[str, None]]] = {}
+        self._subscribers: Dict[str, Dict[str, Set[int]]] = {market: {} for market in MARKETS}
+        self._alerts: Dict[int, Dict[AlertRule, None]] = {}
+
+        self._pending = []  # (sql, params) in the order the changes were made
+        self._changes = 0  # Bumped by every add/remove, lets refresh() detect writes during its reload
+        self._version = None  # meta.version of the data in the indexes, bumped by watchlist/alert writes only
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self.refresh()
+
+        self._writer = threading.Thread(target=self._write_loop, name="state-writer", daemon=True)
+        self._writer.start()
+
+    def refresh(self) -> bool:
+        """Reload the indexes from disk (picks up changes made by other workers). Returns True if swapped in."""
+        # Disk I/O runs outside self._lock so handlers are not blocked behind it. If anything
+        # changed meanwhile, the snapshot may predate it, so it is dropped and the next call retries.
+        with self._lock:
+            changes = self._changes
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT user_id, market, symbol FROM watchlist ORDER BY added_at"
+            ).fetchall()
+            alert_rows = self._conn.execute(
+                "SELECT user_id, market, symbol, rule, threshold FROM alert_rules ORDER BY rowid"
+            ).fetchall()
+            version = self._read_version()
+
+        watchlists: Dict[int, Dict[str, Dict[str, None]]] = {}
+        subscribers: Dict[str, Dict[str, Set[int]]] = {market: {} for market in MARKETS}
+        for user, market, symbol in rows:
+            watchlists.setdefault(user, {m: {} for m in MARKETS})[market][symbol] = None
+            subscribers[market].setdefault(symbol, set()).add(user)
+
+        alerts: Dict[int, Dict[AlertRule, None]] = {}
+        for user, market, symbol, rule, threshold in alert_rows:
+            alerts.setdefault(user, {})[(market, symbol, rule, threshold)] = None
+
+        with self._lock:
+            if self._pending or self._changes != changes:
+                # A failed flush or a concurrent add/remove the snapshot may not contain
+                logger.debug("Watchlists changed during reload, keeping the in-memory indexes")
+                return False
+            self._watchlists = watchlists
+            self._subscribers = subscribers
+            self._alerts = alerts
+            self._version = version
+        return True
+
+    def _read_version(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def refresh_if_changed(self) -> bool:
+        """Reload only if another worker changed watchlists or alert rules. Returns True if reloaded."""
+        with self._db_lock:
+            version = self._read_version()
+        if version == self._version:
+            return False
+        return self.refresh()
+
+    def add(self, user: int, market: str, symbol: str) -> bool:
+        """Add a symbol to a user's watchlist, returns False if it was already there"""
+        with self._lock:
+            wl = self._watchlists.setdefault(user, {m: {} for m in MARKETS})
+            if symbol in wl[market]:
+                return False
+            wl[market][symbol] = None
+            self._subscribers[market].setdefault(symbol, set()).add(user)
+            self._changes += 1
+            self._pending.append((
+                "INSERT OR IGNORE INTO watchlist (user_id, market, symbol, added_at) VALUES (?, ?, ?, ?)",
+                (user, market, symbol, time.time())
+            ))
+        self._wakeup.set()
+        return True
+
+    def remove(self, user: int, market: str, symbol: str) -> bool:
+        """Remove a symbol from a user's watchlist, returns False if it was not there"""
+        with self._lock:
+            wl = self._watchlists.get(user)
+            if wl is None or symbol not in wl[market]:
+                return False
+            del wl[market][symbol]
+            users = self._subscribers[market].get(symbol)
+            if users is not None:
+                users.discard(user)
+                if not users:
+                    del self._subscribers[market][symbol]
+            self._changes += 1
+            self._pending.append((
+                "DELETE FROM watchlist WHERE user_id = ? AND market = ? AND symbol = ?",
+                (user, market, symbol)
+            ))
+        self._wakeup.set()
+        self.remove_alerts(user, market, symbol)
+        return True
+
+    def add_alert(self, user: int, market: str, symbol: str, rule: str, threshold: Optional[float] = None) -> bool:
+        """Store an alert rule, returns False if it already exists"""
+        key = (market, symbol, rule, threshold)
+        with self._lock:
+            rules = self._alerts.setdefault(user, {})
+            if key in rules:
+                return False
+            rules[key] = None
+            self._changes += 1
+            self._pending.append((
+                "INSERT OR IGNORE INTO alert_rules (user_id, market, symbol, rule, threshold) VALUES (?, ?, ?, ?, ?)",
+                (user, market, symbol, rule, threshold)
+            ))
+        self._wakeup.set()
+        return True
+
+    def remove_alerts(self, user: int, market: str, symbol: str, rule: Optional[str] = None) -> int:
+        """Remove a user's alert rules for a symbol (optionally one rule type). Returns the number removed."""
+        with self._lock:
+            rules = self._alerts.get(user, {})
+            matches = [key for key in rules if key[0] == market and key[1] == symbol and rule in (None, key[2])]
+            for key in matches:
+                del rules[key]
+            if matches:
+                self._changes += 1
+                if rule is None:
+                    self._pending.append((
+                        "DELETE FROM alert_rules WHERE user_id = ? AND market = ? AND symbol = ?",
+                        (user, market, symbol)
+                    ))
+                else:
+                    self._pending.append((
+                        "DELETE FROM alert_rules WHERE user_id = ? AND market = ? AND symbol = ? AND rule = ?",
+                        (user, market, symbol, rule)
+                    ))
+        if matches:
+            self._wakeup.set()
+        return len(matches)
+
+    def get_alerts(self, user: int) -> List[AlertRule]:
+        """A user's alert rules as (market, symbol, rule, threshold)"""
+        with self._lock:
+            return list(self._alerts.get(user, {}))
+
+    def alerts(self) -> List[Tuple[int, str, str, str, Optional[float]]]:
+        """Snapshot of all alert rules as (user, market, symbol, rule, threshold)"""
+        with self._lock:
+            return [(user,) + key for user, rules in self._alerts.items() for key in rules]
+
+    def record_worker_stats(self, worker_id: int, stats: Dict):
+        """Publish a monitor worker's cycle statistics for operators"""
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO worker_stats (worker_id, updated_at, stats) VALUES (?, ?, ?)",
+                (worker_id, time.time(), json.dumps(stats))
+            )
+
+    def worker_stats(self) -> List[Dict]:
+        """Latest statistics published by every monitor worker"""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT worker_id, updated_at, stats FROM worker_stats ORDER BY worker_id").fetchall()
+        return [dict(json.loads(stats), worker_id=worker_id, updated_at=updated_at) for worker_id, updated_at, stats in rows]
+
+    def get_watchlist(self, user: int) -> Dict[str, List[str]]:
+        """A user's watchlist as {"stocks": [...], "crypto": [...]}"""
+        with self._lock:
+            wl = self._watchlists.get(user)
+            return {market: list(wl[market]) if wl else [] for market in MARKETS}
+
+    def items(self) -> List:
+        """Snapshot of (user, watchlist) pairs"""
+        with self._lock:
+            return [(user, {market: list(wl[market]) for market in MARKETS}) for user, wl in self._watchlists.items()]
+
+    def users(self) -> List[int]:
+        with self._lock:
+            return list(self._watchlists)
+
+    def symbols(self, market: str) -> List[str]:
+        """Union of all watched symbols in a market"""
+        with self._lock:
+            return list(self._subscribers[market])
+
+    def subscribers(self, market: str, symbol: str) -> Set[int]:
+        """Users watching a symbol"""
+        with self._lock:
+            return set(self._subscribers[market].get(symbol, ()))
+
+    def flush(self):
+        """Persist pending writes in one transaction"""
+        # Taken before the swap, so refresh() can't read the database while these writes are in flight
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            try:
+                with self._conn:
+                    # Apply in order so an add followed by a remove (or vice versa) ends up right
+                    for sql, params in pending:
+                        self._conn.execute(sql, params)
+                    # Worker stats writes don't touch meta.version, so other workers only reload for real changes
+                    self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                    version = self._read_version()
+                    if self._version is not None and version == self._version + 1:
+                        # Only our own change since the last load: the indexes already reflect it
+                        self._version = version
+                logger.debug(f"Persisted {len(pending)} watchlist changes")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist watchlist changes, will retry: {e}")
+                with self._lock:
+                    self._pending = pending + self._pending
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wakeup.wait()
+            # Give other writes a moment to join the same batch
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
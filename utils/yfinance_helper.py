@@ -3,34 +3,62 @@ Helper module for yfinance with rate limiting, caching, and error handling
 """
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, NamedTuple
 import yfinance as yf
 import pandas as pd
 
+try:
+    # Shares yfinance's session, cookie and crumb for the batched quote endpoint
+    from yfinance.data import YfData
+    QUOTE_API_AVAILABLE = True
+except ImportError:
+    QUOTE_API_AVAILABLE = False
+
+from utils.cache import BoundedTTLCache
+from utils.rate_limiter import get_limiter, is_rate_limit_error
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.history_store import history_store, period_start, STORABLE_INTERVALS, OVERLAP_BARS
+
 logger = logging.getLogger(__name__)
 
 # Cache for storing recent API calls to reduce rate limiting
-_cache = {}
-_cache_timestamps = {}
 CACHE_DURATION = 30  # Cache data for 30 seconds (reduced to allow more frequent updates)
+CACHE_MAX_STALE = 300  # Keep expired entries 5 more minutes for allow_expired fallbacks
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB across all cached DataFrames and dicts
+_cache = BoundedTTLCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    ttl=CACHE_DURATION,
+    max_stale=CACHE_MAX_STALE
+)
 
-# Rate limiting
-_last_request_time = 0
-MIN_REQUEST_INTERVAL = 2.0  # Minimum 2 seconds between requests (increased to avoid rate limits)
+# Rate limiting: separate adaptive budgets for chart (history/download) and quoteSummary (.info)
+_chart_limiter = get_limiter("yahoo_chart")
+_quote_limiter = get_limiter("yahoo_quote_summary")
+_price_limiter = get_limiter("yahoo_quote")  # Batched v7 quote endpoint
 
+# Symbols that keep coming back empty (typos, delistings) are skipped with growing probe intervals
+_breaker = CircuitBreaker("yahoo")
+# An empty answer only counts against a symbol while Yahoo served some other symbol this recently,
+# otherwise it is taken for an outage (yfinance turns network errors into empty results)
+HEALTHY_WINDOW = 120
 
-def _rate_limit():
-    """Enforce rate limiting between requests"""
-    global _last_request_time
-    current_time = time.time()
-    time_since_last = current_time - _last_request_time
-    
-    if time_since_last < MIN_REQUEST_INTERVAL:
-        sleep_time = MIN_REQUEST_INTERVAL - time_since_last
-        time.sleep(sleep_time)
-    
-    _last_request_time = time.time()
+# Batched downloads
+BATCH_SIZE = 50  # Maximum number of tickers per yf.download call
+
+# Lightweight quotes: one small JSON request for up to QUOTE_BATCH_SIZE symbols
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+QUOTE_FIELDS = "regularMarketPrice,regularMarketPreviousClose,regularMarketVolume,marketCap,trailingPE,currency"
+QUOTE_BATCH_SIZE = 100
+
+# Single-flight fetches: concurrent misses for one cache key share a single download
+_in_flight: Dict[str, "_Call"] = {}
+_in_flight_lock = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="yf-refresh")
 
 
 def _get_cached_data(ticker: str, data_type: str = "info", allow_expired: bool = False):
@@ -42,43 +70,112 @@ def _get_cached_data(ticker: str, data_type: str = "info", allow_expired: bool =
         allow_expired: If True, return cached data even if expired (for fallback)
     """
     cache_key = f"{ticker}_{data_type}"
-    
-    if cache_key in _cache:
-        timestamp = _cache_timestamps.get(cache_key, 0)
-        age = time.time() - timestamp
-        is_expired = age >= CACHE_DURATION
-        
-        if not is_expired or allow_expired:
-            cached_value = _cache[cache_key]
-            # Don't return None or empty values from cache - force refresh
-            if cached_value is not None:
-                if is_expired and allow_expired:
-                    # Mark as expired but still return it
-                    return cached_value
-                return cached_value
-            else:
-                # Remove None from cache
-                del _cache[cache_key]
-                del _cache_timestamps[cache_key]
-        else:
-            # Cache expired, remove it
-            del _cache[cache_key]
-            del _cache_timestamps[cache_key]
-    
-    return None
+    return _cache.get(cache_key, allow_expired=allow_expired)
 
 
 def _set_cached_data(ticker: str, data: Any, data_type: str = "info"):
     """Store data in cache"""
     cache_key = f"{ticker}_{data_type}"
-    _cache[cache_key] = data
-    _cache_timestamps[cache_key] = time.time()
+    _cache.set(cache_key, data)
+
+
+class _Call:
+    """One in-flight fetch that every concurrent caller for the same key waits on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+def _single_flight(cache_key: str, fetch):
+    """Run fetch() once per key at a time; concurrent callers get the same result (or error)"""
+    with _in_flight_lock:
+        call = _in_flight.get(cache_key)
+        leader = call is None
+        if leader:
+            call = _in_flight[cache_key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fetch()
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(cache_key, None)
+        call.done.set()
+
+
+def _refresh_in_background(cache_key: str, fetch):
+    """Revalidate an expired entry off the caller's thread (skipped if a fetch is already running)"""
+    with _in_flight_lock:
+        if cache_key in _in_flight:
+            return
+
+    def refresh():
+        try:
+            _single_flight(cache_key, fetch)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.warning(f"Background refresh of {cache_key} failed, keeping the stale value: {e}")
+
+    _refresh_executor.submit(refresh)
+
+
+def _cached_fetch(cache_key: str, fetch):
+    """
+    Stale-while-revalidate read: fresh entries are returned as is, expired ones are
+    returned immediately while a background refresh runs, and misses wait on a
+    single shared fetch. fetch() is responsible for storing its result in the cache.
+    """
+    # One lookup, so hit/miss statistics count each read once
+    value = _cache.get(cache_key, allow_expired=True)
+    if value is None:
+        return _single_flight(cache_key, fetch)
+    age = _cache.age(cache_key)
+    if age is not None and age >= _cache.ttl:
+        _refresh_in_background(cache_key, fetch)
+    return value
+
+
+class NoDataError(ValueError):
+    """Yahoo answered but had no data for the symbol (not worth retrying)"""
+
+
+def _guarded(ticker: str, fetch):
+    """
+    Run fetch() through the symbol's circuit breaker. Only NoDataError while Yahoo is
+    answering for other symbols is held against the symbol; rate limits, request errors
+    and outages are not.
+    """
+    if not _breaker.allow(ticker):
+        raise CircuitOpenError(f"Skipping {ticker}: its last fetch failed, see get_breaker_states() for the next retry")
+    try:
+        result = fetch()
+    except Exception as e:
+        if isinstance(e, NoDataError) and _breaker.recently_succeeded(HEALTHY_WINDOW):
+            _breaker.record_failure(ticker, str(e))
+        else:
+            _breaker.release(ticker)
+        raise
+    _breaker.record_success(ticker)
+    return result
 
 
 def get_ticker_info(ticker: str, max_retries: int = 3) -> Optional[Dict]:
     """
     Get ticker info with rate limiting, caching, and retry logic.
-    Falls back to history data if info fails.
+    Falls back to history data if info fails. Expired entries are served while
+    they are refreshed in the background.
     
     Args:
         ticker: Stock ticker symbol
@@ -87,18 +184,18 @@ def get_ticker_info(ticker: str, max_retries: int = 3) -> Optional[Dict]:
     Returns:
         Dictionary with ticker info or None if failed
     """
-    # Check cache first
-    cached_data = _get_cached_data(ticker, "info")
-    if cached_data is not None:
-        return cached_data
-    
-    # Enforce rate limiting
-    _rate_limit()
-    
+    return _cached_fetch(f"{ticker}_info", lambda: _fetch_ticker_info(ticker, max_retries))
+
+
+def _fetch_ticker_info(ticker: str, max_retries: int = 3) -> Optional[Dict]:
+    """Download ticker info and cache it (see get_ticker_info)"""
     for attempt in range(max_retries):
+        # Every attempt takes a token, so retries after a 429 wait for the slowed-down bucket
+        _quote_limiter.acquire()
         try:
             stock = yf.Ticker(ticker)
             info = stock.info
+            _quote_limiter.on_success()
             
             # Check if we got valid data - be more lenient with validation
             if info and isinstance(info, dict) and len(info) > 0:
@@ -154,14 +251,11 @@ def get_ticker_info(ticker: str, max_retries: int = 3) -> Optional[Dict]:
                 return None
                 
         except Exception as e:
-            error_str = str(e)
-            
             # Handle rate limiting (429 error)
-            if "429" in error_str or "Too Many Requests" in error_str:
+            if is_rate_limit_error(e):
+                _quote_limiter.on_rate_limited()
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                    logger.warning(f"Rate limited for {ticker}. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                    time.sleep(wait_time)
+                    logger.warning(f"Rate limited for {ticker}. Retry {attempt + 1}/{max_retries} after the limiter backs off")
                     continue
                 else:
                     logger.error(f"Rate limited for {ticker} after {max_retries} attempts")
@@ -179,7 +273,8 @@ def get_ticker_info(ticker: str, max_retries: int = 3) -> Optional[Dict]:
 
 def get_ticker_history(ticker: str, period: str = "5d", interval: str = "1d", max_retries: int = 3, raise_on_error: bool = False) -> pd.DataFrame:
     """
-    Get ticker historical data with rate limiting, caching, and retry logic
+    Get ticker historical data with rate limiting, caching, and retry logic.
+    Expired entries are served while they are refreshed in the background.
     
     Args:
         ticker: Stock ticker symbol
@@ -191,18 +286,36 @@ def get_ticker_history(ticker: str, period: str = "5d", interval: str = "1d", ma
     Returns:
         DataFrame with historical data or empty DataFrame if failed (unless raise_on_error=True)
     """
-    # Check cache first
-    # Use period_interval as data_type (cache key will be f"{ticker}_{period}_{interval}")
+    # Cache key is f"{ticker}_{period}_{interval}". The shared fetch always raises so that
+    # each waiter can apply its own raise_on_error, and so the breaker sees every failure.
+    try:
+        return _cached_fetch(
+            f"{ticker}_{period}_{interval}",
+            lambda: _guarded(ticker, lambda: _fetch_ticker_history(ticker, period, interval, max_retries, raise_on_error=True))
+        )
+    except Exception:
+        if raise_on_error:
+            raise
+        return pd.DataFrame()
+
+
+def _fetch_ticker_history(ticker: str, period: str, interval: str, max_retries: int = 3, raise_on_error: bool = False) -> pd.DataFrame:
+    """Download history (or extend the stored copy) and cache it (see get_ticker_history)"""
     cache_data_type = f"{period}_{interval}"
-    cached_data = _get_cached_data(ticker, cache_data_type)
-    if cached_data is not None:
-        return cached_data
-    
-    # Enforce rate limiting
-    _rate_limit()
+
+    # Check the on-disk store; if it covers the period only the newer bars are downloaded
+    stored = None
+    use_store = history_store.enabled and interval in STORABLE_INTERVALS
+    if use_store:
+        stored = history_store.load(ticker, interval)
+        if history_store.covers(stored, period, interval):
+            hist = _update_stored_history(ticker, period, interval, stored)
+            _set_cached_data(ticker, hist, cache_data_type)
+            return hist
     
     last_error = None
     for attempt in range(max_retries):
+        _chart_limiter.acquire()
         try:
             stock = yf.Ticker(ticker)
             hist = stock.history(period=period, interval=interval)
@@ -210,36 +323,40 @@ def get_ticker_history(ticker: str, period: str = "5d", interval: str = "1d", ma
             # Fallback to yf.download if history is empty
             if hist.empty:
                 logger.warning(f"stock.history() empty for {ticker}, trying yf.download fallback")
+                _chart_limiter.acquire()
                 hist = yf.download(ticker, period=period, interval=interval, progress=False)
                 
                 # Handle MultiIndex columns from download (common in new yfinance)
                 if isinstance(hist.columns, pd.MultiIndex):
                     hist = hist.droplevel(0, axis=1)
             
+            _chart_limiter.on_success()
             if not hist.empty:
                 # Ensure we have Close column
                 if 'Close' not in hist.columns:
                     raise ValueError(f"History data for {ticker} missing 'Close' column")
+                if use_store:
+                    history_store.append(ticker, interval, hist, stored=stored)
                 _set_cached_data(ticker, hist, cache_data_type)
                 return hist
             else:
                 error_msg = f"Empty history returned for {ticker} (period={period}, interval={interval})"
                 logger.warning(error_msg)
-                last_error = ValueError(error_msg)
+                last_error = NoDataError(error_msg)
                 if raise_on_error:
                     raise last_error
                 return pd.DataFrame()
                 
+        except NoDataError:
+            raise
         except Exception as e:
-            error_str = str(e)
             last_error = e
             
             # Handle rate limiting (429 error)
-            if "429" in error_str or "Too Many Requests" in error_str:
+            if is_rate_limit_error(e):
+                _chart_limiter.on_rate_limited()
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff
-                    logger.warning(f"Rate limited for {ticker} history. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
-                    time.sleep(wait_time)
+                    logger.warning(f"Rate limited for {ticker} history. Retry {attempt + 1}/{max_retries} after the limiter backs off")
                     continue
                 else:
                     error_msg = f"Rate limited for {ticker} history after {max_retries} attempts"
@@ -263,11 +380,330 @@ def get_ticker_history(ticker: str, period: str = "5d", interval: str = "1d", ma
     return pd.DataFrame()
 
 
+def _update_stored_history(ticker: str, period: str, interval: str, stored: pd.DataFrame) -> pd.DataFrame:
+    """Download only the bars since the last stored one, append them and return the requested period.
+    If a split or dividend changed the adjustment of the overlapping bars, the whole stored span
+    is downloaded again and replaces the file."""
+    _chart_limiter.acquire()
+
+    # Overlap a few stored bars: the last one may have been partial, the older ones reveal re-adjustments
+    overlap_start = stored.index[-min(len(stored), OVERLAP_BARS + 1)]
+    try:
+        stock = yf.Ticker(ticker)
+        delta = stock.history(start=overlap_start.strftime('%Y-%m-%d'), interval=interval)
+        _chart_limiter.on_success()
+        if history_store.adjustment_changed(stored, delta):
+            logger.info(f"Adjusted prices changed for {ticker} ({interval}), re-downloading stored history")
+            _chart_limiter.acquire()
+            full = stock.history(start=stored.index[0].strftime('%Y-%m-%d'), interval=interval)
+            _chart_limiter.on_success()
+            if full.empty or 'Close' not in full.columns:
+                raise ValueError(f"Full re-download for {ticker} returned no bars")
+            history_store.save(ticker, interval, full)
+            merged = full
+        else:
+            merged = history_store.append(ticker, interval, delta, stored=stored)
+            logger.debug(f"Appended {len(delta)} stored bars for {ticker} ({interval})")
+    except Exception as e:
+        # Stored bars are at most a few bars behind, which beats failing outright
+        if is_rate_limit_error(e):
+            _chart_limiter.on_rate_limited()
+        logger.warning(f"Delta download failed for {ticker} ({interval}), using stored bars: {e}")
+        merged = stored
+
+    start = period_start(period, tz=merged.index.tz)
+    return merged[merged.index >= start]
+
+
+def _split_batch_download(data: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a multi-ticker yf.download result into one DataFrame per ticker"""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # Single ticker downloads may come back with flat columns
+        if len(tickers) == 1:
+            frames[tickers[0]] = data
+        return frames
+
+    # group_by='ticker' puts the ticker on level 0, but be tolerant of either layout
+    ticker_level = 0 if set(tickers) & set(data.columns.get_level_values(0)) else 1
+    available = set(data.columns.get_level_values(ticker_level))
+
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        frame = data.xs(ticker, axis=1, level=ticker_level)
+        # Batches share one index (e.g. crypto trades on weekends), drop rows this ticker lacks
+        frames[ticker] = frame.dropna(how='all')
+    return frames
+
+
+def _download_batch(tickers: List[str], period: str, interval: str, max_retries: int) -> Optional[Dict[str, pd.DataFrame]]:
+    """Download one batch of tickers with a single yf.download call and retry logic (None if the request failed)"""
+    for attempt in range(max_retries):
+        _chart_limiter.acquire()
+        try:
+            data = yf.download(
+                tickers,
+                period=period,
+                interval=interval,
+                group_by='ticker',
+                auto_adjust=True,  # Match Ticker.history() prices
+                threads=True,
+                progress=False
+            )
+            _chart_limiter.on_success()
+            return _split_batch_download(data, tickers)
+
+        except Exception as e:
+            # Handle rate limiting (429 error)
+            if is_rate_limit_error(e):
+                _chart_limiter.on_rate_limited()
+                if attempt < max_retries - 1:
+                    logger.warning(f"Rate limited for batch of {len(tickers)} tickers. Retry {attempt + 1}/{max_retries} after the limiter backs off")
+                    continue
+                logger.error(f"Rate limited for batch of {len(tickers)} tickers after {max_retries} attempts")
+                return None
+
+            # Handle other errors
+            logger.error(f"Error downloading batch of {len(tickers)} tickers (attempt {attempt + 1}/{max_retries}): {e}")
+            if attempt < max_retries - 1:
+                time.sleep(1)
+
+    return None
+
+
+def _record_outcomes(tickers: List[str], succeeded, failed_reason: str):
+    """Update the breaker for a batch; a failed request (succeeded is None) counts against no symbol"""
+    for ticker in tickers:
+        if succeeded is None:
+            _breaker.release(ticker)
+        elif ticker in succeeded:
+            _breaker.record_success(ticker)
+        else:
+            _breaker.record_failure(ticker, failed_reason)
+
+
+def get_tickers_history(tickers: Iterable[str], period: str = "5d", interval: str = "1d", max_retries: int = 3) -> Dict[str, pd.DataFrame]:
+    """
+    Get historical data for many tickers using batched yf.download calls.
+    Cached tickers are served from the cache; the rest are downloaded in
+    batches of BATCH_SIZE and each result is cached under the same key
+    get_ticker_history uses. Symbols whose circuit breaker is open are not
+    requested.
+    
+    Args:
+        tickers: Ticker symbols
+        period: Period of data to fetch
+        interval: Interval of data
+        max_retries: Maximum number of retry attempts per batch
+        
+    Returns:
+        Dictionary mapping each requested ticker to its DataFrame (empty DataFrame if failed)
+    """
+    # Preserve order but drop duplicates and blanks
+    symbols = list(dict.fromkeys(t for t in tickers if t))
+    cache_data_type = f"{period}_{interval}"
+
+    results = {}
+    missing = []
+    for ticker in symbols:
+        cached_data = _get_cached_data(ticker, cache_data_type)
+        if cached_data is not None:
+            results[ticker] = cached_data
+        elif _breaker.allow(ticker):
+            missing.append(ticker)
+        else:
+            results[ticker] = pd.DataFrame()
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        frames = _download_batch(batch, period, interval, max_retries)
+
+        # yf.download swallows network errors and returns nothing, so an all-empty batch
+        # is not held against its symbols (a lone symbol only while Yahoo serves others)
+        outage = not frames and (len(batch) > 1 or not _breaker.recently_succeeded(HEALTHY_WINDOW))
+        succeeded = None if frames is None or outage else set()
+        for ticker in batch:
+            hist = (frames or {}).get(ticker)
+            if hist is not None and not hist.empty and 'Close' in hist.columns:
+                _set_cached_data(ticker, hist, cache_data_type)
+                results[ticker] = hist
+                if succeeded is not None:
+                    succeeded.add(ticker)
+            else:
+                logger.warning(f"Empty batch history returned for {ticker} (period={period}, interval={interval})")
+                results[ticker] = pd.DataFrame()
+        _record_outcomes(batch, succeeded, f"Empty batch history (period={period}, interval={interval})")
+
+    return results
+
+
+class Quote(NamedTuple):
+    """Compact quote record (fields are None when Yahoo does not report them)"""
+    symbol: str
+    price: float
+    previous_close: Optional[float] = None
+    volume: Optional[int] = None
+    market_cap: Optional[float] = None
+    trailing_pe: Optional[float] = None
+    currency: Optional[str] = None
+
+    @property
+    def change(self) -> Optional[float]:
+        return self.price - self.previous_close if self.previous_close else None
+
+    @property
+    def change_pct(self) -> Optional[float]:
+        return (self.price / self.previous_close - 1) * 100 if self.previous_close else None
+
+
+def _parse_quote(row: Dict) -> Optional[Quote]:
+    price = row.get('regularMarketPrice')
+    if price is None:
+        return None
+    return Quote(
+        symbol=row['symbol'],
+        price=float(price),
+        previous_close=row.get('regularMarketPreviousClose'),
+        volume=row.get('regularMarketVolume'),
+        market_cap=row.get('marketCap'),
+        trailing_pe=row.get('trailingPE'),
+        currency=row.get('currency')
+    )
+
+
+def _quotes_from_history(tickers: List[str]) -> Optional[Dict[str, Quote]]:
+    """Fallback: quotes from a batched 5-day daily download (no market cap or P/E)"""
+    frames = _download_batch(tickers, "5d", "1d", max_retries=1)
+    if frames is None:
+        return None
+    quotes = {}
+    for ticker, hist in frames.items():
+        if hist.empty or 'Close' not in hist.columns:
+            continue
+        close = hist['Close'].dropna()
+        if close.empty:
+            continue
+        volume = hist['Volume'].iloc[-1] if 'Volume' in hist.columns else None
+        quotes[ticker] = Quote(
+            symbol=ticker,
+            price=float(close.iloc[-1]),
+            previous_close=float(close.iloc[-2]) if len(close) > 1 else None,
+            volume=int(volume) if volume is not None and pd.notna(volume) else None
+        )
+    return quotes
+
+
+def _download_quotes(tickers: List[str], max_retries: int) -> Optional[Dict[str, Quote]]:
+    """Fetch one batch from the v7 quote endpoint with retry logic (None if the request failed)"""
+    for attempt in range(max_retries):
+        _price_limiter.acquire()
+        try:
+            data = YfData().get_raw_json(QUOTE_URL, params={
+                "symbols": ",".join(tickers),
+                "fields": QUOTE_FIELDS,
+                "formatted": "false"
+            })
+            _price_limiter.on_success()
+            rows = (data.get("quoteResponse") or {}).get("result") or []
+            by_symbol = {row.get("symbol", "").upper(): row for row in rows}
+            quotes = {}
+            for ticker in tickers:
+                row = by_symbol.get(ticker.upper())
+                quote = _parse_quote(row) if row else None
+                if quote is not None:
+                    quotes[ticker] = quote._replace(symbol=ticker)
+            return quotes
+
+        except Exception as e:
+            if is_rate_limit_error(e):
+                _price_limiter.on_rate_limited()
+                if attempt < max_retries - 1:
+                    logger.warning(f"Rate limited for quotes of {len(tickers)} tickers. Retry {attempt + 1}/{max_retries} after the limiter backs off")
+                    continue
+                logger.error(f"Rate limited for quotes of {len(tickers)} tickers after {max_retries} attempts")
+                return None
+
+            # The endpoint is unofficial; fall back to batched daily bars if it breaks
+            logger.warning(f"Quote endpoint failed for {len(tickers)} tickers, using history instead: {e}")
+            return _quotes_from_history(tickers)
+
+    return None
+
+
+def get_quotes(tickers: Iterable[str], max_retries: int = 3) -> Dict[str, Quote]:
+    """
+    Get last price, previous close, volume and market cap for many tickers.
+    Uses Yahoo's batched quote endpoint (a few hundred bytes per symbol) instead
+    of .info or intraday history. Quotes are cached like other data; a ticker
+    whose refresh fails (or whose circuit breaker is open) gets its last cached
+    quote if one is still held.
+    
+    Args:
+        tickers: Ticker symbols (stocks, ETFs, indices or Yahoo crypto pairs like BTC-USD)
+        max_retries: Maximum number of retry attempts per batch
+        
+    Returns:
+        Dictionary mapping each ticker with a price to its Quote
+    """
+    symbols = list(dict.fromkeys(t for t in tickers if t))
+
+    results = {}
+    missing = []
+    for ticker in symbols:
+        cached_data = _get_cached_data(ticker, "quote")
+        if cached_data is not None:
+            results[ticker] = cached_data
+        elif _breaker.allow(ticker):
+            missing.append(ticker)
+        else:
+            stale = _get_cached_data(ticker, "quote", allow_expired=True)
+            if stale is not None:
+                results[ticker] = stale
+
+    for start in range(0, len(missing), QUOTE_BATCH_SIZE):
+        batch = missing[start:start + QUOTE_BATCH_SIZE]
+        if QUOTE_API_AVAILABLE:
+            quotes = _download_quotes(batch, max_retries)
+        else:
+            quotes = _quotes_from_history(batch)
+        # As in get_tickers_history, an all-empty batch (outage) is not held against its symbols
+        outage = not quotes and (len(batch) > 1 or not _breaker.recently_succeeded(HEALTHY_WINDOW))
+        counted = None if quotes is None or outage else quotes
+        _record_outcomes(batch, counted, "No quote returned")
+
+        for ticker in batch:
+            quote = (quotes or {}).get(ticker)
+            if quote is not None:
+                _set_cached_data(ticker, quote, "quote")
+                results[ticker] = quote
+            else:
+                stale = _get_cached_data(ticker, "quote", allow_expired=True)
+                if stale is not None:
+                    results[ticker] = stale
+                else:
+                    logger.warning(f"No quote returned for {ticker}")
+
+    return results
+
+
+def get_quote(ticker: str, max_retries: int = 3) -> Optional[Quote]:
+    """Quote for a single ticker (None if unavailable), see get_quotes"""
+    return get_quotes([ticker], max_retries).get(ticker)
+
+
 def clear_cache():
-    """Clear the cache (useful for testing or forced refresh)"""
-    global _cache, _cache_timestamps
+    """Clear the cache and forget failed symbols (useful for testing or forced refresh)"""
     _cache.clear()
-    _cache_timestamps.clear()
+    _breaker.reset()
+
+
+def get_breaker_states() -> Dict[str, Dict]:
+    """Symbols with recent failures: state (closed/open/half_open), failures, retry_in seconds and last_error"""
+    return _breaker.states()
 
 
 def get_cached_data(ticker: str, data_type: str = "info", allow_expired: bool = False):
@@ -283,5 +719,13 @@ def get_cached_data(ticker: str, data_type: str = "info", allow_expired: bool =
 
 def get_all_cache_keys():
     """Get all cache keys (for debugging/fallback)"""
-    return list(_cache.keys())
+    return _cache.keys()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get cache hit/miss/eviction counters, current size and fetches in flight"""
+    stats = _cache.stats()
+    with _in_flight_lock:
+        stats["in_flight"] = len(_in_flight)
+    return stats
 